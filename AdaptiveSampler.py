@@ -0,0 +1,59 @@
+import numpy as np
+
+from ChangeDetector import ChangeDetector, default_tolerance
+from FrameSampler import FrameSampler
+
+
+class AdaptiveSampler:
+    # Samples every `interval` frames like FrameSampler, but where any ROI looks different between two
+    # neighbouring samples the gap is bisected, recursively, until both ends look alike or the gap is down
+    # to `min_interval` frames. Static stretches cost one sample per interval, transitions are pinned down
+    # to min_interval. Samples come out in frame order as (frame_index, timestamp, frame).
+    def __init__(self, video_capture, roi_coordinates, start_frame=0, interval=30, end_frame=None, min_interval=1,
+                 tolerance=default_tolerance, profiler=None, seek_index=None, frame_cache=None, video_key=None,
+                 fill_cache=True):
+        self.sampler = FrameSampler(video_capture, start_frame, interval, end_frame, profiler=profiler,
+                                    seek_index=seek_index, frame_cache=frame_cache, video_key=video_key,
+                                    fill_cache=fill_cache)
+        self.roi_coordinates = roi_coordinates
+        self.min_interval = max(1, int(min_interval))
+        self.detector = ChangeDetector(tolerance)
+        self.refined = 0  # Samples added by bisection
+
+    def signature(self, frame):
+        return [self.detector.thumbnail(frame[y1:y2, x1:x2]) for x1, y1, x2, y2 in self.roi_coordinates]
+
+    def differs(self, left, right):
+        return any(np.max(np.abs(a - b)) > self.detector.tolerance for a, b in zip(left, right))
+
+    def read(self, frame_index):
+        sample = self.sampler.read_at(frame_index)
+        return None if sample is None else (sample, self.signature(sample[2]))
+
+    def bisect(self, left, right):
+        # left and right are (frame_index, signature) of samples already read, yields the samples between them
+        gap = right[0] - left[0]
+        if gap <= self.min_interval or not self.differs(left[1], right[1]):
+            return
+        # Stay on the min_interval grid so resumed or sharded runs pick the same frames
+        middle_index = left[0] + max(self.min_interval, gap // 2 // self.min_interval * self.min_interval)
+        middle = self.read(middle_index)
+        if middle is None:
+            return
+        self.refined += 1
+        sample, signature = middle
+        yield from self.bisect(left, (middle_index, signature))
+        yield sample
+        yield from self.bisect((middle_index, signature), right)
+
+    def __iter__(self):
+        previous = None
+        for frame_index in self.sampler.frame_indices():
+            current = self.read(frame_index)
+            if current is None:
+                break
+            sample, signature = current
+            if previous is not None:
+                yield from self.bisect(previous, (frame_index, signature))
+            yield sample
+            previous = (frame_index, signature)
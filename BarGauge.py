@@ -0,0 +1,119 @@
+import numpy as np
+
+default_min_contrast = 8.0  # Smallest step in brightness taken as the end of the fill
+default_bright_thresh = 128  # A bar without an edge counts as full when brighter than this
+gray_weights = np.array([0.114, 0.587, 0.299], dtype=np.float32)  # BGR, same weights as cv2.COLOR_BGR2GRAY
+
+
+class BarGauge:
+    # Fill fraction of a progress bar. Only a thin band through the middle of the bar is read, averaged
+    # across the bar into a brightness profile along it; the fill ends at the strongest step in that
+    # profile, refined to a fraction of a pixel by fitting a parabola to the step and its neighbours.
+    # Horizontal bars fill from the left, vertical bars from the bottom. Every method takes a single
+    # crop or a stack of crops from many frames, which are all evaluated in one array operation.
+    def __init__(self, box, vertical=False, min_contrast=default_min_contrast, bright_thresh=default_bright_thresh):
+        x1, y1, x2, y2 = box
+        self.vertical = vertical
+        self.min_contrast = min_contrast
+        self.bright_thresh = bright_thresh
+        # Half the band is a tenth of the bar's thickness, between 1 and 6 pixels
+        if vertical:
+            half = min(max((x2 - x1) // 10, 1), 6)
+            mid = x1 + (x2 - x1) // 2
+            self.band_box = (mid - half, y1, mid + half, y2)
+        else:
+            half = min(max((y2 - y1) // 10, 1), 6)
+            mid = y1 + (y2 - y1) // 2
+            self.band_box = (x1, mid - half, x2, mid + half)
+
+    def crop(self, frame):
+        # A view of the band, nothing is copied
+        x1, y1, x2, y2 = self.band_box
+        return frame[..., y1:y2, x1:x2, :]
+
+    def profiles(self, crops):
+        # (n, length) brightness along the bar, index 0 where the fill starts
+        crops = np.asarray(crops)
+        if crops.ndim == 3:
+            crops = crops[np.newaxis]
+        across = 2 if self.vertical else 1
+        profiles = crops.mean(axis=across, dtype=np.float32) @ gray_weights
+        return profiles[:, ::-1] if self.vertical else profiles
+
+    def edges(self, profiles):
+        # Sub-pixel position of the end of the fill, NaN where no step is strong enough
+        gradients = np.abs(np.diff(profiles, axis=1))
+        rows = np.arange(len(gradients))
+        k = gradients.argmax(axis=1)
+        peak = gradients[rows, k]
+        left = np.where(k > 0, gradients[rows, np.maximum(k - 1, 0)], peak)
+        right = np.where(k < gradients.shape[1] - 1, gradients[rows, np.minimum(k + 1, gradients.shape[1] - 1)], peak)
+        curvature = left - 2 * peak + right
+        with np.errstate(divide='ignore', invalid='ignore'):
+            offset = np.where(curvature < 0, 0.5 * (left - right) / curvature, 0.0)
+        # The step between pixels k and k + 1 sits at k + 1
+        edges = k + 1 + np.clip(offset, -0.5, 0.5)
+        return np.where(peak >= self.min_contrast, edges, np.nan)
+
+    def fill(self, crops):
+        # Fill fraction for each crop, an array for a stack and a float for a single crop
+        single = np.ndim(crops) == 3
+        profiles = self.profiles(crops)
+        edges = self.edges(profiles)
+        # No step at all: the bar is either completely full or completely empty
+        uniform = np.where(profiles.mean(axis=1) > self.bright_thresh, 1.0, 0.0)
+        fill = np.where(np.isnan(edges), uniform, edges / profiles.shape[1])
+        return float(fill[0]) if single else fill
+
+    def fill_frames(self, frames):
+        # Same as fill() on the band of each full frame in a (n, height, width, 3) stack
+        return self.fill(self.crop(np.asarray(frames)))
+
+    def preview(self, crop, fill):
+        # The averaged band as a grayscale image with the detected end of the fill marked white
+        profile = self.profiles(crop)[0]
+        length = len(profile)
+        position = min(int(fill * length), length - 1)
+        if self.vertical:
+            profile = profile[::-1]
+            position = length - 1 - position
+        # Built in its final orientation with one broadcast write, the profile is never repeated or transposed
+        if self.vertical:
+            image = np.empty((length, np.shape(crop)[1]), dtype=np.uint8)
+            image[:] = profile[:, np.newaxis]
+            image[max(position - 1, 0):position + 1] = 255
+        else:
+            image = np.empty((np.shape(crop)[0], length), dtype=np.uint8)
+            image[:] = profile
+            image[:, max(position - 1, 0):position + 1] = 255
+        return image
+
+
+class BandStack:
+    # The bands of one bar from the samples since the last measurement, copied straight out of each frame
+    # into one growing array that is reused after every measurement, so no per-sample copy and no np.stack
+    # of them all. measure() returns (row, fill) for everything collected and empties the stack.
+    def __init__(self, gauge):
+        self.gauge = gauge
+        self.bands = None
+        self.rows = []
+
+    def append(self, row, frame):
+        band = self.gauge.crop(frame)
+        count = len(self.rows)
+        if self.bands is None:
+            self.bands = np.empty((8,) + band.shape, dtype=np.uint8)
+        elif count == len(self.bands):
+            self.bands = np.concatenate([self.bands, np.empty_like(self.bands)])
+        self.bands[count] = band
+        self.rows.append(row)
+        return self.bands[count]
+
+    def __len__(self):
+        return len(self.rows)
+
+    def measure(self):
+        fills = self.gauge.fill(self.bands[:len(self.rows)]) if self.rows else []
+        measured = list(zip(self.rows, fills))
+        self.rows.clear()
+        return measured
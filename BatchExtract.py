@@ -0,0 +1,151 @@
+import argparse
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+import cv2
+
+from ExtractJob import read_job_file, run_job, validate_job
+from ParallelExtract import init_worker
+
+video_extensions = ('.mp4', '.avi', '.mov', '.mkv', '.m4v', '.ts')
+
+# Example batch: the job file the ROIs were drawn for (saved from the GUI, with its frame_size) as the template,
+# and every recording in a folder, four at a time:
+#   python BatchExtract.py flight.job.json recordings/ -o csv/ --workers 4
+
+
+def find_videos(paths):
+    # Files are taken as given, folders contribute the videos directly inside them
+    videos = []
+    for path in paths:
+        if os.path.isdir(path):
+            videos += sorted(os.path.join(path, name) for name in os.listdir(path)
+                             if name.lower().endswith(video_extensions))
+        else:
+            videos.append(path)
+    return videos
+
+
+def batch_jobs(template, videos, output_dir=None):
+    # One job per video, all sharing the template's ROIs and settings. Each video is one task for the
+    # pool, so a job is never sharded itself. Boxes are scaled to each video from the template's frame_size,
+    # or from the size of the template's own video when it doesn't say.
+    if not template.get('frame_size') and template.get('video') and os.path.exists(template['video']):
+        video_capture = cv2.VideoCapture(template['video'])
+        if video_capture.isOpened():
+            template = dict(template, frame_size=[int(video_capture.get(cv2.CAP_PROP_FRAME_WIDTH)),
+                                                  int(video_capture.get(cv2.CAP_PROP_FRAME_HEIGHT))])
+        video_capture.release()
+    jobs = []
+    for video in videos:
+        job = dict(template, video=video, workers=1)
+        output_name = os.path.basename(video) + '.csv'
+        job['output'] = os.path.join(output_dir, output_name) if output_dir else video + '.csv'
+        jobs.append(validate_job(job))
+    return jobs
+
+
+def run_video(job):
+    # Runs in a pool worker. The OCR engine registry is per process, so the model is loaded by the
+    # worker's first video and reused for every later one.
+    started = time.perf_counter()
+    df = run_job(job)
+    return {'rows': len(df), 'seconds': time.perf_counter() - started}
+
+
+def run_batch(jobs, workers=None, on_status=None, should_stop=None):
+    # Schedules the jobs on a pool of worker processes. Returns one status dict per job, in order:
+    # video, state ('queued', 'running', 'done', 'failed', 'cancelled'), rows, seconds, rate (rows/s), error.
+    # on_status(statuses) is called whenever one of them changes, should_stop() -> True cancels the
+    # videos that haven't started. A failing video is reported and the batch carries on.
+    workers = max(1, min(workers or os.cpu_count() or 1, len(jobs) or 1))
+    statuses = [{'video': job['video'], 'state': 'queued', 'rows': 0, 'seconds': 0.0, 'rate': 0.0, 'error': None}
+                for job in jobs]
+    threads_per_worker = max(1, (os.cpu_count() or 1) // workers)
+    # spawn rather than fork so workers don't inherit Qt or torch state from the parent
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                             initializer=init_worker, initargs=(threads_per_worker,)) as pool:
+        futures = {pool.submit(run_video, job): n for n, job in enumerate(jobs)}
+        running = set(futures)
+        while running:
+            done, running = wait(running, timeout=0.5, return_when=FIRST_COMPLETED)
+            changed = bool(done)
+            for future in running:
+                status = statuses[futures[future]]
+                if status['state'] == 'queued' and future.running():
+                    status['state'] = 'running'
+                    changed = True
+            for future in done:
+                status = statuses[futures[future]]
+                if future.cancelled():
+                    status['state'] = 'cancelled'
+                elif future.exception() is not None:
+                    status['state'] = 'failed'
+                    status['error'] = f'{type(future.exception()).__name__}: {future.exception()}'
+                else:
+                    result = future.result()
+                    status.update(result, state='done', rate=result['rows'] / result['seconds']
+                                  if result['seconds'] else 0.0)
+            if should_stop is not None and should_stop():
+                print('Batch cancelled')
+                for future in running:
+                    if future.cancel():
+                        statuses[futures[future]]['state'] = 'cancelled'
+                running = {future for future in running if not future.cancelled()}
+                should_stop = None  # Videos already running are left to finish
+                changed = True
+            if changed and on_status is not None:
+                on_status(statuses)
+    return statuses
+
+
+def print_status(status):
+    name = os.path.basename(status['video'])
+    if status['state'] == 'done':
+        print(f"{name}: {status['rows']} rows in {status['seconds']:.1f}s ({status['rate']:.1f} rows/s)")
+    elif status['state'] == 'failed':
+        print(f"{name}: failed, {status['error']}")
+    else:
+        print(f"{name}: {status['state']}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Run one ROI template over many videos.')
+    parser.add_argument('template', help='JSON or YAML job file whose ROIs and settings are used for every video')
+    parser.add_argument('videos', nargs='*', help="Videos or folders of videos (default: the template's 'videos')")
+    parser.add_argument('-o', '--output-dir', help='Folder for the CSV files (default: next to each video)')
+    parser.add_argument('-w', '--workers', type=int, help='Videos processed at once (default: one per core)')
+    args = parser.parse_args(argv)
+
+    template = read_job_file(args.template)
+    base_dir = os.path.dirname(os.path.abspath(args.template))
+    template_videos = [os.path.join(base_dir, path) for path in template.pop('videos', None) or []]
+    videos = find_videos(args.videos or template_videos)
+    if not videos:
+        parser.error('No videos to process')
+    if args.output_dir:
+        os.makedirs(args.output_dir, exist_ok=True)
+
+    reported = set()
+
+    def report(statuses):
+        for n, status in enumerate(statuses):
+            if status['state'] in ('done', 'failed', 'cancelled') and n not in reported:
+                reported.add(n)
+                print_status(status)
+
+    started = time.perf_counter()
+    statuses = run_batch(batch_jobs(template, videos, args.output_dir), args.workers, on_status=report)
+    failed = [status for status in statuses if status['state'] != 'done']
+    rows = sum(status['rows'] for status in statuses)
+    print(f"{len(statuses) - len(failed)}/{len(statuses)} videos done, {rows} rows in "
+          f"{time.perf_counter() - started:.1f}s")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
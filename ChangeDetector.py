@@ -0,0 +1,44 @@
+import cv2
+import numpy as np
+
+default_downsample = 4
+default_tolerance = 24
+
+
+class ChangeDetector:
+    # Cheap "has this ROI changed since we last OCR'd it" test. Crops are shrunk with area averaging,
+    # which also washes out compression noise, and compared against the thumbnail of the last crop
+    # that was actually sent to OCR. A crop counts as unchanged while no thumbnail pixel moved by
+    # more than `tolerance` gray levels.
+    def __init__(self, tolerance=default_tolerance, downsample=default_downsample):
+        self.tolerance = tolerance
+        self.downsample = downsample
+        self.reference = {}
+        self.checks = 0
+        self.skips = 0
+
+    def thumbnail(self, image):
+        height, width = image.shape[:2]
+        size = (max(1, width // self.downsample), max(1, height // self.downsample))
+        return cv2.resize(image, size, interpolation=cv2.INTER_AREA).astype(np.int16)
+
+    def changed(self, key, image):
+        self.checks += 1
+        thumb = self.thumbnail(image)
+        reference = self.reference.get(key)
+        if reference is not None and reference.shape == thumb.shape \
+                and np.max(np.abs(thumb - reference)) <= self.tolerance:
+            self.skips += 1
+            return False
+        self.reference[key] = thumb
+        return True
+
+    def reset(self):
+        self.reference.clear()
+
+    @property
+    def skip_rate(self):
+        return self.skips / self.checks if self.checks else 0.0
+
+    def summary(self):
+        return {'checks': self.checks, 'skips': self.skips, 'skip_rate': self.skip_rate}
@@ -0,0 +1,163 @@
+import os
+import tempfile
+import threading
+
+import cv2
+import numpy as np
+
+digit_charset = '0123456789:.'
+default_glyph_size = (12, 16)  # width, height every glyph is resampled to
+default_min_confidence = 0.9
+default_learn_confidence = 0.8  # easyocr confidence needed before one of its reads is used as a template
+default_max_templates = 8  # Per character, oldest are dropped first
+geometry_weight = 0.5
+
+
+class DigitRecognizer:
+    # Template matcher for numeric HUD readouts rendered in a fixed font. A crop is binarized,
+    # split into glyphs on empty columns, and every glyph is matched (normalized correlation) against
+    # templates learned from crops with known text. Far cheaper than the neural recognizer, and
+    # `recognize` reports a confidence so callers can fall back to easyocr on glyphs it hasn't seen.
+    def __init__(self, glyph_size=default_glyph_size, max_templates=default_max_templates):
+        self.glyph_size = glyph_size
+        self.max_templates = max_templates
+        self.templates = {}  # char -> list of feature vectors
+        self._matrix = None
+        self._labels = None
+        self.lock = threading.Lock()  # OCR batches may run on several threads, one of them learning
+
+    @property
+    def ready(self):
+        return bool(self.templates)
+
+    def segment(self, image):
+        # Returns a list of (x1, y1, x2, y2) glyph boxes, left to right, and the binarized crop
+        if image.ndim == 3:
+            image = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        _, binary = cv2.threshold(image, 0, 1, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+        # Text is whatever covers less of the box, bright on dark or dark on bright
+        if binary.mean() > 0.5:
+            binary = 1 - binary
+        columns = np.flatnonzero(binary.any(axis=0))
+        if not len(columns):
+            return [], binary
+
+        # Runs of consecutive non-empty columns
+        breaks = np.flatnonzero(np.diff(columns) > 1)
+        starts = np.concatenate(([columns[0]], columns[breaks + 1]))
+        stops = np.concatenate((columns[breaks], [columns[-1]])) + 1
+
+        boxes = []
+        for x1, x2 in zip(starts, stops):
+            rows = np.flatnonzero(binary[:, x1:x2].any(axis=1))
+            if binary[:, x1:x2].sum() < 2:
+                continue  # Speck of noise
+            boxes.append((int(x1), int(rows[0]), int(x2), int(rows[-1]) + 1))
+        return self._split_touching(boxes), binary
+
+    @staticmethod
+    def _split_touching(boxes):
+        # Glyphs that touch come out as one wide run, cut those into equal parts of a typical glyph width
+        tall = [x2 - x1 for x1, y1, x2, y2 in boxes if y2 - y1 > 0.6 * max(b[3] - b[1] for b in boxes)]
+        if len(tall) < 2:
+            return boxes
+        width = float(np.median(tall))
+        split = []
+        for x1, y1, x2, y2 in boxes:
+            parts = int(round((x2 - x1) / width))
+            if parts > 1 and (x2 - x1) > 1.5 * width:
+                edges = np.linspace(x1, x2, parts + 1).round().astype(int)
+                split.extend((int(a), y1, int(b), y2) for a, b in zip(edges, edges[1:]))
+            else:
+                split.append((x1, y1, x2, y2))
+        return split
+
+    def features(self, binary, boxes):
+        line_top = min(box[1] for box in boxes)
+        line_height = max(max(box[3] for box in boxes) - line_top, 1)
+        vectors = np.empty((len(boxes), self.glyph_size[0] * self.glyph_size[1] + 3), dtype=np.float32)
+        for n, (x1, y1, x2, y2) in enumerate(boxes):
+            glyph = cv2.resize(binary[y1:y2, x1:x2].astype(np.float32), self.glyph_size, interpolation=cv2.INTER_AREA)
+            glyph = glyph.ravel() - glyph.mean()
+            norm = np.linalg.norm(glyph)
+            if norm > 0:
+                glyph /= norm
+            # Where the glyph sits in the line and how big it is, so '.' and ':' don't look like filled blocks
+            geometry = np.array([(y1 - line_top) / line_height, (y2 - y1) / line_height, (x2 - x1) / (y2 - y1)])
+            vector = np.concatenate((glyph, geometry_weight * geometry))
+            vectors[n] = vector / max(np.linalg.norm(vector), 1e-6)
+        return vectors
+
+    def learn(self, image, text):
+        # Add templates from a crop whose text is known. Returns False if the crop didn't segment
+        # into exactly one glyph per character (the example is ignored then).
+        text = text.replace(' ', '')
+        if not text or any(char not in digit_charset for char in text):
+            return False
+        boxes, binary = self.segment(image)
+        if len(boxes) != len(text):
+            return False
+        vectors = self.features(binary, boxes)
+        with self.lock:
+            for char, vector in zip(text, vectors):
+                templates = self.templates.setdefault(char, [])
+                templates.append(vector)
+                del templates[:-self.max_templates]
+            self._matrix = None
+        return True
+
+    def recognize(self, image):
+        # Returns (text, confidence), the confidence being the worst glyph match
+        boxes, binary = self.segment(image)
+        if not boxes or not self.templates:
+            return '', 0.0
+        with self.lock:
+            if self._matrix is None:
+                self._labels = np.array([char for char, vectors in self.templates.items() for _ in vectors])
+                self._matrix = np.vstack([np.vstack(vectors) for vectors in self.templates.values()])
+            labels, matrix = self._labels, self._matrix
+        scores = self.features(binary, boxes) @ matrix.T
+        best = scores.argmax(axis=1)
+        text = ''.join(labels[best])
+        return text, float(max(0.0, scores[np.arange(len(boxes)), best].min()))
+
+    def readtext(self, image):
+        # recognize() in easyocr's readtext(detail=1) layout, one line covering the whole crop
+        text, conf = self.recognize(image)
+        height, width = image.shape[:2]
+        return [([[0, 0], [width, 0], [width, height], [0, height]], text, conf)] if text else []
+
+    def to_arrays(self, prefix=''):
+        return {f'{prefix}{char}': np.vstack(vectors) for char, vectors in self.templates.items()}
+
+    def from_arrays(self, arrays, prefix=''):
+        for key, vectors in arrays.items():
+            if key.startswith(prefix) and len(key) == len(prefix) + 1:
+                self.templates[key[-1]] = list(vectors)
+        self._matrix = None
+
+
+def save_digit_templates(path, recognizers):
+    # One .npz for all fields, keyed '<roi name>/<char>'
+    arrays = {}
+    for name, recognizer in recognizers.items():
+        arrays.update(recognizer.to_arrays(f'{name}/'))
+    # Written to a file of its own and moved into place, parallel shards and batch workers may all save
+    # at the end of their run: the last one wins and nobody reads a half written file
+    fd, tmp_path = tempfile.mkstemp(suffix='.tmp', dir=os.path.dirname(os.path.abspath(path)))
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            np.savez(f, **arrays)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+
+def load_digit_templates(path, names):
+    recognizers = {name: DigitRecognizer() for name in names}
+    with np.load(path) as arrays:
+        arrays = dict(arrays)
+    for name, recognizer in recognizers.items():
+        recognizer.from_arrays(arrays, f'{name}/')
+    return recognizers
@@ -0,0 +1,254 @@
+import argparse
+import json
+import os
+
+import cv2
+
+from ExtractText import extract_text_from_video, default_conf_thresh
+from OCRCache import default_cache_mb
+from OCREngine import get_ocr_engine, default_languages
+from Pipeline import default_decode_queue, default_ocr_workers, default_ocr_queue
+from ParallelExtract import extract_text_parallel
+from Preprocessor import Preprocessor
+from Profiler import StageProfiler
+from ResultWriter import ResultWriter
+from SeekIndex import SeekIndex
+
+# Example job file (JSON, or the same keys in YAML):
+# {
+#   "video": "StarshipFT7.mp4",
+#   "output": "StarshipFT7.mp4.csv",
+#   "interval": 30, "start_time": 20, "end_time": 100, "frame_size": [1280, 720],
+#   "conf_thresh": 0.3, "record_confidence": false, "enhance_contrast": false,
+#   "rois": [
+#     {"name": "timestamp", "box": [40, 20, 210, 48], "preprocess": {"target_height": 32, "binarize": "otsu"}},
+#     {"name": "speed", "box": [176, 620, 348, 650], "recognize_only": true, "digits": true},
+#     {"name": "fuel", "box": [176, 658, 348, 680], "type": "horizontal_bar"}
+#   ]
+# }
+
+roi_types = ('text', 'horizontal_bar', 'vertical_bar')
+frame_sources = ('opencv', 'ffmpeg')
+
+job_defaults = {
+    'output': None,
+    'frame_size': None,  # [width, height] of the frame the boxes were drawn on, other videos get them scaled
+    'interval': 30,
+    'bar_interval': None,  # Sample bars every this many frames, defaults to 'interval'
+    'frame_source': 'opencv',  # or 'ffmpeg' to have ffmpeg decode and crop out the ROIs
+    # Index the video's frame times and keyframes once, kept next to it as <video>.index.npz. Worth it for
+    # variable frame rate files, but indexing a new video can take a full pass over it.
+    'seek_index': False,
+    'min_interval': None,  # Adaptive sampling: bisect intervals where an ROI changed down to this many frames
+    'start_time': 0.0,
+    'end_time': None,  # End of the video
+    'conf_thresh': default_conf_thresh,
+    'record_confidence': False,
+    'enhance_contrast': False,
+    'change_tolerance': None,
+    'ocr_batch_frames': 1,
+    'decode_queue': default_decode_queue,  # Samples decoded ahead on their own thread, 0 decodes in the loop
+    'ocr_workers': default_ocr_workers,  # Threads running OCR batches, 0 runs OCR in the loop
+    'ocr_queue': default_ocr_queue,  # OCR batches in flight before the loop waits
+    'workers': 1,
+    # Continue an interrupted run from its output's checkpoint. This and the profiling below need a single
+    # process run ('workers': 1); None resumes whenever the run can.
+    'resume': None,
+    'profile': False,  # Print time per stage at the end
+    'trace': None,  # Per-sample stage timings as JSON lines
+    'digit_templates': None,  # .npz of glyphs learned for 'digits' ROIs, loaded if present and updated after the run
+    'ocr_cache': None,  # SQLite file of raw OCR output reused by later runs, e.g. StarshipFT7.mp4.ocrcache
+    'ocr_cache_mb': default_cache_mb,
+    'languages': list(default_languages),
+    'gpu': True,
+}
+
+
+def load_job(path):
+    return validate_job(read_job_file(path))
+
+
+def read_job_file(path):
+    with open(path) as f:
+        if os.path.splitext(path)[1].lower() in ('.yaml', '.yml'):
+            # PyYAML is only needed for YAML job files
+            import yaml
+            job = yaml.safe_load(f)
+        else:
+            job = json.load(f)
+    # Relative video/output paths are relative to the job file
+    base_dir = os.path.dirname(os.path.abspath(path))
+    for key in ('video', 'output', 'digit_templates', 'ocr_cache'):
+        if job.get(key):
+            job[key] = os.path.join(base_dir, job[key])
+    return job
+
+
+def save_job(job, path):
+    with open(path, 'w') as f:
+        if os.path.splitext(path)[1].lower() in ('.yaml', '.yml'):
+            import yaml
+            yaml.safe_dump(job, f, sort_keys=False)
+        else:
+            json.dump(job, f, indent=2)
+
+
+def validate_job(job):
+    job = dict(job_defaults, **job)
+    if not job.get('video'):
+        raise ValueError("Job needs a 'video' path")
+    if not job.get('rois'):
+        raise ValueError("Job needs at least one entry in 'rois'")
+    rois = []
+    for n, roi in enumerate(job['rois']):
+        roi = dict(roi)
+        roi.setdefault('name', f'region{n}')
+        roi.setdefault('type', 'text')
+        roi.setdefault('recognize_only', False)
+        roi.setdefault('digits', False)
+        roi.setdefault('preprocess', None)
+        if roi['type'] not in roi_types:
+            raise ValueError(f"ROI '{roi['name']}' has unknown type '{roi['type']}', expected one of {roi_types}")
+        if len(roi.get('box', ())) != 4:
+            raise ValueError(f"ROI '{roi['name']}' needs a 'box' of [x1, y1, x2, y2]")
+        roi['box'] = [int(float(v)) for v in roi['box']]
+        if roi['preprocess'] is not None:
+            # Fails on unknown settings now rather than once the video is open
+            Preprocessor(**roi['preprocess'])
+        rois.append(roi)
+    job['rois'] = rois
+    if job['frame_size'] is not None:
+        if len(job['frame_size']) != 2 or min(job['frame_size']) <= 0:
+            raise ValueError(f"'frame_size' must be [width, height], not {job['frame_size']}")
+        job['frame_size'] = [int(v) for v in job['frame_size']]
+    if job['frame_source'] not in frame_sources:
+        raise ValueError(f"Unknown frame_source '{job['frame_source']}', expected one of {frame_sources}")
+    if job['workers'] > 1:
+        # Workers write their rows once at the end, there is no checkpoint or stage timing to share
+        unsupported = [name for name in ('resume', 'profile', 'trace') if job[name]]
+        if unsupported:
+            raise ValueError(f"{', '.join(unsupported)} can't be used with more than one worker")
+    if job['output'] is None:
+        job['output'] = job['video'] + '.csv'
+    return job
+
+
+def scale_rois(job, frame_size):
+    # Boxes drawn on a frame of job['frame_size'] moved onto a video of frame_size, so one template
+    # serves recordings made at different resolutions
+    if not job['frame_size'] or list(job['frame_size']) == list(frame_size):
+        return job
+    sx, sy = frame_size[0] / job['frame_size'][0], frame_size[1] / job['frame_size'][1]
+    rois = [dict(roi, box=[round(x1 * sx), round(y1 * sy), round(x2 * sx), round(y2 * sy)])
+            for roi in job['rois'] for x1, y1, x2, y2 in [roi['box']]]
+    return dict(job, rois=rois, frame_size=list(frame_size))
+
+
+def extraction_options(job):
+    # Translate a job into the keyword arguments of extract_text_from_video
+    rois = job['rois']
+    return {
+        'roi_coordinates': [roi['box'] for roi in rois],
+        'roi_names': [roi['name'] for roi in rois],
+        'vert_flags': [roi['type'] == 'vertical_bar' for roi in rois],
+        'hor_flags': [roi['type'] == 'horizontal_bar' for roi in rois],
+        'recognize_only': [bool(roi['recognize_only']) for roi in rois],
+        'digits': [bool(roi['digits']) for roi in rois],
+        'digit_templates': job['digit_templates'],
+        'ocr_cache': job['ocr_cache'],
+        'ocr_cache_mb': job['ocr_cache_mb'],
+        'preprocess': [roi['preprocess'] for roi in rois],
+        'rec_conf': job['record_confidence'],
+        'conf_thresh': job['conf_thresh'],
+        'enhance_contrast': job['enhance_contrast'],
+        'change_tolerance': job['change_tolerance'],
+        'ocr_batch_frames': job['ocr_batch_frames'],
+        'decode_queue': job['decode_queue'],
+        'ocr_workers': job['ocr_workers'],
+        'ocr_queue': job['ocr_queue'],
+        'bar_interval': job['bar_interval'],
+        'min_interval': job['min_interval'],
+        'frame_source': job['frame_source'],
+    }
+
+
+def run_job(job, write_output=True):
+    job = validate_job(job)
+    engine_config = {'languages': job['languages'], 'gpu': job['gpu']}
+
+    video_capture = cv2.VideoCapture(job['video'])
+    if not video_capture.isOpened():
+        raise IOError(f"Could not open video {job['video']}")
+    job = scale_rois(job, (int(video_capture.get(cv2.CAP_PROP_FRAME_WIDTH)),
+                           int(video_capture.get(cv2.CAP_PROP_FRAME_HEIGHT))))
+    options = extraction_options(job)
+    if job['seek_index']:
+        options['seek_index'] = SeekIndex.for_video(job['video'])
+    end_time = job['end_time']
+    if end_time is None:
+        fps = video_capture.get(cv2.CAP_PROP_FPS)
+        end_time = video_capture.get(cv2.CAP_PROP_FRAME_COUNT) / fps if fps else 0.0
+
+    try:
+        if job['workers'] > 1:
+            video_capture.release()
+            df = extract_text_parallel(job['video'], time_interval=job['interval'], start_time=job['start_time'],
+                                       end_time=end_time, workers=job['workers'], engine_config=engine_config,
+                                       **options)
+        else:
+            # Single process runs stream to the output as they go and resume from its checkpoint
+            output = ResultWriter(job['output']) if write_output else None
+            profiler = StageProfiler(job['trace']) if job['profile'] or job['trace'] else None
+            df = extract_text_from_video(video_capture=video_capture,
+                                         video_path=job['video'],
+                                         time_interval=job['interval'],
+                                         start_time=job['start_time'],
+                                         end_time=end_time,
+                                         ocr_engine=get_ocr_engine(**engine_config),
+                                         output=output,
+                                         resume=job['resume'] is not False,
+                                         profiler=profiler,
+                                         **options)
+            return df
+    finally:
+        video_capture.release()
+
+    if write_output:
+        write_results(df, job['output'])
+    return df
+
+
+def write_results(df, path):
+    if path.lower().endswith('.parquet'):
+        df.to_parquet(path, index=False)
+    else:
+        df.to_csv(path, index=False)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Extract on-screen text and gauges from a video without the GUI.')
+    parser.add_argument('job', help='JSON or YAML job file')
+    parser.add_argument('-o', '--output', help='Output CSV or Parquet file (overrides the job file)')
+    parser.add_argument('-w', '--workers', type=int, help='Worker processes (overrides the job file)')
+    parser.add_argument('--restart', action='store_true', help='Ignore the checkpoint of an earlier run and start over')
+    parser.add_argument('--profile', action='store_true', help='Print time spent per stage')
+    parser.add_argument('--trace', help='Write per-sample stage timings to this JSON lines file')
+    args = parser.parse_args(argv)
+
+    job = load_job(args.job)
+    if args.output:
+        job['output'] = args.output
+    if args.workers:
+        job['workers'] = args.workers
+    if args.restart:
+        job['resume'] = False
+    if args.profile:
+        job['profile'] = True
+    if args.trace:
+        job['trace'] = args.trace
+    df = run_job(job)
+    print(f"Wrote {len(df)} rows to {job['output']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,9 +1,25 @@
+import hashlib
+import json
+import os
 import re
 import cv2
-import easyocr
-import numpy as np
-import pandas as pd
-from PyQt5.QtWidgets import QApplication
+
+from AdaptiveSampler import AdaptiveSampler
+from BarGauge import BarGauge, BandStack
+from ChangeDetector import ChangeDetector, default_tolerance
+from DigitRecognizer import DigitRecognizer, load_digit_templates, save_digit_templates, \
+  default_min_confidence, default_learn_confidence
+from FFmpegSampler import FFmpegSampler, roi_layout
+from FrameSampler import FrameSampler
+from LiveSampler import LiveSampler, default_max_latency
+from OCRCache import OCRCache, CachedOCREngine, default_cache_mb, model_key
+from OCREngine import get_ocr_engine
+from Pipeline import Prefetcher, OCRStage, default_decode_queue, default_ocr_workers, default_ocr_queue
+from Preprocessor import Preprocessor, preprocess_settings
+from Profiler import NullProfiler
+from ResultAccumulator import ResultAccumulator
+
+default_conf_thresh = 0.3
 
 def extract_text_from_video(gui_ref=None,
                             video_capture=None,
@@ -16,8 +32,69 @@ def extract_text_from_video(gui_ref=None,
                             conf_thresh = None,
                             enhance_contrast = None,
                             show_frames = None,
-                            show_rois = None
+                            show_rois = None,
+                            ocr_engine = None,
+                            ocr_batch_frames = 1,
+                            recognize_only = None,
+                            change_tolerance = None,
+                            vert_flags = None,
+                            hor_flags = None,
+                            progress = None,
+                            should_stop = None,
+                            on_frame = None,
+                            on_roi = None,
+                            on_results = None,
+                            output = None,
+                            resume = True,
+                            return_results = True,
+                            profiler = None,
+                            digits = None,
+                            digit_templates = None,
+                            bar_interval = None,
+                            min_interval = None,
+                            preprocess = None,
+                            frame_source = 'opencv',
+                            video_path = None,
+                            seek_index = None,
+                            frame_cache = None,
+                            ocr_cache = None,
+                            ocr_cache_mb = default_cache_mb,
+                            max_latency = default_max_latency,
+                            decode_queue = default_decode_queue,
+                            ocr_workers = default_ocr_workers,
+                            ocr_queue = default_ocr_queue
                             ):
+  # Callbacks for running off the GUI thread:
+  #   progress(samples_done, sample_total) after every sample, should_stop() -> True cancels the run
+  #   (rows finished so far are still returned), on_frame(frame) and on_roi(image, x, y) replace drawing
+  #   into gui_ref, on_results(df) receives each block of rows as soon as their OCR is done.
+  # With a ResultWriter as `output` rows are streamed to disk in blocks and checkpointed. A rerun with the
+  # same settings resumes after the last checkpoint. The full result is read back from the output unless
+  # return_results is False, in which case only the rows still in memory are kept and None is returned.
+  # A Profiler.StageProfiler as `profiler` records time per stage and ROI, summarized in df.attrs['profile'].
+  # ROIs flagged in `digits` are read by a DigitRecognizer that learns the font from confident easyocr reads
+  # (and from/to the digit_templates .npz file when given), easyocr only runs when it isn't sure.
+  # Bars can be sampled more often than text: with `bar_interval` every bar_interval-th frame gets a row with
+  # only the bars filled in, text is still read every time_interval frames (which must be a multiple of it).
+  # With `min_interval` sampling is adaptive: wherever an ROI changes between two samples the gap is bisected
+  # down to min_interval frames, so transitions are sampled finely and static stretches coarsely.
+  # `preprocess` optionally holds a dict of Preprocessor settings per ROI, on top of enhance_contrast.
+  # frame_source='ffmpeg' decodes `video_path` with an ffmpeg process that only hands back the ROIs of the
+  # sampled frames (no full frames, so nothing is shown for show_frames).
+  # A SeekIndex as `seek_index` gives exact frame times (variable frame rate files) and keyframe-based seeks.
+  # A FrameCache as `frame_cache` (keyed by video_path) serves frames decoded earlier, e.g. the GUI's preview.
+  # It is only read: the run's own frames would evict those and couldn't be decoded into reused buffers.
+  # `ocr_cache` is the path of an OCRCache file: crops OCR'd by an earlier run take its raw output from there,
+  # and thresholds and text cleanup are applied to that, so reruns with other such settings skip the model.
+  # frame_source='live' reads a capture that can't seek (camera, stream) as it comes: see LiveSampler. Times are
+  # seconds since the first frame, end_time is how long to run, every sample is a text sample and every finished
+  # sample goes straight to on_results/output. Frames older than max_latency seconds are skipped.
+  # The stages overlap: frames are decoded on their own thread up to `decode_queue` samples ahead (0 decodes
+  # in the loop), the loop preprocesses them, OCR batches run on `ocr_workers` threads with at most `ocr_queue`
+  # of them in flight (0 workers runs OCR in the loop), and finished batches are recorded and written in order.
+  # Frames are decoded into a ring of reused buffers unless they are shown or cached (both keep them), ROIs are
+  # cut out as views and only copied by their preprocessing, which writes into buffers of its own.
+
 
   # Use attributes from 'gui_ref' if individual parameters are not provided
   if gui_ref is not None:
@@ -32,115 +109,389 @@ def extract_text_from_video(gui_ref=None,
     enhance_contrast = enhance_contrast if enhance_contrast is not None else gui_ref.enhance_contrast.isChecked()
     show_frames = show_frames if show_frames is not None else gui_ref.show_frames.isChecked()
     show_rois = show_rois if show_rois is not None else gui_ref.show_rois.isChecked()
+    ocr_engine = ocr_engine if ocr_engine is not None else getattr(gui_ref, 'ocr_engine', None)
+    recognize_only = recognize_only if recognize_only is not None else getattr(gui_ref, 'recog_flag', None)
+    digits = digits if digits is not None else getattr(gui_ref, 'digit_flag', None)
+    if change_tolerance is None and hasattr(gui_ref, 'change_tolerance') and gui_ref.change_tolerance.text():
+      change_tolerance = float(gui_ref.change_tolerance.text())
+    vert_flags = vert_flags if vert_flags is not None else gui_ref.vert_flag
+    hor_flags = hor_flags if hor_flags is not None else gui_ref.hor_flag
   else:
     # Ensure all parameters are provided if 'self' isn't passed
     assert all(param is not None for param in
-               [video_capture, roi_coordinates, roi_names, time_interval, start_time, end_time,
-                gui_ref]), "All parameters must be provided if 'gui_ref' is not given."
+               [video_capture, roi_coordinates, roi_names, time_interval, start_time, end_time]), \
+      "All parameters must be provided if 'gui_ref' is not given."
+    # Nothing to display without a GUI unless someone takes the images
+    show_frames = bool(show_frames) and on_frame is not None
+    show_rois = bool(show_rois) and on_roi is not None
+    rec_conf = bool(rec_conf)
+    conf_thresh = conf_thresh if conf_thresh is not None else default_conf_thresh
+    enhance_contrast = bool(enhance_contrast)
 
-  reader = easyocr.Reader(['en'])
+  # Regions default to text unless flagged as bars
+  if vert_flags is None:
+    vert_flags = [False] * len(roi_coordinates)
+  if hor_flags is None:
+    hor_flags = [False] * len(roi_coordinates)
+
+  # Shared engine from the registry, the model is only loaded once per process
+  if ocr_engine is None:
+    ocr_engine = get_ocr_engine()
+  engine_key = model_key(ocr_engine)
+  cache = None
+  if ocr_cache is not None:
+    cache = OCRCache(ocr_cache, int(ocr_cache_mb * 1024 * 1024))
+    ocr_engine = CachedOCREngine(ocr_engine, cache)
+  # ROIs flagged here skip the text detector and go straight to the recognizer
+  if recognize_only is None:
+    recognize_only = [False] * len(roi_coordinates)
+  if profiler is None:
+    profiler = NullProfiler()
+  # Template matchers for digit-only fields, keyed by ROI index
+  digit_recognizers = {}
+  if digits is not None and any(digits):
+    digit_names = [name for name, flag in zip(roi_names, digits) if flag]
+    if digit_templates is not None and os.path.exists(digit_templates):
+      loaded = load_digit_templates(digit_templates, digit_names)
+    else:
+      loaded = {name: DigitRecognizer() for name in digit_names}
+    digit_recognizers = {i: loaded[roi_names[i]] for i, flag in enumerate(digits) if flag}
+  # Text ROIs whose crop hasn't changed since they were last OCR'd reuse that result
+  change_detector = ChangeDetector(change_tolerance) if change_tolerance is not None else None
   fps = video_capture.get(cv2.CAP_PROP_FPS)
-  extraction = 0
-  df = pd.DataFrame()
-  bright_thresh = 128
-
-  # Define a sharpening kernel
-  sharpening_kernel = -(1 / 256.0) * np.array([[1, 4, 6, 4, 1],
-                                   [4, 16, 24, 16, 4],
-                                   [6, 24, -476, 24, 6],
-                                   [4, 16, 24, 16, 4],
-                                   [1, 4, 6, 4, 1]])
-  alpha = 1.1  # Contrast control (1.0 - 3.0)
-  beta = -40 # Brightness control (-100 - 100)
+  results = ResultAccumulator()
+  # Where each ROI is in the frames the sampler yields
+  if frame_source == 'ffmpeg':
+    if video_path is None:
+      raise ValueError("frame_source='ffmpeg' needs the video_path")
+    if min_interval is not None:
+      raise ValueError("Adaptive sampling (min_interval) needs frame_source='opencv'")
+    frame_size = (int(video_capture.get(cv2.CAP_PROP_FRAME_WIDTH)), int(video_capture.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+    crop_coordinates = roi_layout(roi_coordinates, frame_size)[0]
+    show_frames = False
+  elif frame_source in ('opencv', 'live'):
+    crop_coordinates = roi_coordinates
+  else:
+    raise ValueError(f"Unknown frame_source '{frame_source}', expected 'opencv', 'ffmpeg' or 'live'")
+  live = frame_source == 'live'
+  bar_gauges = {i: BarGauge(box, vertical=vert_flags[i])
+                for i, box in enumerate(crop_coordinates) if vert_flags[i] or hor_flags[i]}
+  if bar_interval is None or not bar_gauges:
+    bar_interval = time_interval
+  if time_interval % bar_interval:
+    raise ValueError(f'time_interval ({time_interval}) must be a multiple of bar_interval ({bar_interval})')
+  if min_interval is not None and bar_interval != time_interval:
+    raise ValueError('bar_interval and adaptive sampling (min_interval) cannot be combined')
+  if live and (min_interval is not None or bar_interval != time_interval):
+    raise ValueError("Live capture can't use bar_interval or adaptive sampling (min_interval)")
+
+  # One pipeline per text ROI, its buffers are reused from frame to frame. Crops wait in the OCR batch for up
+  # to ocr_batch_frames samples, so the pipeline keeps that many outputs (plus the one on display) intact.
+  if preprocess is None:
+    preprocess = [None] * len(roi_coordinates)
+  preprocess = [preprocess_settings(enhance_contrast, overrides) for overrides in preprocess]
+  # With OCR on worker threads, crops of the batches in flight have to stay intact as well.
+  ocr_workers = 0 if live else ocr_workers
+  ring_size = ocr_batch_frames * (max(1, ocr_queue) + 1) + 1 if ocr_workers else ocr_batch_frames + 1
+  preprocessors = {i: Preprocessor(ring_size, **preprocess[i])
+                   for i in range(len(roi_coordinates)) if i not in bar_gauges}
 
   # Calculate starting and ending frame numbers
-  start_frame = int(start_time * fps)
+  if live:
+    # Nothing to seek to, frames are counted from the first one read
+    start_frame, end_frame = 0, None
+  elif seek_index is not None:
+    start_frame = seek_index.frame_at(start_time)
+    end_frame = seek_index.frames_before(end_time)
+    start_timestamp = seek_index.time_of(start_frame)
+  else:
+    start_frame = int(start_time * fps)
+    end_frame = start_frame + (end_time - start_time) * fps
+
+  # Declare the output columns up front so rows can be appended without reshaping a DataFrame
+  results.add_column('time')
+  for i, col_name in enumerate(roi_names):
+    if vert_flags[i] or hor_flags[i]:
+      results.add_column(col_name)
+    else:
+      results.add_column(col_name, object)
+      if rec_conf:
+        results.add_column(f'{col_name}_conf')
+
+  # Text crops waiting for OCR as (row, roi index, crop), sent to the recognizer together.
+  # A crop of None means the ROI was unchanged and takes the last OCR result for that ROI.
+  pending_text = []
+  pending_frames = 0
+  # Bar bands waiting to be measured, all of one bar are measured as one stack
+  pending_bars = {i: BandStack(gauge) for i, gauge in bar_gauges.items()}
+  last_texts = {}
+
+  # Pick up after the last checkpoint of an earlier run with the same settings
+  first_frame = start_frame
+  if output is not None:
+    resume_frame = output.start(run_config_hash(video_capture, roi_coordinates, roi_names, time_interval, start_time,
+                                                rec_conf, conf_thresh, enhance_contrast, recognize_only,
+                                                change_tolerance, vert_flags, hor_flags, digits, bar_interval, min_interval, preprocess,
+                                                engine_key, frame_source, ocr_batch_frames, digit_templates), resume and not live)
+    if resume_frame is not None:
+      first_frame = resume_frame
+      print(f'Resuming at frame {first_frame} after {output.rows} saved rows')
 
-  # Set video capture to starting frame
-  video_capture.set(cv2.CAP_PROP_POS_FRAMES, start_frame)
+  # Step through the samples, grabbing forward instead of seeking when the next sample is close
+  if live:
+    sampler = LiveSampler(video_capture, time_interval, end_time - start_time, max_latency, profiler, should_stop)
+  elif min_interval is not None:
+    sampler = AdaptiveSampler(video_capture, roi_coordinates, first_frame, time_interval, end_frame, min_interval,
+                              change_tolerance if change_tolerance is not None else default_tolerance, profiler,
+                              seek_index, frame_cache, video_path, fill_cache=False)
+  elif frame_source == 'ffmpeg':
+    sampler = FFmpegSampler(video_path, roi_coordinates, first_frame, bar_interval, end_frame, fps, frame_size,
+                            profiler, ring_size=decode_queue + 3)
+  else:
+    # Frames still queued, the one in the loop and the one being decoded stay intact
+    sampler = FrameSampler(video_capture, first_frame, bar_interval, end_frame, profiler=profiler,
+                           seek_index=seek_index, frame_cache=frame_cache, video_key=video_path,
+                           ring_size=None if show_frames else decode_queue + 3, fill_cache=False)
+  sample_total = 0 if live else count_samples(video_capture, first_frame, end_frame, bar_interval)
+  emitted_rows = 0
+  written_rows = 0
+  next_frame = first_frame
+  # A live source already reads on its own thread and keeps only the newest frame, a queue would defeat that
+  samples = Prefetcher(sampler, decode_queue) if decode_queue and not live else sampler
+  ocr_stage = OCRStage(ocr_workers, ocr_queue)
 
-  while video_capture.isOpened() and (((extraction)*time_interval) / fps) < (end_time - start_time):
-    ret, frame = video_capture.read()
-    if not ret:
+  for frame_index, timestamp, frame in samples:
+    if should_stop is not None and should_stop():
+      print('Extraction cancelled')
       break
-    df.at[extraction, 'time'] = extraction * time_interval / fps #Relative Timestamp
+    profiler.begin_sample(frame_index)
+    row = results.append_row()
+    if live:
+      results.set(row, 'time', timestamp)
+    elif seek_index is not None:
+      results.set(row, 'time', seek_index.time_of(frame_index) - start_timestamp) #Relative Timestamp
+    else:
+      results.set(row, 'time', (frame_index - start_frame) / fps) #Relative Timestamp
+    if min_interval is not None:
+      # Resume on the coarse grid, every adaptive sample is a full sample
+      next_frame = frame_index + time_interval - (frame_index - start_frame) % time_interval
+      text_sample = True
+    else:
+      next_frame = frame_index + bar_interval
+      text_sample = live or (frame_index - start_frame) % time_interval == 0
 
     if show_frames:
-      gui_ref.frame = frame
-      gui_ref.display_frame()
-      QApplication.processEvents()
+      with profiler.stage('gui'):
+        if on_frame is not None:
+          on_frame(frame)
+        else:
+          gui_ref.frame = frame
+          gui_ref.display_frame()
+          process_gui_events()
 
-    for i, (x1, y1, x2, y2) in enumerate(roi_coordinates):
+    for i, ((x1, y1, x2, y2), (cx1, cy1, cx2, cy2)) in enumerate(zip(roi_coordinates, crop_coordinates)):
       col_name = roi_names[i]
-      df.at[extraction, col_name] = None
-
-      #Parse vertical progres bars
-      if gui_ref.vert_flag[i]:
-        ...
-      #Parse Horizontal progress bars
-      elif gui_ref.hor_flag[i]:
-
-        #Lets get the middle 1/3
-        height = roi.shape[0]  # Original height
-        mid_height = int(height // 10)
-        if mid_height < 1:
-          mid_height = 1
-        elif mid_height > 6:
-          mid_height = 6
-        mid = y1 + abs(y2 - y1) // 2
-        mid_top = mid - mid_height
-        mid_bot = mid + mid_height
-
-        roi = cv2.cvtColor(frame[mid_top:mid_bot, x1:x2], cv2.COLOR_BGR2GRAY)
-        averaged_1d = np.mean(roi, axis=0).astype(np.uint8)
-        # Compute the gradient (absolute differences between adjacent pixels)
-        gradients = np.abs(np.diff(averaged_1d))  # Shape: (width-1,)
-        # Find the index of the strongest gradient
-        strongest_gradient_idx = np.argmax(gradients)  # Index of max gradient
-        top_3_indices = np.argsort(gradients)[-3:][::-1]  # Top 3, descending order
-
-        averaged = np.tile(averaged_1d[np.newaxis, :], (mid, 1))
-        averaged[:, strongest_gradient_idx-1:strongest_gradient_idx+1] = 255  # Mark with a white line
-        #for idx in top_3_indices:
-        #  averaged[:, idx:idx + 2] = 255  # Mark the transition with a white line
-        #edges = cv2.Canny(roi, 0, 60)
-
-        df.at[extraction, col_name] = strongest_gradient_idx/len(gradients)
+
+      #Parse vertical and horizontal progress bars
+      if i in bar_gauges:
+        # Only the thin band through the bar is kept, it is measured with the others at the next flush
+        gauge = bar_gauges[i]
+        band = pending_bars[i].append(row, frame)
         if show_rois:
-          show_roi_in_GUI(averaged, gui_ref, x1, mid_top)
+          band_x1, band_y1, _, _ = gauge.band_box
+          show_roi_in_GUI(gauge.preview(band, gauge.fill(band)), gui_ref, band_x1 + x1 - cx1, band_y1 + y1 - cy1,
+                          on_roi)
       #Parse Text
-      else:
-        roi = cv2.cvtColor(frame[y1:y2, x1:x2], cv2.COLOR_BGR2GRAY)
-        if enhance_contrast:
-          # Get the segment of the image we care about for this ROI, make gray, adjust contrast, sharpen
-          roi = cv2.filter2D(cv2.convertScaleAbs(roi, alpha=alpha, beta=beta), -1, sharpening_kernel)
+      elif text_sample:
+        with profiler.stage('preprocess', col_name):
+          roi = preprocessors[i](frame[cy1:cy2, cx1:cx2])
 
         if show_rois:
-          show_roi_in_GUI(roi, gui_ref, x1, y1)
-
-        text = reader.readtext(roi, detail=1)
-        if text:
-          if rec_conf:
-            df.at[extraction, f'{col_name}_conf'] = float(text[0][2])
-          if text[0][2] > conf_thresh:
-            extracted_text = ''.join(text[0][1])
-            if 'timestamp' in col_name:
-              extracted_text = extracted_text.replace(".",":").replace('::',':')
-            extracted_text = extracted_text.lower().replace("o", "0").replace('i','1').replace('s','5').replace('a','4').replace(',','')
-            extracted_text = re.sub(r'[^0-9:.]', '', extracted_text)
-            print('Found {text} with confidence {conf}'.format(text=extracted_text,conf=text[0][2]))
-            df.at[extraction, col_name] = extracted_text
-          else:
-            print('No text detected')
-    extraction += 1
-
-    # Set our new open frame time
-    new_frame = start_frame + (int(extraction * time_interval))
-    video_capture.set(cv2.CAP_PROP_POS_FRAMES, new_frame)
+          show_roi_in_GUI(roi, gui_ref, x1, y1, on_roi)
+
+        if change_detector is not None and not change_detector.changed(i, roi):
+          pending_text.append((row, i, None))
+        else:
+          pending_text.append((row, i, roi))
+
+    # OCR the text crops of the last few samples in one go
+    pending_frames += text_sample
+    if text_sample and pending_frames >= ocr_batch_frames:
+      measure_pending_bars(pending_bars, results, roi_names, profiler)
+      # Every row so far is complete once this batch is recorded, resuming would start at next_frame
+      finished = ocr_stage.submit((pending_text, len(results), next_frame), read_pending_text, ocr_engine,
+                                  pending_text, roi_names, recognize_only, conf_thresh, profiler, digit_recognizers)
+      pending_text = []
+      pending_frames = 0
+      for (batch, done_rows, done_frame), texts in finished:
+        record_pending_text(batch, texts, last_texts, results, roi_names, rec_conf, conf_thresh, profiler)
+        if on_results is not None:
+          on_results(results.to_dataframe(emitted_rows, done_rows))
+          emitted_rows = done_rows
+        if output is not None and done_rows - written_rows >= (1 if live else output.flush_rows):
+          with profiler.stage('write'):
+            written_rows = write_rows(output, results, written_rows, done_frame, return_results, done_rows)
 
+    if progress is not None:
+      progress(len(results), sample_total + getattr(sampler, 'refined', 0))
+    profiler.end_sample()
+
+  measure_pending_bars(pending_bars, results, roi_names, profiler)
+  finished = ocr_stage.submit((pending_text, len(results), next_frame), read_pending_text, ocr_engine, pending_text,
+                              roi_names, recognize_only, conf_thresh, profiler, digit_recognizers)
+  for (batch, _, _), texts in finished + ocr_stage.drain():
+    record_pending_text(batch, texts, last_texts, results, roi_names, rec_conf, conf_thresh, profiler)
+  ocr_stage.close()
+  if digit_recognizers and digit_templates is not None:
+    save_digit_templates(digit_templates, {roi_names[i]: recognizer for i, recognizer in digit_recognizers.items()})
+  if on_results is not None and emitted_rows < len(results):
+    on_results(results.to_dataframe(emitted_rows))
+  if output is not None:
+    with profiler.stage('write'):
+      write_rows(output, results, written_rows, next_frame, return_results)
+  profiler.close()
+  if profiler.enabled:
+    print(profiler.report())
+  if cache is not None:
+    cache.close()
+    print(f'OCR cache: {cache.hits} hits, {cache.misses} misses')
+  if live:
+    print('Live: {samples} samples of {frames} frames, {dropped} dropped, mean latency {mean_latency:.3f}s'.format(
+      **sampler.summary()))
+  if output is not None:
+    if not return_results:
+      return None
+    # Text columns stay text ('0123' must not come back as 123)
+    text_columns = [name for name, (dtype, _) in results.columns.items() if dtype == object]
+    df = output.read(dtype={name: str for name in text_columns})
+  else:
+    df = results.to_dataframe()
+
+  if profiler.enabled:
+    df.attrs['profile'] = profiler.summary()
+  if live:
+    df.attrs['live'] = sampler.summary()
+  if cache is not None:
+    df.attrs['ocr_cache'] = {'hits': cache.hits, 'misses': cache.misses}
+  if change_detector is not None:
+    df.attrs['change_detection'] = change_detector.summary()
+    print('Skipped OCR on {skips} of {checks} unchanged crops ({rate:.0%})'.format(
+      skips=change_detector.skips, checks=change_detector.checks, rate=change_detector.skip_rate))
   return df
 
 
-def show_roi_in_GUI(image, gui_ref, x1, y1):
+def measure_pending_bars(pending_bars, results, roi_names, profiler):
+  # One array operation per bar for every band collected since the last flush
+  for i, bands in pending_bars.items():
+    if bands:
+      with profiler.stage('bar', roi_names[i]):
+        measured = bands.measure()
+      for row, fill in measured:
+        results.set(row, roi_names[i], fill)
+
+
+def read_pending_text(ocr_engine, pending_text, roi_names, recognize_only, conf_thresh, profiler, digit_recognizers):
+  # The OCR stage: raw results for a batch of (row, roi index, crop), None where the crop was unchanged.
+  # May run on an OCR worker thread, so it only reads the batch and leaves recording to record_pending_text.
+  texts = [None] * len(pending_text)
+  ocr = [k for k, (_, _, roi) in enumerate(pending_text) if roi is not None]
+
+  # Digit fields the template matcher is confident about never reach easyocr
+  digit = [k for k in ocr if pending_text[k][1] in digit_recognizers and digit_recognizers[pending_text[k][1]].ready]
+  if digit:
+    with profiler.stage('digits', [roi_names[pending_text[k][1]] for k in digit]):
+      for k in digit:
+        text = digit_recognizers[pending_text[k][1]].readtext(pending_text[k][2])
+        if text and text[0][2] >= default_min_confidence:
+          texts[k] = text
+
+  # Recognize-only ROIs next, the whole crop is read as one line
+  recognize = [k for k in ocr if texts[k] is None and recognize_only[pending_text[k][1]]]
+  if recognize:
+    with profiler.stage('ocr', [roi_names[pending_text[k][1]] for k in recognize]):
+      found = ocr_engine.recognize_batch([pending_text[k][2] for k in recognize])
+    for k, text in zip(recognize, found):
+      if text and text[0][2] > conf_thresh:
+        texts[k] = text
+        learn_digits(digit_recognizers, pending_text[k], text)
+
+  # Everything else, plus recognize-only crops that weren't confident enough, goes through full detection
+  detect = [k for k in ocr if texts[k] is None]
+  if detect:
+    with profiler.stage('ocr', [roi_names[pending_text[k][1]] for k in detect]):
+      found = ocr_engine.readtext_batch([pending_text[k][2] for k in detect])
+    for k, text in zip(detect, found):
+      texts[k] = text
+      learn_digits(digit_recognizers, pending_text[k], text)
+  return texts
+
+
+def record_pending_text(pending_text, texts, last_texts, results, roi_names, rec_conf, conf_thresh, profiler):
+  # Batches are recorded in the order they were sampled, so unchanged crops take the text read just before them
+  with profiler.stage('postprocess'):
+    for (row, i, roi), text in zip(pending_text, texts):
+      if roi is None:
+        text = last_texts.get(i)
+      else:
+        last_texts[i] = text
+      record_text_result(results, row, roi_names[i], text, rec_conf, conf_thresh)
+
+
+def learn_digits(digit_recognizers, pending, text):
+  # Confident easyocr reads of a digit field become templates for its DigitRecognizer
+  _, i, roi = pending
+  if i in digit_recognizers and text and text[0][2] >= default_learn_confidence:
+    digit_recognizers[i].learn(roi, text[0][1])
+
+
+def record_text_result(results, row, col_name, text, rec_conf, conf_thresh):
+  if text:
+    if rec_conf:
+      results.set(row, f'{col_name}_conf', float(text[0][2]))
+    if text[0][2] > conf_thresh:
+      extracted_text = ''.join(text[0][1])
+      if 'timestamp' in col_name:
+        extracted_text = extracted_text.replace(".",":").replace('::',':')
+      extracted_text = extracted_text.lower().replace("o", "0").replace('i','1').replace('s','5').replace('a','4').replace(',','')
+      extracted_text = re.sub(r'[^0-9:.]', '', extracted_text)
+      print('Found {text} with confidence {conf}'.format(text=extracted_text,conf=text[0][2]))
+      results.set(row, col_name, extracted_text)
+    else:
+      print('No text detected')
+
+
+def write_rows(output, results, written_rows, next_frame, keep_rows, stop=None):
+  # Rows [written_rows, stop) go to the output, stop defaults to every row so far
+  stop = len(results) if stop is None else stop
+  output.write(results.to_dataframe(written_rows, stop), next_frame)
+  if not keep_rows:
+    results.release(stop)
+  return stop
+
+
+def run_config_hash(video_capture, *settings):
+  # Identifies a run for checkpointing: the video (frame count and size) plus every setting that changes output
+  video = [video_capture.get(cv2.CAP_PROP_FRAME_COUNT), video_capture.get(cv2.CAP_PROP_FPS),
+           video_capture.get(cv2.CAP_PROP_FRAME_WIDTH), video_capture.get(cv2.CAP_PROP_FRAME_HEIGHT)]
+  return hashlib.sha256(json.dumps([video, *settings], default=str).encode()).hexdigest()
+
+
+def count_samples(video_capture, start_frame, end_frame, time_interval):
+  frame_count = video_capture.get(cv2.CAP_PROP_FRAME_COUNT)
+  if frame_count > 0:
+    end_frame = min(end_frame, frame_count)
+  return max(0, int(-(-(end_frame - start_frame) // time_interval)))
+
+
+def show_roi_in_GUI(image, gui_ref, x1, y1, on_roi=None):
+  if on_roi is not None:
+    on_roi(image, x1, y1)
+    return
   gui_ref.display_roi(image, x1, y1)
+  process_gui_events()
+
+
+def process_gui_events():
+  # Qt is only imported when there is a GUI to keep alive, headless runs never load PyQt5
+  from PyQt5.QtWidgets import QApplication
   QApplication.processEvents()
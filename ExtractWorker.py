@@ -0,0 +1,65 @@
+import threading
+import time
+
+from PyQt5.QtCore import Qt, QObject, QThread, pyqtSignal
+
+from ExtractText import extract_text_from_video
+
+
+class ExtractWorker(QObject):
+    # Runs an extraction function (extract_text_from_video or extract_text_parallel) on a QThread.
+    # The GUI only listens to the signals, nothing in the extraction loop touches a widget.
+    progress = pyqtSignal(int, int, float, float)  # samples done, sample total, ETA (s), samples/s
+    frame_ready = pyqtSignal(object)
+    roi_ready = pyqtSignal(object, int, int)
+    results_ready = pyqtSignal(object)  # DataFrame of newly finished rows
+    finished = pyqtSignal(object)  # Full DataFrame, partial if cancelled
+    failed = pyqtSignal(str)
+
+    def __init__(self, extract=extract_text_from_video, **kwargs):
+        super().__init__()
+        self.extract = extract
+        self.kwargs = kwargs
+        self.cancel_event = threading.Event()
+        self.started_at = None
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    @property
+    def cancelled(self):
+        return self.cancel_event.is_set()
+
+    def report_progress(self, done, total):
+        elapsed = time.perf_counter() - self.started_at
+        rate = done / elapsed if elapsed > 0 else 0.0
+        eta = (total - done) / rate if rate > 0 and total else 0.0  # No total for live sources
+        self.progress.emit(done, total, eta, rate)
+
+    def run(self):
+        self.started_at = time.perf_counter()
+        callbacks = {'progress': self.report_progress, 'should_stop': self.cancel_event.is_set}
+        if self.extract is extract_text_from_video:
+            # Shown frames are never decoded into the sampler's ring, but ROI crops can come from a Preprocessor
+            # ring the extraction writes again before the GUI thread gets to paint them, so those are copied
+            callbacks.update(on_frame=self.frame_ready.emit,
+                             on_roi=lambda image, x, y: self.roi_ready.emit(image.copy(), x, y),
+                             on_results=self.results_ready.emit)
+        try:
+            df = self.extract(**self.kwargs, **callbacks)
+        except Exception as e:
+            self.failed.emit(f'{type(e).__name__}: {e}')
+            return
+        self.finished.emit(df)
+
+
+def start_worker(worker):
+    # Move the worker onto its own thread and start it. Keep a reference to the returned thread.
+    thread = QThread()
+    worker.moveToThread(thread)
+    thread.started.connect(worker.run)
+    # Direct so the thread stops as soon as run() returns, even while the GUI thread is busy
+    worker.finished.connect(thread.quit, Qt.DirectConnection)
+    worker.failed.connect(thread.quit, Qt.DirectConnection)
+    thread.start()
+    return thread
@@ -0,0 +1,140 @@
+import functools
+import itertools
+import shutil
+import subprocess
+import tempfile
+
+import numpy as np
+
+from Profiler import NullProfiler
+
+default_ffmpeg = 'ffmpeg'
+stack_ratio = 0.75  # Stack the ROIs when that shrinks the output below this share of their bounding box
+default_ring_size = 2
+
+
+def roi_layout(roi_coordinates, frame_size=None):
+    # Where each ROI ends up in the frames ffmpeg sends back. Returns (local_coordinates, output_size, crops)
+    # with crops as (x, y, width, height) in the source frame. ROIs close together are cut out as their
+    # bounding box; ROIs spread over the frame are cut out one by one and stacked vertically instead.
+    boxes = []
+    for x1, y1, x2, y2 in roi_coordinates:
+        if frame_size is not None:
+            x1, x2 = max(0, min(x1, frame_size[0])), max(0, min(x2, frame_size[0]))
+            y1, y2 = max(0, min(y1, frame_size[1])), max(0, min(y2, frame_size[1]))
+        boxes.append((x1, y1, max(x2, x1 + 1), max(y2, y1 + 1)))
+
+    ux1, uy1 = min(b[0] for b in boxes), min(b[1] for b in boxes)
+    ux2, uy2 = max(b[2] for b in boxes), max(b[3] for b in boxes)
+    stack_width = max(x2 - x1 for x1, _, x2, _ in boxes)
+    stack_height = sum(y2 - y1 for _, y1, _, y2 in boxes)
+    if len(boxes) > 1 and stack_width * stack_height < stack_ratio * (ux2 - ux1) * (uy2 - uy1):
+        local, top = [], 0
+        for x1, y1, x2, y2 in boxes:
+            local.append((0, top, x2 - x1, top + y2 - y1))
+            top += y2 - y1
+        crops = [(x1, y1, x2 - x1, y2 - y1) for x1, y1, x2, y2 in boxes]
+        return local, (stack_width, stack_height), crops
+    local = [(x1 - ux1, y1 - uy1, x2 - ux1, y2 - uy1) for x1, y1, x2, y2 in boxes]
+    return local, (ux2 - ux1, uy2 - uy1), [(ux1, uy1, ux2 - ux1, uy2 - uy1)]
+
+
+@functools.lru_cache()
+def passthrough_options(ffmpeg):
+    # Keep every selected frame as it is: -fps_mode since ffmpeg 5.1, where -vsync is deprecated
+    try:
+        help_text = subprocess.run([ffmpeg, '-hide_banner', '-h', 'long'], capture_output=True, timeout=10).stdout
+    except (OSError, subprocess.SubprocessError):
+        help_text = b''
+    return ['-fps_mode', 'passthrough'] if b'-fps_mode' in help_text else ['-vsync', '0']
+
+
+def filter_graph(crops, output_size, interval):
+    # Frame selection first so ffmpeg only crops (and converts to BGR) the frames we keep
+    select = f"select='not(mod(n\\,{interval}))'"
+    if len(crops) == 1:
+        x, y, width, height = crops[0]
+        return f'[0:v]{select},crop={width}:{height}:{x}:{y}[out]'
+    labels = ''.join(f'[s{n}]' for n in range(len(crops)))
+    parts = [f'[0:v]{select},split={len(crops)}{labels}']
+    for n, (x, y, width, height) in enumerate(crops):
+        parts.append(f'[s{n}]crop={width}:{height}:{x}:{y},pad={output_size[0]}:{height}:0:0[c{n}]')
+    parts.append(''.join(f'[c{n}]' for n in range(len(crops))) + f'vstack=inputs={len(crops)}[out]')
+    return ';'.join(parts)
+
+
+class FFmpegSampler:
+    # Drop-in for FrameSampler that has a local ffmpeg process do the decoding. ffmpeg selects the sampled
+    # frames and crops the ROIs out of them itself, so only those pixels are converted and piped back as raw
+    # BGR, and they are read straight into reused NumPy buffers. The frames it yields are not full frames:
+    # each ROI is at local_coordinates[i] instead. A frame stays valid while the next ring_size - 1 are read.
+    # Frame indices assume a constant frame rate, like the rest of the extraction.
+    def __init__(self, video_path, roi_coordinates, start_frame=0, interval=1, end_frame=None, fps=30.0,
+                 frame_size=None, profiler=None, ffmpeg=default_ffmpeg, ring_size=default_ring_size):
+        self.video_path = video_path
+        self.start_frame = int(start_frame)
+        self.interval = max(1, int(interval))
+        self.end_frame = end_frame
+        self.fps = fps
+        self.profiler = profiler if profiler is not None else NullProfiler()
+        self.ffmpeg = ffmpeg
+        self.ring_size = max(1, ring_size)
+        self.local_coordinates, self.output_size, self.crops = roi_layout(roi_coordinates, frame_size)
+        self.process = None
+        self.errors = None
+
+    def timestamp(self, frame_index):
+        return frame_index / self.fps if self.fps else 0.0
+
+    def command(self):
+        command = [self.ffmpeg, '-v', 'error', '-nostdin']
+        if self.start_frame:
+            command += ['-ss', f'{self.start_frame / self.fps:.6f}']
+        command += ['-i', self.video_path,
+                    '-filter_complex', filter_graph(self.crops, self.output_size, self.interval),
+                    '-map', '[out]'] + passthrough_options(self.ffmpeg)
+        if self.end_frame is not None:
+            command += ['-frames:v', str(max(0, int(-(-(self.end_frame - self.start_frame) // self.interval))))]
+        return command + ['-f', 'rawvideo', '-pix_fmt', 'bgr24', 'pipe:1']
+
+    def __iter__(self):
+        if shutil.which(self.ffmpeg) is None:
+            raise IOError(f"'{self.ffmpeg}' was not found, install ffmpeg or use the OpenCV frame source")
+        width, height = self.output_size
+        buffers = [np.empty((height, width, 3), dtype=np.uint8) for _ in range(self.ring_size)]
+        # stderr goes to a file, a pipe nobody reads could fill up and stall ffmpeg
+        self.errors = tempfile.TemporaryFile()
+        self.process = subprocess.Popen(self.command(), stdout=subprocess.PIPE, stderr=self.errors, bufsize=0)
+        try:
+            frame_index = self.start_frame
+            for n in itertools.count():
+                frame = buffers[n % self.ring_size]
+                with self.profiler.stage('decode'):
+                    if not self.read_into(memoryview(frame).cast('B')):
+                        break
+                yield frame_index, self.timestamp(frame_index), frame
+                frame_index += self.interval
+        finally:
+            self.close()
+
+    def read_into(self, view):
+        filled = 0
+        while filled < len(view):
+            count = self.process.stdout.readinto(view[filled:])
+            if not count:
+                if filled == 0 and self.process.wait() != 0:
+                    self.errors.seek(0)
+                    raise IOError(f'ffmpeg failed on {self.video_path}: '
+                                  f'{self.errors.read().decode(errors="replace").strip()}')
+                return False
+            filled += count
+        return True
+
+    def close(self):
+        if self.process is not None:
+            if self.process.poll() is None:
+                self.process.kill()
+            self.process.wait()
+            self.process.stdout.close()
+            self.errors.close()
+            self.process = None
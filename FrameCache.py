@@ -0,0 +1,49 @@
+import threading
+from collections import OrderedDict
+
+default_cache_mb = 256
+
+
+class FrameCache:
+    # Decoded frames keyed by (video, frame index), least recently used dropped first once they add up to
+    # more than max_bytes. Shared between the GUI thread and a worker, so every access takes the lock.
+    # Cached frames are made read-only: the same array is handed to every caller.
+    def __init__(self, max_bytes=default_cache_mb * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.frames = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.frames)
+
+    def get(self, video, frame_index):
+        with self.lock:
+            frame = self.frames.get((video, frame_index))
+            if frame is None:
+                self.misses += 1
+                return None
+            self.frames.move_to_end((video, frame_index))
+            self.hits += 1
+            return frame
+
+    def put(self, video, frame_index, frame):
+        if frame.nbytes > self.max_bytes:
+            return
+        frame.flags.writeable = False
+        with self.lock:
+            old = self.frames.pop((video, frame_index), None)
+            if old is not None:
+                self.bytes -= old.nbytes
+            self.frames[(video, frame_index)] = frame
+            self.bytes += frame.nbytes
+            while self.bytes > self.max_bytes:
+                _, evicted = self.frames.popitem(last=False)
+                self.bytes -= evicted.nbytes
+
+    def clear(self, video=None):
+        with self.lock:
+            for key in [key for key in self.frames if video is None or key[0] == video]:
+                self.bytes -= self.frames.pop(key).nbytes
@@ -0,0 +1,111 @@
+import cv2
+
+from Profiler import NullProfiler
+
+# Frames between keyframes assumed when the caller doesn't know the GOP length (x264's default keyint)
+default_gop_size = 250
+# A seek costs about as much as decoding this many frames, closer keyframes are decoded through instead
+seek_cost_frames = 16
+
+
+class FrameSampler:
+    # Walks a cv2.VideoCapture every `interval` frames. Short hops are decoded forward with grab(),
+    # which is much cheaper than a CAP_PROP_POS_FRAMES seek that has to go back to the previous
+    # keyframe and re-decode. Real seeks are only used going backwards or further than a GOP ahead.
+    # With a SeekIndex the keyframes are known: the sampler grabs forward unless a keyframe lies in between,
+    # and then seeks to that keyframe (which lands exactly) and grabs forward from it.
+    # With a FrameCache, frames already decoded for `video_key` are served from it without touching the capture,
+    # and unless fill_cache is False the frames decoded here are added to it.
+    # With a ring_size (and no cache being filled, which keeps the frames it is given) frames are decoded into
+    # that many buffers in turn instead of a new array each: a frame stays valid until ring_size more are read.
+    def __init__(self, video_capture, start_frame=0, interval=1, end_frame=None, gop_size=default_gop_size,
+                 profiler=None, seek_index=None, frame_cache=None, video_key=None, ring_size=None, fill_cache=True):
+        self.video_capture = video_capture
+        self.profiler = profiler if profiler is not None else NullProfiler()
+        self.fps = video_capture.get(cv2.CAP_PROP_FPS)
+        self.seek_index = seek_index
+        self.frame_cache = frame_cache
+        self.fill_cache = fill_cache and frame_cache is not None
+        self.video_key = video_key
+        self.start_frame = int(start_frame)
+        self.interval = max(1, int(interval))
+        if end_frame is None and seek_index is not None:
+            end_frame = seek_index.frame_count
+        elif end_frame is None and video_capture.get(cv2.CAP_PROP_FRAME_COUNT) > 0:
+            end_frame = video_capture.get(cv2.CAP_PROP_FRAME_COUNT)
+        self.end_frame = end_frame
+        self.gop_size = gop_size
+        self.frames = [None] * ring_size if ring_size and not self.fill_cache else None
+        self.slot = 0
+        self.position = int(video_capture.get(cv2.CAP_PROP_POS_FRAMES))  # Index of the next frame read() returns
+        self.seeks = 0
+        self.grabs = 0
+
+    def timestamp(self, frame_index):
+        if self.seek_index is not None:
+            return self.seek_index.time_of(frame_index)
+        return frame_index / self.fps if self.fps else 0.0
+
+    def frame_indices(self):
+        frame_index = self.start_frame
+        while self.end_frame is None or frame_index < self.end_frame:
+            yield frame_index
+            frame_index += self.interval
+
+    def seek(self, frame_index):
+        skip = frame_index - self.position
+        keyframe = self.seek_index.keyframe_before(frame_index) if self.seek_index is not None else None
+        if keyframe is not None:
+            if skip < 0 or keyframe - self.position > seek_cost_frames:
+                self.set_position(keyframe)
+            return self.grab_to(frame_index)
+        if 0 <= skip <= self.gop_size:
+            return self.grab_to(frame_index)
+        self.set_position(frame_index)
+        return True
+
+    def set_position(self, frame_index):
+        self.video_capture.set(cv2.CAP_PROP_POS_FRAMES, frame_index)
+        self.position = frame_index
+        self.seeks += 1
+
+    def grab_to(self, frame_index):
+        while self.position < frame_index:
+            if not self.video_capture.grab():
+                return False
+            self.position += 1
+            self.grabs += 1
+        return True
+
+    def read_at(self, frame_index):
+        if self.frame_cache is not None:
+            frame = self.frame_cache.get(self.video_key, frame_index)
+            if frame is not None:
+                return frame_index, self.timestamp(frame_index), frame
+        with self.profiler.stage('seek'):
+            if not self.seek(frame_index):
+                return None
+        with self.profiler.stage('decode'):
+            if self.frames is None:
+                ret, frame = self.video_capture.read()
+            else:
+                # OpenCV decodes into the buffer when the size matches and allocates a new one otherwise
+                self.slot = (self.slot + 1) % len(self.frames)
+                ret, frame = self.video_capture.read(self.frames[self.slot])
+                if ret:
+                    self.frames[self.slot] = frame
+        if not ret:
+            return None
+        self.position = frame_index + 1
+        if self.fill_cache:
+            self.frame_cache.put(self.video_key, frame_index, frame)
+        return frame_index, self.timestamp(frame_index), frame
+
+    def __iter__(self):
+        for frame_index in self.frame_indices():
+            if not self.video_capture.isOpened():
+                break
+            sample = self.read_at(frame_index)
+            if sample is None:
+                break
+            yield sample
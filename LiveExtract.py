@@ -0,0 +1,91 @@
+import argparse
+
+import cv2
+
+from ExtractJob import read_job_file, validate_job, scale_rois, extraction_options
+from ExtractText import extract_text_from_video
+from LiveSampler import default_max_latency
+from OCREngine import get_ocr_engine
+from ResultWriter import ResultWriter
+
+default_output = 'live.csv'
+
+
+def open_source(source):
+    # A device number ('0' from the command line too) opens that camera, anything else is a file or stream URL
+    if isinstance(source, cv2.VideoCapture):
+        return source
+    if isinstance(source, str) and source.isdigit():
+        source = int(source)
+    return cv2.VideoCapture(source)
+
+
+def extract_text_live(source, roi_coordinates, roi_names, time_interval=1, duration=None,
+                      max_latency=default_max_latency, overwrite=False, **options):
+    # Watches a live source (camera, RTSP/UDP stream, or a file read as if it were one) and OCRs the newest
+    # frame whenever the previous sample is done, every time_interval frames at most. Rows go to
+    # on_results / output as soon as each sample is read. Runs for `duration` seconds, or until the source
+    # ends or should_stop() returns True. Other keyword options are passed on to extract_text_from_video.
+    # A live session never resumes, so an output that already holds rows is only replaced with overwrite=True.
+    output = options.get('output')
+    if output is not None and not overwrite and output.has_results():
+        raise FileExistsError(f'{output.path} already holds results, choose another output or overwrite it')
+    video_capture = open_source(source)
+    if not video_capture.isOpened():
+        raise IOError(f'Could not open live source {source}')
+    try:
+        return extract_text_from_video(video_capture=video_capture,
+                                       roi_coordinates=roi_coordinates,
+                                       roi_names=roi_names,
+                                       time_interval=time_interval,
+                                       start_time=0.0,
+                                       end_time=duration if duration is not None else float('inf'),
+                                       frame_source='live',
+                                       max_latency=max_latency,
+                                       **options)
+    finally:
+        video_capture.release()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Read on-screen text and gauges from a live source as it plays.')
+    parser.add_argument('job', help='JSON or YAML job file with the fields to read (its video is not used)')
+    parser.add_argument('source', help='Capture device number, stream URL (rtsp://, udp://, ...) or file')
+    parser.add_argument('-o', '--output', help=f"New CSV or Parquet file rows are appended to as they come "
+                                               f"(default: the job's output or {default_output})")
+    parser.add_argument('-d', '--duration', type=float, help='Stop after this many seconds (default: until the '
+                                                             'source ends or Ctrl+C)')
+    parser.add_argument('--overwrite', action='store_true', help='Replace an output file that already has rows')
+    parser.add_argument('--max-latency', type=float, default=default_max_latency,
+                        help='Skip frames older than this many seconds by the time they would be read')
+    args = parser.parse_args(argv)
+
+    job = read_job_file(args.job)
+    job = validate_job(dict(job, video=args.source, output=args.output or job.get('output') or default_output,
+                            frame_source='opencv'))
+    output = ResultWriter(job['output'])
+    if not args.overwrite and output.has_results():
+        parser.error(f"{job['output']} already holds results, choose another --output or pass --overwrite")
+    video_capture = open_source(args.source)
+    if not video_capture.isOpened():
+        raise IOError(f'Could not open live source {args.source}')
+    job = scale_rois(job, (int(video_capture.get(cv2.CAP_PROP_FRAME_WIDTH)),
+                           int(video_capture.get(cv2.CAP_PROP_FRAME_HEIGHT))))
+    options = extraction_options(job)
+    options.pop('frame_source')
+
+    def show(df):
+        for _, row in df.iterrows():
+            print(' '.join(f'{name}={value}' for name, value in row.items() if not name.endswith('_conf')))
+
+    try:
+        extract_text_live(video_capture, time_interval=job['interval'], duration=args.duration,
+                          max_latency=args.max_latency, ocr_engine=get_ocr_engine(job['languages'], job['gpu']),
+                          output=output, overwrite=True, return_results=False, on_results=show, **options)
+    except KeyboardInterrupt:
+        pass  # Every finished row is already in the output
+    print(f"Rows written to {job['output']}")
+
+
+if __name__ == '__main__':
+    main()
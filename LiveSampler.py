@@ -0,0 +1,110 @@
+import threading
+import time
+
+from Profiler import NullProfiler
+
+default_max_latency = 1.0  # Seconds a frame may wait before it is too old to be worth reading
+# Seconds close() waits for the reader thread. A stalled stream can block grab() for good, the thread is a daemon
+# and is left behind then, to finish once its capture is released
+close_timeout = 2.0
+
+
+class LiveSampler:
+    # Frame source for live captures (devices, network streams) that can't seek and don't wait for us.
+    # A reader thread keeps draining the capture and holds on to the newest frame only; every sample
+    # takes whatever is newest at least `interval` frames after the previous sample, so when OCR falls
+    # behind the frames in between are dropped instead of piling up. A frame that is already older than
+    # max_latency when its turn comes (the source stalled and then delivered a burst) is skipped too.
+    # Yields (frame_index, timestamp, frame) with frames counted from the first one read and timestamps
+    # in seconds since then. Stops when the source ends, after `duration` seconds, when should_stop() returns
+    # True (checked while waiting on a stalled source too) or when close() is called.
+    def __init__(self, video_capture, interval=1, duration=None, max_latency=default_max_latency, profiler=None,
+                 should_stop=None):
+        self.video_capture = video_capture
+        self.interval = max(1, int(interval))
+        self.duration = duration
+        self.max_latency = max_latency
+        self.profiler = profiler if profiler is not None else NullProfiler()
+        self.should_stop = should_stop
+        self.condition = threading.Condition()
+        self.latest = None  # (frame_index, timestamp, frame, captured_at)
+        self.wanted = 0  # Frames before this index are only grabbed, never converted
+        self.ended = False
+        self.started_at = None
+        self.thread = None
+        self.frames = 0
+        self.dropped = 0  # Frames replaced by a newer one before a sample took them
+        self.stale = 0  # Frames skipped for being older than max_latency
+        self.samples = 0
+        self.latency_total = 0.0
+        self.latency_max = 0.0
+
+    def read_frames(self):
+        frame_index = 0
+        while not self.ended:
+            if not self.video_capture.grab():
+                break
+            captured_at = time.perf_counter()
+            if frame_index >= self.wanted:
+                ok, frame = self.video_capture.retrieve()
+                if ok:
+                    with self.condition:
+                        if self.latest is not None:
+                            self.dropped += 1
+                        self.latest = (frame_index, captured_at - self.started_at, frame, captured_at)
+                        self.condition.notify()
+            frame_index += 1
+            self.frames = frame_index
+        with self.condition:
+            self.ended = True
+            self.condition.notify()
+
+    def take(self):
+        with self.condition:
+            while self.latest is None and not self.ended:
+                if self.should_stop is not None and self.should_stop():
+                    break
+                if self.duration is not None and time.perf_counter() - self.started_at > self.duration:
+                    break
+                self.condition.wait(0.1)
+            sample, self.latest = self.latest, None
+            if sample is not None:
+                self.wanted = sample[0] + self.interval
+            return sample
+
+    def __iter__(self):
+        self.started_at = time.perf_counter()
+        self.thread = threading.Thread(target=self.read_frames, daemon=True)
+        self.thread.start()
+        try:
+            while True:
+                with self.profiler.stage('decode'):
+                    sample = self.take()
+                if sample is None:
+                    break
+                frame_index, timestamp, frame, captured_at = sample
+                if self.duration is not None and timestamp > self.duration:
+                    break
+                if time.perf_counter() - captured_at > self.max_latency:
+                    self.stale += 1
+                    continue
+                yield frame_index, timestamp, frame
+                # Back here once the caller is done with the sample: capture to finished result
+                latency = time.perf_counter() - captured_at
+                self.samples += 1
+                self.latency_total += latency
+                self.latency_max = max(self.latency_max, latency)
+        finally:
+            self.close()
+
+    def close(self):
+        with self.condition:
+            self.ended = True
+        if self.thread is not None:
+            self.thread.join(timeout=close_timeout)
+            self.thread = None
+
+    def summary(self):
+        return {'frames': self.frames, 'samples': self.samples, 'dropped': self.dropped, 'stale': self.stale,
+                'mean_latency': self.latency_total / self.samples if self.samples else 0.0,
+                'max_latency': self.latency_max}
@@ -1,25 +1,48 @@
+import threading
+
 import cv2
-from PyQt5.QtCore import Qt, QPointF, QDir, QFileInfo, QUrl
-from PyQt5.QtGui import QImage, QPixmap
+from PyQt5.QtCore import QPointF, QDir, QFileInfo, QUrl, QTimer, pyqtSignal
 from PyQt5.QtWidgets import QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QLineEdit, QPushButton, QLabel, QCheckBox, \
     QGraphicsScene, QFileDialog
 
-from ExtractText import extract_text_from_video
+from ExtractJob import save_job, validate_job, extraction_options
+from ExtractWorker import ExtractWorker, start_worker
+from FrameCache import FrameCache
+from FrameSampler import FrameSampler
+from OCRCache import cache_suffix
+from OCREngine import get_ocr_engine
+from ParallelExtract import extract_text_parallel
+from Preprocessor import Preprocessor, preprocess_settings
+from PreviewRenderer import PreviewRenderer, default_preview_fps
+from ResultWriter import ResultWriter
+from SeekIndex import SeekIndex
 from VideoCanvas import VideoCanvas
 
 default_path = ''
 default_scale = '2'
 default_interval = '30'  
+default_change_tolerance = ''  # Off, like job files; 24 is a good start when OCR is the bottleneck
+preview_delay_ms = 300  # Start Time edits settle for this long before the preview seeks
 
 class VideoOCRApp(QMainWindow):
+    index_ready = pyqtSignal(str, object)  # video path, SeekIndex built for it in the background
+
     def __init__(self):
         super().__init__()
         self.initUI()
         self.video_capture = None
+        self.seek_index = None
+        self.index_ready.connect(self.set_seek_index)
+        self.frame_cache = FrameCache()
+        self.preview_index = None  # Frame at Start Time, the one shown between runs
         self.frame = None
         self.csv_path = "output.csv"
         self.region_fields = []
         self.b_record_confidence = False
+        self.ocr_engine = None
+        self.worker = None
+        self.worker_thread = None
+        self.progress_text = ''
 
     def initUI(self):
         self.setWindowTitle('Video OCR Tool')
@@ -58,9 +81,13 @@ class VideoOCRApp(QMainWindow):
         h_layout.addWidget(self.stop_time)
         layout.addLayout(h_layout)
 
-        # Immediately update the preview if these change
-        self.scale_factor.textChanged.connect(self.update_preview)
-        self.start_time.textChanged.connect(self.update_preview)
+        # Update the preview if these change, once typing pauses so "120" seeks once rather than three times
+        self.preview_timer = QTimer(self)
+        self.preview_timer.setSingleShot(True)
+        self.preview_timer.setInterval(preview_delay_ms)
+        self.preview_timer.timeout.connect(self.update_preview)
+        self.scale_factor.textChanged.connect(self.resize_canvas_to_video)
+        self.start_time.textChanged.connect(lambda: self.preview_timer.start())
 
         # Start OCR button & OCR confidence settings
         h_layout = QHBoxLayout()
@@ -69,12 +96,18 @@ class VideoOCRApp(QMainWindow):
         self.conf_thresh.setFixedWidth(40)
         h_layout.addWidget(QLabel('OCR Conf. Threshold:'),0)
         h_layout.addWidget(self.conf_thresh,0)
+        #Skip OCR on fields that haven't changed (blank to always OCR)
+        self.change_tolerance = QLineEdit(default_change_tolerance)
+        self.change_tolerance.setFixedWidth(30)
+        h_layout.addWidget(QLabel('Change Tol.:'),0)
+        h_layout.addWidget(self.change_tolerance,0)
         #Confidence
         self.record_confidence = QCheckBox('Record Conf.')
         h_layout.addWidget(self.record_confidence,0)
         layout.addLayout(h_layout)
         #Contrast
         self.enhance_contrast = QCheckBox('Enhance Contrast')
+        self.enhance_contrast.stateChanged.connect(self.redraw_preview)
         h_layout.addWidget(self.enhance_contrast,0)
         layout.addLayout(h_layout)
         #show frames?
@@ -85,18 +118,38 @@ class VideoOCRApp(QMainWindow):
         #show ROIs
         self.show_rois = QCheckBox('Show Fields')
         self.show_rois.setCheckState(2) #Set checked by default
+        self.show_rois.stateChanged.connect(self.redraw_preview)
         h_layout.addWidget(self.show_rois,0)
         layout.addLayout(h_layout)
+        #Cap on preview redraws while a run is going, independent of how fast samples come in
+        self.preview_fps = QLineEdit(f'{default_preview_fps:g}')
+        self.preview_fps.setFixedWidth(30)
+        self.preview_fps.textChanged.connect(self.set_preview_fps)
+        h_layout.addWidget(QLabel('Preview FPS:'),0)
+        h_layout.addWidget(self.preview_fps,0)
+        #Worker processes, more than 1 splits the video into shards and runs without preview
+        self.workers = QLineEdit('1')
+        self.workers.setFixedWidth(30)
+        h_layout.addWidget(QLabel('Workers:'),0)
+        h_layout.addWidget(self.workers,0)
+        #Save the current settings and fields as a job file for ExtractJob.py
+        save_job_btn = QPushButton('Save Job')
+        h_layout.addWidget(save_job_btn,0)
+        save_job_btn.clicked.connect(self.save_job)
         #Start
-        start_btn = QPushButton('Start OCR')
-        h_layout.addWidget(start_btn,1)
-        start_btn.clicked.connect(self.start_processing)
+        self.start_btn = QPushButton('Start OCR')
+        h_layout.addWidget(self.start_btn,1)
+        self.start_btn.clicked.connect(self.start_processing)
+        #Progress and the latest values while a run is going
+        self.status = QLabel('')
+        layout.addWidget(self.status)
 
         # Canvas for image display and  region selection
         self.scene = QGraphicsScene()
         self.view = VideoCanvas(self.scene)
         self.view.rectFinished.connect(self.add_region_info)
         layout.addWidget(self.view)
+        self.preview = PreviewRenderer(self.scene, self.view)
 
         # Region info container
         self.region_container = QWidget()
@@ -123,20 +176,28 @@ class VideoOCRApp(QMainWindow):
     def update_preview(self):
         if self.video_capture and self.video_capture.isOpened():
             try:
-                start_frame = int(float(self.start_time.text()) * self.video_capture.get(cv2.CAP_PROP_FPS))
+                start_time = float(self.start_time.text())
+                if self.seek_index is not None:
+                    self.preview_index = self.seek_index.frame_at(start_time)
+                else:
+                    self.preview_index = int(start_time * self.video_capture.get(cv2.CAP_PROP_FPS))
             except:
-                start_frame = 0
+                self.preview_index = 0
                 print('Start time error!')
-            self.video_capture.set(cv2.CAP_PROP_POS_FRAMES, start_frame)
-            ret, frame = self.video_capture.read()
-            if ret:
-                self.frame = []
+            frame = self.preview_frame()
+            if frame is not None:
                 self.frame = frame
                 self.resize_canvas_to_video()
-                self.display_frame()
+                self.redraw_preview()
         else:
             print("Error opening video file")
 
+    def preview_frame(self):
+        # Decoded once, then served from the cache for redraws (and for the first sample of a run)
+        sample = FrameSampler(self.video_capture, seek_index=self.seek_index, frame_cache=self.frame_cache,
+                              video_key=self.file_path.text()).read_at(self.preview_index)
+        return None if sample is None else sample[2]
+
     def select_file(self):
         file_path, _ = QFileDialog.getOpenFileName(self, "Select Video File", "", "Video Files (*.mp4 *.avi *.mov)")
         if file_path:
@@ -145,40 +206,80 @@ class VideoOCRApp(QMainWindow):
 
     def load_video(self, path):
         self.video_capture = cv2.VideoCapture(path)
+        # Indexing a new video can take a full pass over it, so it is built (or loaded from next to the video)
+        # in the background. Until it arrives the preview and runs seek by time and frame rate.
+        self.seek_index = None
+        if self.video_capture.isOpened():
+            threading.Thread(target=self.build_seek_index, args=(path,), daemon=True).start()
         self.update_preview()
 
+    def build_seek_index(self, path):
+        # Runs on its own thread, the index is handed to the GUI thread through the signal
+        try:
+            seek_index = SeekIndex.for_video(path)
+        except Exception as e:
+            print(f'Could not index {path}: {e}')
+            return
+        self.index_ready.emit(path, seek_index)
+
+    def set_seek_index(self, path, seek_index):
+        if path == self.file_path.text():
+            self.seek_index = seek_index
+            self.update_preview()
+
     def resize_canvas_to_video(self):
         if self.frame is not None and len(self.scale_factor.text()) > 0:
             try:
                 scale_by = int(self.scale_factor.text())
                 height, width, _ = self.frame.shape
                 self.view.setFixedSize(width // scale_by, height // scale_by)
-                self.view2.setFixedSize(10,10)
+                self.preview.fit()
             except:
                 print('Ah, bad scaling!')
 
     def display_frame(self):
+        # Shows self.frame with the field rectangles, also called for every sample by extractions given this
+        # window as gui_ref. Samples from a worker run go through show_worker_frame
         if self.frame is not None:
-            height, width, channels = self.frame.shape
-            bytes_per_line = channels * width
-            q_image = QImage(self.frame.data, width, height, bytes_per_line, QImage.Format_RGB888).rgbSwapped()
-            pixmap = QPixmap.fromImage(q_image)
-            self.scene.clear()
-            self.scene.addPixmap(pixmap)
-            self.scene.setSceneRect(0, 0, pixmap.width(), pixmap.height())
-            self.view.fitInView(self.scene.sceneRect(), Qt.KeepAspectRatio)
+            self.preview.show_frame(self.frame, throttle=False)
             try:
-                self.view.redraw_rectangles(self.region_fields)
-            except:
-                pass
+                self.read_regions()
+                self.preview.set_rectangles(self.regions)
+            except ValueError:
+                pass  # A coordinate is being edited
+
+    def redraw_preview(self):
+        # Full redraw for user changes
+        self.display_frame()
+        if self.frame is not None:
+            self.preview.clear_rois()
+            # Between runs, "Show Fields" previews what OCR will be given for each text field
+            if self.worker is None and self.show_rois.isChecked():
+                self.preview_fields()
+
+    def set_preview_fps(self, text):
+        try:
+            self.preview.max_fps = float(text)
+        except ValueError:
+            pass
+
+    def preview_fields(self):
+        try:
+            self.read_regions()
+        except ValueError:
+            return  # A coordinate is being edited
+        for (x1, y1, x2, y2), vert, hor in zip(self.regions, self.vert_flag, self.hor_flag):
+            if vert or hor or x2 <= x1 or y2 <= y1:
+                continue
+            preprocessor = Preprocessor(**preprocess_settings(self.enhance_contrast.isChecked()))
+            self.display_roi(preprocessor.preview(self.frame[y1:y2, x1:x2])[-1][1], x1, y1)
 
     def display_roi(self, image, x_loc, y_loc):
         if image is not None:
-            height, width = image.shape
-            q_image = QImage(image.data, width, height, width, QImage.Format_Grayscale8)
-            pixmap = QPixmap.fromImage(q_image)
-            patch = self.scene.addPixmap(pixmap)
-            patch.setPos(x_loc, y_loc)
+            self.preview.show_roi(image, x_loc, y_loc, throttle=False)
+
+    def show_worker_roi(self, image, x_loc, y_loc):
+        self.preview.show_roi(image, x_loc, y_loc)
 
     def add_region_info(self, start_point, end_point):
         top_left = QPointF(min(start_point.x(), end_point.x()), min(start_point.y(), end_point.y()))
@@ -189,10 +290,12 @@ class VideoOCRApp(QMainWindow):
         y2_field = QLineEdit(f"{bottom_right.y():.2f}")
         vert_prog = QCheckBox("Vertical Bar")
         hor_prog = QCheckBox("Horizonal Bar")
+        recog_only = QCheckBox("Recognize Only")
+        digits_only = QCheckBox("Digits")
         delete = QPushButton("Delete")
         update = QPushButton("Update")
         if self.region_fields: #default name to all subsequent entries.
-            name_field = QLineEdit("region"+str(int(len(self.region_fields)/5)))
+            name_field = QLineEdit("region"+str(int(len(self.region_fields)/9)))
         else:
             name_field = QLineEdit("timestamp")
 
@@ -208,6 +311,8 @@ class VideoOCRApp(QMainWindow):
         h_layout.addWidget(y2_field)
         h_layout.addWidget(vert_prog)
         h_layout.addWidget(hor_prog)
+        h_layout.addWidget(recog_only)
+        h_layout.addWidget(digits_only)
         h_layout.addWidget(QLabel("Data:"))
         h_layout.addWidget(name_field)
         h_layout.addWidget(update)
@@ -215,11 +320,12 @@ class VideoOCRApp(QMainWindow):
         self.region_layout.addLayout(h_layout)
         
         # Store all widgets and layout for this region in a tuple for easy deletion
-        self.region_fields.extend([x1_field, y1_field, x2_field, y2_field, name_field, vert_prog, hor_prog])
-        region_items = (h_layout, x1_field, y1_field, x2_field, y2_field, name_field, vert_prog, hor_prog, update, delete)
+        self.region_fields.extend([x1_field, y1_field, x2_field, y2_field, name_field, vert_prog, hor_prog, recog_only, digits_only])
+        region_items = (h_layout, x1_field, y1_field, x2_field, y2_field, name_field, vert_prog, hor_prog, recog_only, digits_only, update, delete)
         
         delete.clicked.connect(lambda: self.delete_region(region_items)) # Delete this region and update frame
-        update.clicked.connect(lambda: self.display_frame()) # This should really just be one button for all regions, but eh.
+        update.clicked.connect(lambda: self.redraw_preview()) # This should really just be one button for all regions, but eh.
+        self.redraw_preview()
         
     def delete_region(self, items):
         h_layout, *widgets = items
@@ -238,14 +344,16 @@ class VideoOCRApp(QMainWindow):
         # Remove layout from parent
         self.region_layout.removeItem(h_layout)
         # Update the canvas - Really we should just update the rectangles, but this is easier
-        self.display_frame()   
+        self.redraw_preview()   
             
-    def start_processing(self):
+    def read_regions(self):
         self.regions = []
         self.names = []
         self.vert_flag = []
         self.hor_flag = []
-        for i in range(0, len(self.region_fields), 7):  # 7 fields per region: x1, y1, x2, y2, name
+        self.recog_flag = []
+        self.digit_flag = []
+        for i in range(0, len(self.region_fields), 9):  # 9 fields per region: x1, y1, x2, y2, name, vert, hor, recog, digits
             x1 = int(float(self.region_fields[i].text()))
             y1 = int(float(self.region_fields[i + 1].text()))
             x2 = int(float(self.region_fields[i + 2].text()))
@@ -254,10 +362,84 @@ class VideoOCRApp(QMainWindow):
             self.names.append(self.region_fields[i + 4].text())
             self.vert_flag.append(self.region_fields[i + 5].isChecked())
             self.hor_flag.append(self.region_fields[i + 6].isChecked())
+            self.recog_flag.append(self.region_fields[i + 7].isChecked())
+            self.digit_flag.append(self.region_fields[i + 8].isChecked())
+
+    def start_processing(self):
+        # The same button cancels a run in progress
+        if self.worker is not None:
+            self.worker.cancel()
+            self.start_btn.setEnabled(False)
+            return
+        self.read_regions()
+
+        # Reuse the same OCR model across runs instead of loading it on every click
+        if self.ocr_engine is None:
+            self.ocr_engine = get_ocr_engine()
+
+        # Do the work on a worker thread, the GUI only draws what the worker sends back
+        job = validate_job(self.job_from_gui())
+        kwargs = dict(extraction_options(job),
+                      time_interval=job['interval'],
+                      start_time=job['start_time'],
+                      end_time=job['end_time'])
+        if self.seek_index is not None:
+            kwargs['seek_index'] = self.seek_index
+        if job['workers'] > 1:
+            self.worker = ExtractWorker(extract_text_parallel, video_path=job['video'], workers=job['workers'], **kwargs)
+        else:
+            # Own capture so scrubbing the preview can't move the worker's read position
+            # Rows are streamed to the CSV as they finish, a rerun after a crash or cancel resumes
+            # The preview's frames are read from the cache, the run's own frames don't go into it
+            self.worker = ExtractWorker(video_capture=cv2.VideoCapture(job['video']),
+                                        video_path=job['video'],
+                                        frame_cache=self.frame_cache,
+                                        ocr_engine=self.ocr_engine,
+                                        output=ResultWriter(self.file_path.text()+".csv"),
+                                        return_results=False,
+                                        show_frames=self.show_frames.isChecked(),
+                                        show_rois=self.show_rois.isChecked(),
+                                        **kwargs)
+            self.worker.frame_ready.connect(self.show_worker_frame)
+            self.worker.roi_ready.connect(self.show_worker_roi)
+            self.worker.results_ready.connect(self.show_worker_results)
+        self.worker.progress.connect(self.show_worker_progress)
+        self.worker.finished.connect(self.finish_processing)
+        self.worker.failed.connect(self.fail_processing)
+        self.worker_thread = start_worker(self.worker)
+        self.start_btn.setText('Cancel')
+        self.status.setText('Starting...')
+
+    def show_worker_frame(self, frame):
+        self.frame = frame
+        self.preview.show_frame(frame)
 
-        # Do the work
-        #df = extract_text_from_video(self.video_capture, self.regions, self.names, int(self.interval.text()), float(self.start_time.text()), float(self.stop_time.text()), self)
-        df = extract_text_from_video(self)
+    def show_worker_progress(self, done, total, eta, rate):
+        self.progress_text = f"{done}/{total} samples, {rate:.1f} samples/s, ETA {int(eta) // 60}:{int(eta) % 60:02d}"
+        self.status.setText(self.progress_text)
+
+    def show_worker_results(self, df):
+        if len(df):
+            last = df.iloc[-1]
+            values = ' '.join(f"{col}={last[col]}" for col in df.columns if col != 'time' and not col.endswith('_conf'))
+            self.status.setText(f"{self.progress_text}  |  {values}")
+
+    def fail_processing(self, message):
+        print(f"Extraction failed: {message}")
+        self.status.setText(f"Failed: {message}")
+        self.reset_worker()
+
+    def finish_processing(self, df):
+        output = self.worker.kwargs.get('output')
+        rows = output.rows if output is not None else len(df)
+        if self.worker.cancelled:
+            self.status.setText(f"Cancelled, saved {rows} rows")
+        else:
+            self.status.setText(f"Done, {rows} rows")
+        self.reset_worker()
+        if df is None:
+            # Already streamed to disk
+            return
         # Data cleanup
         # df[0] = df[0].apply(lambda x: time_string_to_minutes(x))
         try:
@@ -267,6 +449,50 @@ class VideoOCRApp(QMainWindow):
         #df_for_export = convert_to_float(df_for_export)
         df.to_csv(self.file_path.text()+".csv", index=False)
 
+    def reset_worker(self):
+        if self.worker_thread is not None:
+            self.worker_thread.wait()
+        video_capture = self.worker.kwargs.get('video_capture')
+        if video_capture is not None:
+            video_capture.release()
+        self.worker = None
+        self.worker_thread = None
+        self.start_btn.setText('Start OCR')
+        self.start_btn.setEnabled(True)
+        # Back to the Start Time frame, the run left its last sample on screen
+        if self.video_capture and self.video_capture.isOpened() and self.preview_index is not None:
+            self.frame = self.preview_frame()
+            self.redraw_preview()
+
+    def save_job(self):
+        job_path, _ = QFileDialog.getSaveFileName(self, "Save Job", self.file_path.text()+".job.json", "Job Files (*.json *.yaml *.yml)")
+        if job_path:
+            save_job(self.job_from_gui(), job_path)
+
+    def job_from_gui(self):
+        self.read_regions()
+        rois = []
+        for box, name, vert, hor, recog, digits in zip(self.regions, self.names, self.vert_flag, self.hor_flag,
+                                                       self.recog_flag, self.digit_flag):
+            roi_type = 'vertical_bar' if vert else 'horizontal_bar' if hor else 'text'
+            rois.append({'name': name, 'box': box, 'type': roi_type, 'recognize_only': recog, 'digits': digits})
+        return {
+            'video': self.file_path.text(),
+            # Lets the job serve as a template for recordings at other resolutions
+            'frame_size': [self.frame.shape[1], self.frame.shape[0]] if self.frame is not None else None,
+            'interval': int(self.interval.text()),
+            'start_time': float(self.start_time.text()),
+            'end_time': float(self.stop_time.text()),
+            'conf_thresh': float(self.conf_thresh.text()),
+            'record_confidence': self.record_confidence.isChecked(),
+            'enhance_contrast': self.enhance_contrast.isChecked(),
+            'change_tolerance': float(self.change_tolerance.text()) if self.change_tolerance.text() else None,
+            'workers': int(self.workers.text()) if self.workers.text() else 1,
+            # Reruns with another threshold or Record Conf. setting reuse the OCR output of earlier runs
+            'ocr_cache': self.file_path.text() + cache_suffix,
+            'rois': rois,
+        }
+
     def open_csv_in_explorer(self):
         if hasattr(self, 'file_path') and self.file_path.text():
             csv_path = self.file_path.text()+".csv"
@@ -0,0 +1,151 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+
+import numpy as np
+
+default_cache_mb = 256
+cache_suffix = '.ocrcache'
+evict_to = 0.9  # Eviction trims the cache to this share of its budget, so it doesn't run on every write
+
+
+def model_key(ocr_engine):
+    # What the raw output depends on besides the crop: the model, not where or on what device it runs
+    return [list(getattr(ocr_engine, 'languages', ())), getattr(ocr_engine, 'recog_network', None),
+            type(ocr_engine).__name__]
+
+
+class OCRCache:
+    # Raw OCR output on disk, keyed by a hash of the crop handed to OCR (so after preprocessing) plus the
+    # model and the kind of call. Thresholds, confidence recording, ROI names and the text cleanup all run
+    # on the raw output, so reruns that only change those never touch the model. SQLite keeps it safe to
+    # share between the worker processes of a parallel run; least recently used entries are dropped once
+    # the cache grows past max_bytes.
+    def __init__(self, path, max_bytes=default_cache_mb * 1024 * 1024):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        # OCR batches can run on worker threads, they share the connection one at a time
+        self.lock = threading.RLock()
+        self.connection = sqlite3.connect(path, timeout=60, check_same_thread=False)
+        self.connection.execute('CREATE TABLE IF NOT EXISTS results '
+                                '(key TEXT PRIMARY KEY, value TEXT, size INTEGER, used REAL)')
+        self.connection.execute('CREATE INDEX IF NOT EXISTS results_used ON results (used)')
+        self.connection.commit()
+        # Running total of the size column, kept up to date by put and evict instead of summing the table
+        # on every write. Other processes sharing the file aren't seen until it is recounted, which happens
+        # whenever it looks over budget.
+        self.size = self.count_size()
+
+    @staticmethod
+    def key(image, kind, model):
+        digest = hashlib.blake2b(digest_size=20)
+        digest.update(json.dumps([kind, model, image.shape, str(image.dtype)]).encode())
+        digest.update(np.ascontiguousarray(image).data)
+        return digest.hexdigest()
+
+    def get_many(self, keys):
+        with self.lock:
+            return self._get_many(keys)
+
+    def _get_many(self, keys):
+        found = {}
+        for start in range(0, len(keys), 500):  # SQLite caps the number of parameters per statement
+            chunk = keys[start:start + 500]
+            rows = self.connection.execute(f"SELECT key, value FROM results WHERE key IN ({','.join('?' * len(chunk))})",
+                                           chunk)
+            found.update((key, json.loads(value)) for key, value in rows)
+        if found:
+            now = time.time()
+            self.connection.executemany('UPDATE results SET used = ? WHERE key = ?', [(now, key) for key in found])
+            self.connection.commit()
+        self.hits += len(found)
+        self.misses += len(keys) - len(found)
+        return found
+
+    def put_many(self, items):
+        with self.lock:
+            self._put_many(items)
+
+    def _put_many(self, items):
+        now = time.time()
+        rows = {}
+        for key, result in items:
+            value = json.dumps(result)
+            rows[key] = (key, value, len(key) + len(value), now)
+        keys = list(rows)
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            # Entries being replaced (another process may have just written the same crop) stop counting
+            replaced = self.connection.execute(f"SELECT SUM(size) FROM results WHERE key IN ({','.join('?' * len(chunk))})",
+                                               chunk).fetchone()[0]
+            self.size -= replaced or 0
+        self.connection.executemany('INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?)', rows.values())
+        self.connection.commit()
+        self.size += sum(row[2] for row in rows.values())
+        self.evict()
+
+    def count_size(self):
+        return self.connection.execute('SELECT COALESCE(SUM(size), 0) FROM results').fetchone()[0]
+
+    def __len__(self):
+        return self.connection.execute('SELECT COUNT(*) FROM results').fetchone()[0]
+
+    def evict(self):
+        if self.size <= self.max_bytes:
+            return
+        self.size = self.count_size()
+        excess = self.size - self.max_bytes
+        if excess <= 0:
+            return
+        excess += self.max_bytes * (1 - evict_to)
+        doomed = []
+        for key, size in self.connection.execute('SELECT key, size FROM results ORDER BY used'):
+            if excess <= 0:
+                break
+            doomed.append((key,))
+            excess -= size
+            self.size -= size
+        self.connection.executemany('DELETE FROM results WHERE key = ?', doomed)
+        self.connection.commit()
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
+
+
+class CachedOCREngine:
+    # Stands in for an OCREngine: crops found in the cache are answered from it, only the rest reach the
+    # engine (and the model is never loaded when nothing is missing). Same batch calls and output layout.
+    def __init__(self, ocr_engine, cache):
+        self.ocr_engine = ocr_engine
+        self.cache = cache
+        self.model = model_key(ocr_engine)
+
+    def readtext_batch(self, images, **kwargs):
+        return self.cached('readtext', self.ocr_engine.readtext_batch, images, kwargs)
+
+    def recognize_batch(self, images, **kwargs):
+        return self.cached('recognize', self.ocr_engine.recognize_batch, images, kwargs)
+
+    def cached(self, kind, run, images, kwargs):
+        keys = [self.cache.key(image, [kind, sorted(kwargs.items())], self.model) for image in images]
+        found = self.cache.get_many(list(set(keys)))
+        missing = {}
+        for k, key in enumerate(keys):
+            if key not in found:
+                missing.setdefault(key, k)  # The same crop twice in a batch is only read once
+        if missing:
+            results = run([images[k] for k in missing.values()], **kwargs)
+            fresh = {key: to_raw(result) for key, result in zip(missing, results)}
+            self.cache.put_many(fresh.items())
+            found.update(fresh)
+        return [found[key] for key in keys]
+
+
+def to_raw(result):
+    # readtext style [(box, text, confidence)] as plain JSON types, NumPy scalars included
+    return [[[[float(x), float(y)] for x, y in box], str(text), float(conf)] for box, text, conf in result]
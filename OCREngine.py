@@ -0,0 +1,159 @@
+import threading
+
+import numpy as np
+
+default_languages = ('en',)
+# The detector shrinks anything taller than its canvas size (2560), so batched crops are packed below that
+default_max_canvas_height = 2560
+default_batch_gap = 16
+
+
+class OCREngine:
+    # Long-lived wrapper around an easyocr.Reader. The model is only loaded the first
+    # time it is needed and then reused for every run/video that shares this engine.
+    def __init__(self, languages=default_languages, gpu=True, model_storage_directory=None,
+                 recog_network='standard', download_enabled=True):
+        self.languages = tuple(languages)
+        self.gpu = gpu
+        self.model_storage_directory = model_storage_directory
+        self.recog_network = recog_network
+        self.download_enabled = download_enabled
+        self._reader = None
+        self._lock = threading.Lock()
+        # One model shared by every OCR worker thread, easyocr/torch calls on it are made one at a time.
+        # Workers still overlap everything around the model (cache lookups, digit templates, recording).
+        self._call_lock = threading.Lock()
+
+    @property
+    def config(self):
+        return (self.languages, self.gpu, self.model_storage_directory, self.recog_network)
+
+    @property
+    def is_loaded(self):
+        return self._reader is not None
+
+    @property
+    def reader(self):
+        if self._reader is None:
+            self.load()
+        return self._reader
+
+    def load(self):
+        with self._lock:
+            if self._reader is None:
+                # Imported here so that modules using the engine don't pay for torch until OCR is needed
+                import easyocr
+                self._reader = easyocr.Reader(list(self.languages),
+                                              gpu=self.gpu,
+                                              model_storage_directory=self.model_storage_directory,
+                                              recog_network=self.recog_network,
+                                              download_enabled=self.download_enabled)
+        return self._reader
+
+    def unload(self):
+        with self._lock:
+            self._reader = None
+
+    def readtext(self, image, **kwargs):
+        reader = self.reader
+        with self._call_lock:
+            return reader.readtext(image, **kwargs)
+
+    def readtext_batch(self, images, max_canvas_height=default_max_canvas_height, gap=default_batch_gap, **kwargs):
+        # OCR many small crops with as few model calls as possible. Crops are stacked into tall canvases
+        # separated by flat bands, each canvas goes through one readtext call with all its text lines
+        # recognized in a single batch, then detections are handed back to the crop they fall in.
+        # Returns one readtext style list per input image, with boxes relative to that image.
+        results = [[] for _ in images]
+        for group in self._pack_canvases(images, max_canvas_height, gap):
+            canvas, bands = self._stack_canvas(images, group, gap)
+            reader = self.reader
+            with self._call_lock:
+                found = reader.readtext(canvas, detail=1, batch_size=len(group), **kwargs)
+            self._scatter(found, bands, results)
+        return results
+
+    def recognize_batch(self, images, max_canvas_height=default_max_canvas_height, gap=default_batch_gap, **kwargs):
+        # Recognition only, no text detector: every crop is treated as a single line of text.
+        # Meant for grayscale ROIs the user has already boxed tightly. Same output layout as readtext_batch.
+        results = [[] for _ in images]
+        for group in self._pack_canvases(images, max_canvas_height, gap):
+            canvas, bands = self._stack_canvas(images, group, gap)
+            horizontal_list = [[0, images[i].shape[1], band_top, band_top + images[i].shape[0]]
+                               for band_top, _, i in bands]
+            reader = self.reader
+            with self._call_lock:
+                found = reader.recognize(canvas, horizontal_list=horizontal_list, free_list=[],
+                                         batch_size=len(group), detail=1, **kwargs)
+            # Not matched up by position: easyocr drops lines it can't cut out (e.g. zero width), which would
+            # shift every later result onto the wrong crop
+            self._scatter(found, bands, results)
+        return results
+
+    @staticmethod
+    def _scatter(found, bands, results):
+        # Hands each detection on the canvas back to the crop whose band its center falls in
+        for box, text, conf in found:
+            center_y = sum(point[1] for point in box) / len(box)
+            for band_top, band_bot, i in bands:
+                if band_top <= center_y < band_bot:
+                    results[i].append(([[x, y - band_top] for x, y in box], text, conf))
+                    break
+
+    @staticmethod
+    def _stack_canvas(images, group, gap):
+        # Every crop is copied once, straight into its place on the canvas, around it its band is flat
+        width = max(images[i].shape[1] for i in group)
+        height = sum(images[i].shape[0] + gap for i in group)
+        canvas = np.empty((height, width) + images[group[0]].shape[2:], dtype=np.uint8)
+        bands = []
+        top = 0
+        for i in group:
+            image_height, image_width = images[i].shape[:2]
+            fill = int(np.median(images[i]))
+            canvas[top:top + image_height, :image_width] = images[i]
+            canvas[top:top + image_height, image_width:] = fill
+            canvas[top + image_height:top + image_height + gap] = fill
+            bands.append((top, top + image_height + gap, i))
+            top += image_height + gap
+        return canvas, bands
+
+    @staticmethod
+    def _pack_canvases(images, max_canvas_height, gap):
+        groups = []
+        group = []
+        height = 0
+        for i, image in enumerate(images):
+            image_height = image.shape[0] + gap
+            if group and height + image_height > max_canvas_height:
+                groups.append(group)
+                group = []
+                height = 0
+            group.append(i)
+            height += image_height
+        if group:
+            groups.append(group)
+        return groups
+
+
+_engines = {}
+_registry_lock = threading.Lock()
+
+
+def get_ocr_engine(languages=default_languages, gpu=True, model_storage_directory=None,
+                   recog_network='standard'):
+    # Return the shared engine for this configuration, creating it (unloaded) on first request
+    key = (tuple(languages), gpu, model_storage_directory, recog_network)
+    with _registry_lock:
+        engine = _engines.get(key)
+        if engine is None:
+            engine = OCREngine(languages, gpu, model_storage_directory, recog_network)
+            _engines[key] = engine
+    return engine
+
+
+def clear_ocr_engines():
+    with _registry_lock:
+        for engine in _engines.values():
+            engine.unload()
+        _engines.clear()
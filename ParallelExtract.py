@@ -0,0 +1,157 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+import cv2
+import pandas as pd
+
+from ExtractText import extract_text_from_video
+from OCREngine import get_ocr_engine
+
+
+def plan_shards(start_frame, sample_count, time_interval, shard_count):
+    # Split the sample grid (start_frame + k * time_interval) into contiguous runs of samples,
+    # so every shard lands exactly on the frames a single pass would have sampled.
+    shard_count = max(1, min(shard_count, sample_count))
+    bounds = [round(j * sample_count / shard_count) for j in range(shard_count + 1)]
+    return [(start_frame + k0 * time_interval, k1 - k0) for k0, k1 in zip(bounds, bounds[1:]) if k1 > k0]
+
+
+def init_worker(threads_per_worker):
+    # Keep every worker from spinning up one thread per core, otherwise N workers fight over N*N threads
+    os.environ['OMP_NUM_THREADS'] = str(threads_per_worker)
+    cv2.setNumThreads(threads_per_worker)
+
+
+def extract_shard(video_path, shard_start, shard_samples, fps, time_interval, engine_config, options, shard=0,
+                  samples_done=None, stop=None):
+    # samples_done (a shared list, one entry per shard) and stop (a shared Event) let the parent follow the
+    # shard sample by sample and cancel it while it runs
+    video_capture = cv2.VideoCapture(video_path)
+    callbacks = {}
+    if samples_done is not None:
+        callbacks['progress'] = lambda done, total: samples_done.__setitem__(shard, done)
+    if stop is not None:
+        callbacks['should_stop'] = stop.is_set
+    try:
+        # The shard runs up to the next shard's first frame, so bars sampled between text samples
+        # (bar_interval) are covered too
+        seek_index = options.get('seek_index')
+        if seek_index is not None:
+            start_time = seek_index.time_of(shard_start)
+            end_time = seek_index.time_of(shard_start + shard_samples * time_interval)
+        else:
+            # Half a frame of slack keeps int(time * fps) from rounding onto the previous frame
+            start_time = (shard_start + 0.5) / fps
+            end_time = start_time + (shard_samples * time_interval - 0.5) / fps
+        return extract_text_from_video(video_capture=video_capture,
+                                       video_path=video_path,
+                                       time_interval=time_interval,
+                                       start_time=start_time,
+                                       end_time=end_time,
+                                       ocr_engine=get_ocr_engine(**engine_config),
+                                       **options, **callbacks)
+    finally:
+        video_capture.release()
+
+
+def extract_text_parallel(video_path,
+                          roi_coordinates,
+                          roi_names,
+                          time_interval,
+                          start_time,
+                          end_time,
+                          workers=None,
+                          shard_count=None,
+                          engine_config=None,
+                          progress=None,
+                          should_stop=None,
+                          **options):
+    # Same result as extract_text_from_video, but the time window is cut into shards that are
+    # processed by a pool of worker processes, each with its own capture and OCR engine.
+    # Extra keyword options are passed straight through to extract_text_from_video.
+    # progress(samples_done, sample_total) is called as the shards' samples (rows) finish, should_stop() -> True
+    # cancels the shards that haven't started, stops the running ones at their next sample and returns
+    # every row finished so far.
+    workers = workers or os.cpu_count() or 1
+    shard_count = shard_count or workers
+    engine_config = engine_config or {}
+
+    video_capture = cv2.VideoCapture(video_path)
+    fps = video_capture.get(cv2.CAP_PROP_FPS)
+    video_capture.release()
+    if not fps:
+        raise ValueError(f"Could not read the frame rate of {video_path}")
+
+    seek_index = options.get('seek_index')
+    if seek_index is not None:
+        start_frame = seek_index.frame_at(start_time)
+        span = seek_index.frames_before(end_time) - start_frame
+    else:
+        start_frame = int(start_time * fps)
+        span = (end_time - start_time) * fps
+    sample_count = int(-(-span // time_interval)) if span > 0 else 0
+    shards = plan_shards(start_frame, sample_count, time_interval, shard_count)
+    if not shards:
+        return pd.DataFrame()
+    # Shards report the rows they have done, bars sampled every bar_interval add rows between text samples
+    bars = any(options.get('vert_flags') or ()) or any(options.get('hor_flags') or ())
+    bar_interval = options.get('bar_interval') if bars and options.get('bar_interval') else time_interval
+    row_total = sample_count * max(1, time_interval // bar_interval)
+
+    options = dict(options, roi_coordinates=roi_coordinates, roi_names=roi_names)
+    threads_per_worker = max(1, (os.cpu_count() or 1) // workers)
+    # spawn rather than fork so workers don't inherit Qt or torch state from the parent
+    context = multiprocessing.get_context('spawn')
+    with context.Manager() as manager, \
+            ProcessPoolExecutor(max_workers=min(workers, len(shards)), mp_context=context,
+                                initializer=init_worker, initargs=(threads_per_worker,)) as pool:
+        samples_done = manager.list([0] * len(shards))
+        stop = manager.Event()
+        futures = [pool.submit(extract_shard, video_path, shard_start, shard_samples, fps, time_interval,
+                               engine_config, options, n, samples_done, stop)
+                   for n, (shard_start, shard_samples) in enumerate(shards)]
+        running = set(futures)
+        reported = 0
+        while running:
+            _, running = wait(running, timeout=0.5, return_when=FIRST_COMPLETED)
+            done = min(sum(samples_done[:]), row_total)
+            if progress is not None and done != reported:
+                progress(done, row_total)
+                reported = done
+            if should_stop is not None and should_stop():
+                print('Extraction cancelled')
+                stop.set()
+                for future in running:
+                    future.cancel()
+                should_stop = None  # Running shards stop at their next sample and hand back their rows
+
+        # Everything not cancelled has finished, completely or up to where it was stopped
+        finished = [(future.result(), shard) for future, shard in zip(futures, shards) if not future.cancelled()]
+    finished = [(part, shard) for part, shard in finished if len(part)]
+    if not finished:
+        return pd.DataFrame()
+    parts, shards = zip(*finished)
+    return merge_shards(list(parts), list(shards), start_frame, fps, seek_index)
+
+
+def merge_shards(parts, shards, start_frame, fps, seek_index=None):
+    # Shards report time relative to their own first sample, shift them back onto the full run
+    for part, (shard_start, _) in zip(parts, shards):
+        if 'time' in part:
+            if seek_index is not None:
+                part['time'] += seek_index.time_of(shard_start) - seek_index.time_of(start_frame)
+            else:
+                part['time'] += (shard_start - start_frame) / fps
+    df = pd.concat(parts, ignore_index=True)
+
+    summaries = [part.attrs['change_detection'] for part in parts if 'change_detection' in part.attrs]
+    if summaries:
+        checks = sum(summary['checks'] for summary in summaries)
+        skips = sum(summary['skips'] for summary in summaries)
+        df.attrs['change_detection'] = {'checks': checks, 'skips': skips,
+                                        'skip_rate': skips / checks if checks else 0.0}
+    caches = [part.attrs['ocr_cache'] for part in parts if 'ocr_cache' in part.attrs]
+    if caches:
+        df.attrs['ocr_cache'] = {key: sum(cache[key] for cache in caches) for key in ('hits', 'misses')}
+    return df
@@ -0,0 +1,90 @@
+import queue
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+# Stage sizes extract_text_from_video uses unless told otherwise
+default_decode_queue = 4  # Samples decoded ahead of the loop
+default_ocr_workers = 1  # Threads running OCR batches, 0 runs them in the loop
+default_ocr_queue = 2  # OCR batches in flight before the loop waits for the oldest
+
+_finished = object()
+
+
+class Prefetcher:
+    # Runs a sampler on its own thread and keeps up to `size` of its samples queued, so decoding the next
+    # frames overlaps with whatever is done with the current one. Samples come out in the sampler's order,
+    # and an exception in the sampler is raised from the loop reading them. Leaving that loop early stops
+    # the thread (and closes the sampler) before the loop carries on.
+    def __init__(self, sampler, size=default_decode_queue):
+        self.sampler = sampler
+        self.size = max(1, size)
+
+    def fill(self, samples, stop):
+        try:
+            for sample in self.sampler:
+                while not stop.is_set():
+                    try:
+                        samples.put(sample, timeout=0.1)
+                        break
+                    except queue.Full:
+                        pass
+                if stop.is_set():
+                    return
+            samples.put(_finished)
+        except Exception as e:
+            samples.put(e)
+
+    def __iter__(self):
+        samples = queue.Queue(self.size)
+        stop = threading.Event()
+        thread = threading.Thread(target=self.fill, args=(samples, stop), daemon=True)
+        thread.start()
+        try:
+            while True:
+                sample = samples.get()
+                if sample is _finished:
+                    break
+                if isinstance(sample, Exception):
+                    raise sample
+                yield sample
+        finally:
+            stop.set()
+            # Make room in case the thread is waiting to hand over one more sample
+            while thread.is_alive():
+                try:
+                    samples.get(timeout=0.1)
+                except queue.Empty:
+                    pass
+            thread.join()
+
+
+class OCRStage:
+    # Runs OCR batches on a small thread pool (easyocr/torch and OpenCV release the GIL), at most
+    # `queue_size` of them in flight. submit() and drain() hand finished batches back strictly in the order
+    # they were submitted, as (tag, result). With no workers every batch runs right away in the caller.
+    def __init__(self, workers=default_ocr_workers, queue_size=default_ocr_queue):
+        self.executor = ThreadPoolExecutor(workers, thread_name_prefix='ocr') if workers else None
+        self.queue_size = max(1, queue_size)
+        self.in_flight = deque()
+
+    def submit(self, tag, work, *args):
+        if self.executor is None:
+            return [(tag, work(*args))]
+        self.in_flight.append((tag, self.executor.submit(work, *args)))
+        finished = []
+        while self.in_flight and (len(self.in_flight) > self.queue_size or self.in_flight[0][1].done()):
+            tag, future = self.in_flight.popleft()
+            finished.append((tag, future.result()))
+        return finished
+
+    def drain(self):
+        finished = []
+        while self.in_flight:
+            tag, future = self.in_flight.popleft()
+            finished.append((tag, future.result()))
+        return finished
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=True, cancel_futures=True)
@@ -0,0 +1,133 @@
+import cv2
+import numpy as np
+
+# Contrast/sharpening that "Enhance Contrast" has always applied
+sharpening_kernel = -(1 / 256.0) * np.array([[1, 4, 6, 4, 1],
+                                             [4, 16, 24, 16, 4],
+                                             [6, 24, -476, 24, 6],
+                                             [4, 16, 24, 16, 4],
+                                             [1, 4, 6, 4, 1]])
+default_alpha = 1.1  # Contrast control (1.0 - 3.0)
+default_beta = -40  # Brightness control (-100 - 100)
+default_ring_size = 2
+channels = {'b': 0, 'g': 1, 'r': 2}
+
+preprocess_defaults = {
+    'grayscale': True,
+    'channel': None,  # 'b', 'g' or 'r': grayscale is that one channel, picked out instead of mixing all three
+    'contrast': False,
+    'alpha': default_alpha,
+    'beta': default_beta,
+    'sharpen': False,
+    'target_height': None,  # Resize so the text is this many pixels high, None keeps the crop size
+    'binarize': None,  # 'otsu' or a fixed threshold 0-255
+}
+
+
+def preprocess_settings(enhance_contrast=False, overrides=None):
+    # Settings for one ROI: the run-wide "Enhance Contrast" switch plus the ROI's own overrides
+    settings = {'contrast': True, 'sharpen': True} if enhance_contrast else {}
+    settings.update(overrides or {})
+    return settings
+
+
+class Preprocessor:
+    # Turns an ROI crop into the image handed to OCR: grayscale, contrast, sharpen, resize, binarize, each
+    # step optional. Every step writes into a buffer allocated the first time a crop of that size comes
+    # through and reused for every later frame, so the hot loop doesn't allocate. The final output cycles
+    # through `ring_size` buffers: the last ring_size results stay valid (e.g. while waiting in an OCR
+    # batch), anything kept longer than that has to be copied.
+    def __init__(self, ring_size=default_ring_size, **settings):
+        unknown = set(settings) - set(preprocess_defaults)
+        if unknown:
+            raise ValueError(f'Unknown preprocessing settings {sorted(unknown)}, expected {list(preprocess_defaults)}')
+        self.settings = dict(preprocess_defaults, **settings)
+        binarize = self.settings['binarize']
+        if binarize is not None and binarize != 'otsu' and not isinstance(binarize, (int, float)):
+            raise ValueError(f"binarize must be 'otsu' or a threshold, not {binarize!r}")
+        if binarize is not None and not self.settings['grayscale']:
+            raise ValueError('binarize needs grayscale')
+        channel = self.settings['channel']
+        if channel is not None and channel not in channels:
+            raise ValueError(f"channel must be one of {list(channels)}, not {channel!r}")
+        if channel is not None and not self.settings['grayscale']:
+            raise ValueError('channel needs grayscale')
+        self.ring_size = max(1, ring_size)
+        self.slot = 0
+        self.buffers = {}
+        self.allocations = 0
+
+        self.steps = []
+        if self.settings['grayscale']:
+            self.steps.append(('grayscale', self.grayscale))
+        if self.settings['contrast']:
+            self.steps.append(('contrast', self.contrast))
+        if self.settings['sharpen']:
+            self.steps.append(('sharpen', self.sharpen))
+        if self.settings['target_height']:
+            self.steps.append(('resize', self.resize))
+        if binarize is not None:
+            self.steps.append(('binarize', self.binarize))
+
+    def buffer(self, step, shape, final):
+        key = (step, self.slot if final else 0)
+        buffer = self.buffers.get(key)
+        if buffer is None or buffer.shape != shape:
+            buffer = self.buffers[key] = np.empty(shape, dtype=np.uint8)
+            self.allocations += 1
+        return buffer
+
+    def grayscale(self, image, final):
+        if image.ndim == 2:
+            return self.copy(image, final)
+        buffer = self.buffer('grayscale', image.shape[:2], final)
+        if self.settings['channel'] is not None:
+            return cv2.extractChannel(image, channels[self.settings['channel']], dst=buffer)
+        return cv2.cvtColor(image, cv2.COLOR_BGR2GRAY, dst=buffer)
+
+    def contrast(self, image, final):
+        return cv2.convertScaleAbs(image, dst=self.buffer('contrast', image.shape, final),
+                                   alpha=self.settings['alpha'], beta=self.settings['beta'])
+
+    def sharpen(self, image, final):
+        return cv2.filter2D(image, -1, sharpening_kernel, dst=self.buffer('sharpen', image.shape, final))
+
+    def resize(self, image, final):
+        height, width = image.shape[:2]
+        target_height = int(self.settings['target_height'])
+        target_width = max(1, int(round(width * target_height / height)))
+        # Area averaging when shrinking, cubic when blowing small text up
+        interpolation = cv2.INTER_AREA if target_height < height else cv2.INTER_CUBIC
+        shape = (target_height, target_width) + image.shape[2:]
+        return cv2.resize(image, (target_width, target_height), dst=self.buffer('resize', shape, final),
+                          interpolation=interpolation)
+
+    def binarize(self, image, final):
+        if self.settings['binarize'] == 'otsu':
+            threshold, kind = 0, cv2.THRESH_BINARY + cv2.THRESH_OTSU
+        else:
+            threshold, kind = self.settings['binarize'], cv2.THRESH_BINARY
+        return cv2.threshold(image, threshold, 255, kind, dst=self.buffer('binarize', image.shape, final))[1]
+
+    def copy(self, image, final):
+        buffer = self.buffer('copy', image.shape, final)
+        np.copyto(buffer, image)
+        return buffer
+
+    def __call__(self, crop):
+        self.slot = (self.slot + 1) % self.ring_size
+        if not self.steps:
+            return self.copy(crop, True)
+        image = crop
+        for n, (_, step) in enumerate(self.steps):
+            image = step(image, n == len(self.steps) - 1)
+        return image
+
+    def preview(self, crop):
+        # (step name, image) after every step, copies that are safe to keep, for showing what each step does
+        stages = [('crop', crop.copy())]
+        image = crop
+        for name, step in self.steps:
+            image = step(image, False)
+            stages.append((name, image.copy()))
+        return stages
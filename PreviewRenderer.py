@@ -0,0 +1,120 @@
+import sys
+import time
+
+import cv2
+import numpy as np
+from PyQt5.QtCore import Qt, QRectF
+from PyQt5.QtGui import QImage, QPixmap
+
+from VideoCanvas import RectangleItem
+
+default_preview_fps = 10.0
+# Pixmaps are kept as 32-bit 0xffRRGGBB, which is B, G, R, 255 in memory on little-endian machines. On others
+# RGBX8888 (R, G, B, 255) is filled instead and Qt converts it once more.
+if sys.byteorder == 'little':
+    pixmap_format, bgr_conversion, gray_conversion = QImage.Format_RGB32, cv2.COLOR_BGR2BGRA, cv2.COLOR_GRAY2BGRA
+else:
+    pixmap_format, bgr_conversion, gray_conversion = QImage.Format_RGBX8888, cv2.COLOR_BGR2RGBA, cv2.COLOR_GRAY2RGBA
+
+
+class PreviewRenderer:
+    # Draws the video frame, the field patches and the region rectangles into a scene through items that
+    # are created once and updated in place, instead of clearing and rebuilding the scene for every sample.
+    # Frames are shrunk to the size they are shown at before being converted for Qt, and redraws are capped
+    # at max_fps however fast samples come in (frames arriving in between are dropped, not queued).
+    # Scene coordinates stay in full-resolution frame pixels, so rectangles and patches line up unscaled.
+    # The shrunk frame goes into a buffer reused from redraw to redraw (the QPixmap takes its own copy).
+    def __init__(self, scene, view, max_fps=default_preview_fps):
+        self.scene = scene
+        self.view = view
+        self.max_fps = max_fps
+        self.frame_item = scene.addPixmap(QPixmap())
+        self.frame_size = None
+        self.roi_items = {}  # (x, y) -> pixmap item
+        self.roi_drawn = {}  # (x, y) -> time last drawn
+        self.rect_items = []
+        self.scaled = None
+        self.frame_drawn = 0.0
+        self.drawn = 0
+        self.dropped = 0
+
+    def due(self, last_drawn):
+        return not self.max_fps or time.perf_counter() - last_drawn >= 1.0 / self.max_fps
+
+    def show_frame(self, frame, throttle=True):
+        # Returns False when the frame was dropped to stay under max_fps
+        if throttle and not self.due(self.frame_drawn):
+            self.dropped += 1
+            return False
+        self.frame_drawn = time.perf_counter()
+        self.drawn += 1
+        height, width = frame.shape[:2]
+        viewport = self.view.viewport().size()
+        scale = min(viewport.width() / width, viewport.height() / height, 1.0)
+        if scale < 1.0:
+            size = (max(1, int(width * scale)), max(1, int(height * scale)))
+            shape = (size[1], size[0]) + frame.shape[2:]
+            if self.scaled is None or self.scaled.shape != shape:
+                self.scaled = np.empty(shape, dtype=np.uint8)
+            frame = cv2.resize(frame, size, dst=self.scaled, interpolation=cv2.INTER_AREA)
+        self.frame_item.setPixmap(to_pixmap(frame))
+        self.frame_item.setScale(width / frame.shape[1])
+        if self.frame_size != (width, height):
+            self.frame_size = (width, height)
+            self.scene.setSceneRect(0, 0, width, height)
+            self.fit()
+        return True
+
+    def fit(self):
+        if self.frame_size is not None:
+            self.view.fitInView(self.scene.sceneRect(), Qt.KeepAspectRatio)
+
+    def show_roi(self, image, x, y, throttle=True):
+        key = (x, y)
+        if throttle and not self.due(self.roi_drawn.get(key, 0.0)):
+            return False
+        self.roi_drawn[key] = time.perf_counter()
+        item = self.roi_items.get(key)
+        if item is None:
+            item = self.roi_items[key] = self.scene.addPixmap(QPixmap())
+            item.setPos(x, y)
+            item.setZValue(1)
+        item.setPixmap(to_pixmap(image))
+        return True
+
+    def clear_rois(self):
+        for item in self.roi_items.values():
+            self.scene.removeItem(item)
+        self.roi_items.clear()
+        self.roi_drawn.clear()
+
+    def set_rectangles(self, boxes):
+        for n, (x1, y1, x2, y2) in enumerate(boxes):
+            rect = QRectF(x1, y1, x2 - x1, y2 - y1).normalized()
+            if n < len(self.rect_items):
+                self.rect_items[n].setRect(rect)
+            else:
+                item = RectangleItem(rect)
+                item.setZValue(2)
+                self.scene.addItem(item)
+                self.rect_items.append(item)
+        for item in self.rect_items[len(boxes):]:
+            self.scene.removeItem(item)
+        del self.rect_items[len(boxes):]
+
+
+def to_pixmap(image):
+    # One pass from the BGR (or grayscale) array, which may be a strided view such as an ROI of a frame,
+    # straight into the memory of the image the pixmap takes over. No intermediate array, no RGB swap copy,
+    # no conversion by Qt. Handing Qt the array itself instead (even as BGR888) costs a conversion in Qt
+    # that is slower than this, and a pixmap made from an image already in its own format keeps pointing
+    # at that memory, so a borrowed array could change under it.
+    height, width = image.shape[:2]
+    if not height or not width:
+        return QPixmap()
+    q_image = QImage(width, height, pixmap_format)
+    bits = q_image.bits()
+    bits.setsize(q_image.sizeInBytes())
+    pixels = np.ndarray((height, width, 4), np.uint8, bits, 0, (q_image.bytesPerLine(), 4, 1))
+    cv2.cvtColor(image, gray_conversion if image.ndim == 2 else bgr_conversion, dst=pixels)
+    return QPixmap.fromImage(q_image)
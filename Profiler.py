@@ -0,0 +1,142 @@
+import contextlib
+import json
+import threading
+import time
+from collections import defaultdict
+
+# Stages timed by extract_text_from_video and FrameSampler
+stage_names = ('seek', 'decode', 'gui', 'preprocess', 'bar', 'digits', 'ocr', 'postprocess', 'write')
+
+_null_stage = contextlib.nullcontext()
+
+
+class NullProfiler:
+    # Stand-in used when profiling is off, every call is a no-op so the hot loop pays next to nothing
+    enabled = False
+
+    def stage(self, name, roi=None):
+        return _null_stage
+
+    def add(self, name, seconds, roi=None, calls=1):
+        pass
+
+    def add_batch(self, name, seconds, rois):
+        pass
+
+    def begin_sample(self, frame_index):
+        pass
+
+    def end_sample(self):
+        pass
+
+    def close(self):
+        pass
+
+    def summary(self):
+        return None
+
+
+class _Stage:
+    __slots__ = ('profiler', 'name', 'roi', 'started')
+
+    def __init__(self, profiler, name, roi):
+        self.profiler = profiler
+        self.name = name
+        self.roi = roi
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        if isinstance(self.roi, list):
+            self.profiler.add_batch(self.name, time.perf_counter() - self.started, self.roi)
+        else:
+            self.profiler.add(self.name, time.perf_counter() - self.started, self.roi)
+        return False
+
+
+class StageProfiler:
+    # Wall time and call counts per stage, and per stage for each ROI. With a trace_path every sample
+    # also gets one JSON line with the time each stage took while that sample was being processed.
+    # Stages timed on other threads (decoding ahead, OCR workers) count towards the sample being processed
+    # when they finish, and overlapping stages can add up to more than the wall time.
+    enabled = True
+
+    def __init__(self, trace_path=None):
+        self.seconds = defaultdict(float)
+        self.calls = defaultdict(int)
+        self.roi_seconds = defaultdict(float)
+        self.roi_calls = defaultdict(int)
+        self.samples = 0
+        self.started = time.perf_counter()
+        self.trace_file = open(trace_path, 'w') if trace_path else None
+        self.sample = None
+        self.between_samples = {}  # Stage time spent before a sample began, e.g. decoding its frame
+        self.lock = threading.Lock()
+
+    def stage(self, name, roi=None):
+        # roi may also be a list of ROI names for a batched call, whose time is split evenly between them
+        return _Stage(self, name, roi)
+
+    def add(self, name, seconds, roi=None, calls=1):
+        with self.lock:
+            self._add(name, seconds, roi, calls)
+
+    def _add(self, name, seconds, roi, calls):
+        self.seconds[name] += seconds
+        self.calls[name] += calls
+        if roi is not None:
+            self.roi_seconds[roi, name] += seconds
+            self.roi_calls[roi, name] += calls
+        if self.trace_file is not None:
+            stages = self.sample['stages'] if self.sample is not None else self.between_samples
+            stages[name] = stages.get(name, 0.0) + seconds
+
+    def add_batch(self, name, seconds, rois):
+        with self.lock:
+            self._add(name, seconds, None, 1)
+            for roi in rois:
+                self.roi_seconds[roi, name] += seconds / len(rois)
+                self.roi_calls[roi, name] += 1
+
+    def begin_sample(self, frame_index):
+        self.samples += 1
+        if self.trace_file is not None:
+            with self.lock:
+                self.sample = {'frame': frame_index, 'started': time.perf_counter() - self.started,
+                               'stages': self.between_samples}
+                self.between_samples = {}
+
+    def end_sample(self):
+        with self.lock:
+            sample, self.sample = self.sample, None
+        if sample is not None:
+            self.trace_file.write(json.dumps(sample) + '\n')
+
+    def close(self):
+        self.end_sample()
+        if self.trace_file is not None:
+            self.trace_file.close()
+            self.trace_file = None
+
+    def summary(self):
+        wall = time.perf_counter() - self.started
+        stages = {}
+        for name in sorted(self.seconds, key=self.seconds.get, reverse=True):
+            stages[name] = {'seconds': self.seconds[name],
+                            'calls': self.calls[name],
+                            'ms_per_call': 1000 * self.seconds[name] / self.calls[name] if self.calls[name] else 0.0,
+                            'share': self.seconds[name] / wall if wall else 0.0}
+        rois = defaultdict(dict)
+        for (roi, name), seconds in self.roi_seconds.items():
+            rois[roi][name] = {'seconds': seconds, 'calls': self.roi_calls[roi, name]}
+        return {'wall_s': wall, 'samples': self.samples, 'stages': stages, 'rois': dict(rois)}
+
+    def report(self):
+        summary = self.summary()
+        lines = [f"{summary['samples']} samples in {summary['wall_s']:.2f} s"]
+        for name, stage in summary['stages'].items():
+            lines.append(f"  {name:<12} {stage['seconds']:>9.3f} s {stage['calls']:>8} calls "
+                         f"{stage['ms_per_call']:>9.3f} ms/call {stage['share']:>6.1%}")
+        return '\n'.join(lines)
@@ -0,0 +1,66 @@
+import numpy as np
+import pandas as pd
+
+default_chunk_size = 1024
+
+
+class ResultAccumulator:
+    # Column store for extraction results. Every column is a list of fixed size, typed NumPy chunks,
+    # so adding a row never copies what is already stored. The DataFrame is only built once at the end.
+    def __init__(self, chunk_size=default_chunk_size):
+        self.chunk_size = chunk_size
+        self.columns = {}  # name -> (dtype, fill value)
+        self.row_count = 0
+        self._chunks = {}
+        self._chunk_count = 0
+
+    def add_column(self, name, dtype=np.float64):
+        if name in self.columns:
+            return
+        dtype = np.dtype(dtype)
+        fill = np.nan if np.issubdtype(dtype, np.floating) else None
+        self.columns[name] = (dtype, fill)
+        self._chunks[name] = [self._new_chunk(name) for _ in range(self._chunk_count)]
+
+    def _new_chunk(self, name):
+        dtype, fill = self.columns[name]
+        return np.full(self.chunk_size, fill, dtype=dtype)
+
+    def append_row(self):
+        row = self.row_count
+        if row == self._chunk_count * self.chunk_size:
+            for name in self.columns:
+                self._chunks[name].append(self._new_chunk(name))
+            self._chunk_count += 1
+        self.row_count += 1
+        return row
+
+    def set(self, row, name, value):
+        self._chunks[name][row // self.chunk_size][row % self.chunk_size] = value
+
+    def get(self, row, name):
+        return self._chunks[name][row // self.chunk_size][row % self.chunk_size]
+
+    def release(self, stop):
+        # Free the chunks that only hold rows before `stop` (e.g. already written to disk).
+        # Row numbers keep counting, released rows just can't be read back any more.
+        for name in self.columns:
+            for k in range(stop // self.chunk_size):
+                self._chunks[name][k] = None
+
+    def __len__(self):
+        return self.row_count
+
+    def to_dataframe(self, start=0, stop=None):
+        # Rows [start, stop) as a DataFrame, only touching the chunks that cover them
+        stop = self.row_count if stop is None else min(stop, self.row_count)
+        start = min(start, stop)
+        first_chunk = start // self.chunk_size
+        last_chunk = -(-stop // self.chunk_size)
+        offset = first_chunk * self.chunk_size
+        data = {}
+        for name, (dtype, _) in self.columns.items():
+            chunks = self._chunks[name][first_chunk:last_chunk]
+            column = np.concatenate(chunks) if chunks else np.empty(0, dtype=dtype)
+            data[name] = column[start - offset:stop - offset]
+        return pd.DataFrame(data, columns=list(self.columns), index=pd.RangeIndex(start, stop))
@@ -0,0 +1,102 @@
+import glob
+import json
+import os
+
+import pandas as pd
+
+default_flush_rows = 256
+
+
+class ResultWriter:
+    # Streams result rows to disk as the run goes and keeps a small checkpoint sidecar next to them,
+    # so an interrupted run can pick up where it stopped. CSV output is appended to in place, Parquet
+    # output is a directory of part files (which pandas.read_parquet reads back as one table).
+    # The checkpoint is only rewritten after the rows it describes are on disk.
+    def __init__(self, path, flush_rows=default_flush_rows):
+        self.path = path
+        self.checkpoint_path = path + '.checkpoint.json'
+        self.parquet = path.lower().endswith('.parquet')
+        self.flush_rows = flush_rows
+        self.config_hash = None
+        self.rows = 0
+        self.parts = 0
+        self.next_frame = None
+
+    def load_checkpoint(self):
+        try:
+            with open(self.checkpoint_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def save_checkpoint(self):
+        checkpoint = {'config_hash': self.config_hash,
+                      'next_frame': self.next_frame,
+                      'rows': self.rows,
+                      'parts': self.parts,
+                      'bytes': 0 if self.parquet or not os.path.exists(self.path) else os.path.getsize(self.path)}
+        tmp_path = self.checkpoint_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(checkpoint, f)
+        os.replace(tmp_path, self.checkpoint_path)
+
+    def start(self, config_hash, resume=True):
+        # Returns the frame to continue from, or None when starting over
+        self.config_hash = config_hash
+        checkpoint = self.load_checkpoint()
+        if resume and checkpoint is not None and checkpoint['config_hash'] == config_hash:
+            self.rows = checkpoint['rows']
+            self.parts = checkpoint['parts']
+            self.next_frame = checkpoint['next_frame']
+            self.drop_unrecorded(checkpoint)
+            return self.next_frame
+        self.clear()
+        return None
+
+    def drop_unrecorded(self, checkpoint):
+        # Anything written after the last checkpoint (crash mid-flush) is thrown away and redone
+        if self.parquet:
+            for part in self.part_paths()[self.parts:]:
+                os.remove(part)
+        elif os.path.exists(self.path) and os.path.getsize(self.path) > checkpoint['bytes']:
+            with open(self.path, 'r+b') as f:
+                f.truncate(checkpoint['bytes'])
+
+    def has_results(self):
+        if self.parquet:
+            return bool(self.part_paths())
+        return os.path.exists(self.path) and os.path.getsize(self.path) > 0
+
+    def clear(self):
+        if self.parquet:
+            for part in self.part_paths():
+                os.remove(part)
+        elif os.path.exists(self.path):
+            os.remove(self.path)
+        if os.path.exists(self.checkpoint_path):
+            os.remove(self.checkpoint_path)
+        self.rows = 0
+        self.parts = 0
+        self.next_frame = None
+
+    def part_paths(self):
+        return sorted(glob.glob(os.path.join(glob.escape(self.path), 'part-*.parquet')))
+
+    def write(self, df, next_frame):
+        if len(df):
+            if self.parquet:
+                os.makedirs(self.path, exist_ok=True)
+                df.to_parquet(os.path.join(self.path, f'part-{self.parts:05d}.parquet'), index=False)
+                self.parts += 1
+            else:
+                df.to_csv(self.path, mode='a', header=self.rows == 0, index=False)
+            self.rows += len(df)
+        self.next_frame = next_frame
+        self.save_checkpoint()
+
+    def read(self, dtype=None):
+        if self.parquet:
+            return pd.read_parquet(self.path) if self.part_paths() else pd.DataFrame()
+        if not os.path.exists(self.path) or os.path.getsize(self.path) == 0:
+            return pd.DataFrame()
+        return pd.read_csv(self.path, dtype=dtype)
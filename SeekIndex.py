@@ -0,0 +1,105 @@
+import os
+
+import cv2
+import numpy as np
+
+index_suffix = '.index.npz'
+
+
+class SeekIndex:
+    # Presentation time of every frame and which frames are keyframes, built once per video from its
+    # packets (nothing is decoded when the backend supports raw packet reads) and saved next to it.
+    # Times are exact on variable frame rate files, and FrameSampler uses the keyframes to seek to a
+    # keyframe and decode forward from there instead of trusting CAP_PROP_POS_FRAMES seeks.
+    def __init__(self, timestamps, keyframes, fps):
+        self.timestamps = np.asarray(timestamps, dtype=np.float64)  # Seconds, in display order
+        self.keyframes = None if keyframes is None else np.asarray(keyframes, dtype=np.int64)
+        self.fps = fps
+
+    @property
+    def frame_count(self):
+        return len(self.timestamps)
+
+    def frame_at(self, seconds):
+        # The frame on screen at `seconds`
+        frame_index = int(np.searchsorted(self.timestamps, seconds + 1e-6, side='right')) - 1
+        return min(max(frame_index, 0), max(self.frame_count - 1, 0))
+
+    def frames_before(self, seconds):
+        # Number of frames shown before `seconds`, i.e. the exclusive end frame of a range ending there
+        return int(np.searchsorted(self.timestamps, seconds, side='left'))
+
+    def time_of(self, frame_index):
+        if 0 <= frame_index < self.frame_count:
+            return float(self.timestamps[frame_index])
+        # Past the end, carry on at the nominal rate
+        last = self.timestamps[-1] if self.frame_count else 0.0
+        return float(last + (frame_index - self.frame_count + 1) / self.fps) if self.fps else float(last)
+
+    def keyframe_before(self, frame_index):
+        # Last keyframe at or before frame_index, None when keyframes are unknown
+        if self.keyframes is None or not len(self.keyframes):
+            return None
+        n = int(np.searchsorted(self.keyframes, frame_index, side='right')) - 1
+        return int(self.keyframes[max(n, 0)])
+
+    @classmethod
+    def build(cls, video_path):
+        video_capture = cv2.VideoCapture(video_path, cv2.CAP_FFMPEG)
+        if not video_capture.isOpened():
+            video_capture = cv2.VideoCapture(video_path)
+        if not video_capture.isOpened():
+            raise IOError(f'Could not open video {video_path}')
+        fps = video_capture.get(cv2.CAP_PROP_FPS)
+        # Raw mode hands back packets without decoding them, and says which ones are keyframes
+        raw = video_capture.set(cv2.CAP_PROP_FORMAT, -1)
+        times, keys = [], []
+        try:
+            while video_capture.grab():
+                times.append(video_capture.get(cv2.CAP_PROP_POS_MSEC) / 1000.0)
+                if raw:
+                    keys.append(bool(video_capture.get(cv2.CAP_PROP_LRF_HAS_KEY_FRAME)))
+        finally:
+            video_capture.release()
+        # Packets come in decode order, frames are numbered in display order
+        order = np.argsort(times, kind='stable')
+        timestamps = np.asarray(times, dtype=np.float64)[order]
+        keyframes = np.flatnonzero(np.asarray(keys, dtype=bool)[order]) if raw else None
+        return cls(timestamps, keyframes, fps)
+
+    @staticmethod
+    def source_stamp(video_path):
+        stat = os.stat(video_path)
+        return np.array([stat.st_size, stat.st_mtime_ns], dtype=np.int64)
+
+    def save(self, path, video_path):
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, timestamps=self.timestamps, fps=self.fps, source=self.source_stamp(video_path),
+                     keyframes=self.keyframes if self.keyframes is not None else np.array([-1]))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path, video_path):
+        # None when there is no index yet or the video changed since it was built
+        try:
+            with np.load(path) as arrays:
+                if not np.array_equal(arrays['source'], cls.source_stamp(video_path)):
+                    return None
+                keyframes = arrays['keyframes']
+                return cls(arrays['timestamps'], None if list(keyframes) == [-1] else keyframes, float(arrays['fps']))
+        except (OSError, KeyError, ValueError):
+            return None
+
+    @classmethod
+    def for_video(cls, video_path):
+        # The saved index if it's current, otherwise build one and save it for next time
+        path = video_path + index_suffix
+        index = cls.load(path, video_path)
+        if index is None:
+            index = cls.build(video_path)
+            try:
+                index.save(path, video_path)
+            except OSError:
+                pass  # Read-only location, the index just isn't kept
+        return index
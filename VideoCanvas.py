@@ -1,4 +1,4 @@
-from PyQt5.QtCore import pyqtSignal, QPointF, Qt, QRectF
+from PyQt5.QtCore import pyqtSignal, QPointF, Qt
 from PyQt5.QtGui import QPen
 from PyQt5.QtWidgets import QGraphicsView, QGraphicsRectItem
 
@@ -38,16 +38,7 @@ class VideoCanvas(QGraphicsView):
         if event.button() == Qt.LeftButton and self.dragging:
             self.dragging = False
             end_point = self.mapToScene(event.pos())
+            # The finished region is drawn with the others by whoever handles rectFinished
+            self.scene().removeItem(self.current_rect)
             self.rectFinished.emit(self.start_point, end_point)
             self.current_rect = None
-
-    def redraw_rectangles(self, region_fields):
-        if region_fields:
-            for i in range(0, len(region_fields), 7):  # 7 fields per region: x1, y1, x2, y2, name, vert, hor
-                x1 = float(region_fields[i].text())
-                y1 = float(region_fields[i + 1].text())
-                x2 = float(region_fields[i + 2].text())
-                y2 = float(region_fields[i + 3].text())
-                rect = QRectF(QPointF(x1, y1), QPointF(x2, y2)).normalized()
-                item = RectangleItem(rect)
-                self.scene().addItem(item)
\ No newline at end of file
@@ -0,0 +1,185 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+from PyQt5 import sip
+from PyQt5.QtGui import QImage, QPixmap
+from PyQt5.QtWidgets import QApplication
+
+from SyntheticHUD import write_synthetic_video
+from BarGauge import BarGauge, BandStack
+from ExtractJob import extraction_options, validate_job
+from ExtractText import extract_text_from_video
+from FrameSampler import FrameSampler
+from OCREngine import OCREngine
+from Preprocessor import Preprocessor
+from PreviewRenderer import to_pixmap
+
+# Memory traffic of the frame path, per sample, old way against the current one:
+#   python benchmarks/BenchmarkCopies.py --size 1920 1080
+# 'new KB' is how far NumPy/OpenCV memory rises above where it stood while one operation runs (tracemalloc),
+# 'copies' is that in units of the data handed on (a frame, an ROI, a bar band). The QPixmap's own copy is
+# made by Qt and isn't counted, the display rows are about time. 'extract' runs the whole loop with the OCR
+# model left out.
+
+
+class NoModel:
+    # Reader that finds nothing, so extraction runs its whole frame path without easyocr
+    def readtext(self, image, **kwargs):
+        return []
+
+    def recognize(self, image, **kwargs):
+        return []
+
+
+def measure(operation, repeat):
+    # (ms per call, bytes allocated on top of what was live before each call)
+    operation()
+    started = time.perf_counter()
+    for _ in range(repeat):
+        operation()
+    seconds = (time.perf_counter() - started) / repeat
+    tracemalloc.start()
+    added = []
+    for _ in range(repeat):
+        base = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        operation()
+        added.append(tracemalloc.get_traced_memory()[1] - base)
+    tracemalloc.stop()
+    return seconds * 1000, float(np.mean(added))
+
+
+def measure_extract(video_path, rois, keep_frames):
+    # Same, per sample of a whole extraction: with frames kept (shown) every sample decodes into a new array
+    engine = OCREngine()
+    engine._reader = NoModel()
+    job = validate_job({'video': video_path, 'rois': rois, 'interval': 10, 'seek_index': False})
+    video_capture = cv2.VideoCapture(video_path)
+    frame_count = int(video_capture.get(cv2.CAP_PROP_FRAME_COUNT))
+    fps = video_capture.get(cv2.CAP_PROP_FPS)
+    added = []
+    state = {}
+
+    def mark(done, total):
+        current, peak = tracemalloc.get_traced_memory()
+        if 'base' in state:
+            added.append(peak - state['base'])
+        tracemalloc.reset_peak()
+        state['base'] = current
+
+    tracemalloc.start()
+    started = time.perf_counter()
+    df = extract_text_from_video(video_capture=video_capture, video_path=video_path, time_interval=10,
+                                 start_time=0, end_time=frame_count / fps, ocr_engine=engine, progress=mark,
+                                 show_frames=keep_frames, on_frame=(lambda frame: None) if keep_frames else None,
+                                 **extraction_options(job))
+    seconds = time.perf_counter() - started
+    tracemalloc.stop()
+    video_capture.release()
+    return seconds * 1000 / max(len(df), 1), float(np.median(added))
+
+
+def rgb_to_pixmap(image):
+    # The display path as it used to be: an RGB copy of the frame, wrapped and then converted again by Qt
+    image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+    return QPixmap.fromImage(QImage(sip.voidptr(image.ctypes.data), image.shape[1], image.shape[0],
+                                    image.strides[0], QImage.Format_RGB888))
+
+
+def bgr888_to_pixmap(image):
+    # Qt 5.14+ reading the BGR array as it is, it converts to the pixmap's format itself
+    return QPixmap.fromImage(QImage(sip.voidptr(image.ctypes.data), image.shape[1], image.shape[0],
+                                    image.strides[0], QImage.Format_BGR888))
+
+
+def old_stack_canvas(images, gap=16):
+    # The canvas as it used to be built: a padded copy of every crop, then all of them stacked
+    width = max(image.shape[1] for image in images)
+    return np.vstack([cv2.copyMakeBorder(image, 0, gap, 0, width - image.shape[1], cv2.BORDER_CONSTANT,
+                                         value=int(np.median(image))) for image in images])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Measure the copies made per sample on the frame path.')
+    parser.add_argument('--size', type=int, nargs=2, default=[1280, 720], metavar=('WIDTH', 'HEIGHT'))
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args(argv)
+
+    app = QApplication.instance() or QApplication([])
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        video_path = os.path.join(tmp_dir, 'hud.avi')
+        rois, _ = write_synthetic_video(video_path, args.seconds, 30, *args.size, counters=4, codec='MJPG')
+        video_capture = cv2.VideoCapture(video_path)
+        frame = video_capture.read()[1]
+        text_box = next(roi['box'] for roi in rois if roi['type'] == 'text')
+        bar_box = next(roi['box'] for roi in rois if roi['type'] == 'horizontal_bar')
+        x1, y1, x2, y2 = text_box
+        roi = frame[y1:y2, x1:x2]
+
+        for name, ring_size in (('new array', None), ('ring', 6)):
+            video_capture.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            samples = iter(FrameSampler(video_capture, ring_size=ring_size))
+            rows.append(('decode', name, frame.nbytes, *measure(lambda: next(samples), args.repeat)))
+
+        convert = [('RGB copy', rgb_to_pixmap), ('into pixmap', to_pixmap)]
+        if hasattr(QImage, 'Format_BGR888'):
+            convert.insert(1, ('BGR888 wrap', bgr888_to_pixmap))
+        for name, convert_image in convert:
+            rows.append(('display frame', name, frame.nbytes, *measure(lambda: convert_image(frame), args.repeat)))
+        for name, convert_image in convert:
+            rows.append(('display ROI', name, roi.nbytes, *measure(lambda: convert_image(roi), args.repeat)))
+
+        for name, channel in (('weighted gray', None), ('one channel', 'g')):
+            preprocessor = Preprocessor(channel=channel)
+            rows.append(('grayscale ROI', name, roi.nbytes // 3, *measure(lambda: preprocessor(roi), args.repeat)))
+
+        gauge = BarGauge(bar_box)
+        band_bytes = gauge.crop(frame).nbytes
+        bands = []
+
+        def copy_band():
+            bands.append(gauge.crop(frame).copy())
+            if len(bands) == 8:
+                gauge.fill(np.stack(bands))
+                bands.clear()
+
+        stack = BandStack(gauge)
+
+        def stack_band():
+            stack.append(0, frame)
+            if len(stack) == 8:
+                stack.measure()
+
+        rows.append(('bar band', 'copy + stack', band_bytes, *measure(copy_band, args.repeat * 8)))
+        rows.append(('bar band', 'band stack', band_bytes, *measure(stack_band, args.repeat * 8)))
+
+        crops = [Preprocessor()(frame[y1:y2, x1:x2]).copy() for _ in range(16)]
+        crop_bytes = sum(crop.nbytes for crop in crops)
+        rows.append(('OCR canvas', 'pad + vstack', crop_bytes, *measure(lambda: old_stack_canvas(crops), args.repeat)))
+        rows.append(('OCR canvas', 'one canvas', crop_bytes,
+                     *measure(lambda: OCREngine._stack_canvas(crops, range(len(crops)), 16), args.repeat)))
+        video_capture.release()
+
+        for name, keep_frames in (('frames kept', True), ('ring', False)):
+            rows.append(('extract', name, frame.nbytes, *measure_extract(video_path, rois, keep_frames)))
+
+    print(f"{'stage':<14} {'variant':<14} {'ms':>8} {'new KB':>10} {'copies':>7}")
+    for stage, name, payload, ms, added in rows:
+        print(f'{stage:<14} {name:<14} {ms:>8.3f} {added / 1024:>10.1f} {added / payload:>7.2f}')
+    del app
+
+
+if __name__ == '__main__':
+    main()
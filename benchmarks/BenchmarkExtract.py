@@ -0,0 +1,166 @@
+import argparse
+import itertools
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from SyntheticHUD import write_synthetic_video
+from ExtractJob import extraction_options, validate_job
+from ExtractText import extract_text_from_video
+from FrameSampler import FrameSampler
+from OCREngine import get_ocr_engine
+from Profiler import StageProfiler
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Throughput / accuracy benchmark for extract_text_from_video on synthetic HUD footage:
+#   python benchmarks/BenchmarkExtract.py --intervals 10 30 --counters 1 4 8 --contrast off on
+# Every configuration runs in a fresh process so peak memory and model load are measured cleanly.
+# Below each row is the time per sample spent in each stage (see Profiler.py).
+
+
+def peak_rss_mb():
+    if resource is None:
+        return float('nan')
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    scale = 1 / 1024 ** 2 if sys.platform == 'darwin' else 1 / 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+
+
+def decode_only(video_path, interval):
+    video_capture = cv2.VideoCapture(video_path)
+    started = time.perf_counter()
+    samples = sum(1 for _ in FrameSampler(video_capture, 0, interval))
+    video_capture.release()
+    return samples, time.perf_counter() - started
+
+
+def score(df, truth, rois, fps):
+    frames = np.round(df['time'].to_numpy(dtype=float) * fps).astype(int)
+    expected = truth.iloc[frames].reset_index(drop=True)
+    scores = {}
+    for roi in rois:
+        name = roi['name']
+        if roi['type'] == 'text':
+            found = df[name].astype(object).where(df[name].notna(), None).reset_index(drop=True)
+            scores[name] = float(np.mean([str(a) == b for a, b in zip(found, expected[name])]))
+        else:
+            error = np.abs(df[name].to_numpy(dtype=float) - expected[name].to_numpy(dtype=float))
+            scores[name] = float(np.nanmean(error)) if np.any(~np.isnan(error)) else float('nan')
+    return scores
+
+
+def run_config(video_path, rois, truth, fps, config):
+    metrics = dict(config)
+    try:
+        started = time.perf_counter()
+        engine = get_ocr_engine()
+        engine.load()
+        metrics['engine_load_s'] = time.perf_counter() - started
+
+        _, metrics['decode_s'] = decode_only(video_path, config['interval'])
+
+        job = {'video': video_path, 'rois': rois, 'interval': config['interval'],
+               'enhance_contrast': config['contrast'], 'frame_source': config['source']}
+        if not config['pipeline']:
+            job.update(decode_queue=0, ocr_workers=0)
+        job = validate_job(job)
+        stamps = []
+        profiler = StageProfiler()
+        video_capture = cv2.VideoCapture(video_path)
+        started = time.perf_counter()
+        df = extract_text_from_video(video_capture=video_capture,
+                                     video_path=video_path,
+                                     time_interval=config['interval'],
+                                     start_time=0,
+                                     end_time=len(truth) / fps,
+                                     ocr_engine=engine,
+                                     profiler=profiler,
+                                     progress=lambda done, total: stamps.append(time.perf_counter()),
+                                     **extraction_options(job))
+        wall = time.perf_counter() - started
+        video_capture.release()
+
+        latencies = np.diff([started] + stamps) * 1000
+        metrics.update(samples=len(df),
+                       wall_s=wall,
+                       samples_per_s=len(df) / wall if wall else float('nan'),
+                       realtime_x=(len(df) * config['interval'] / fps) / wall if wall else float('nan'),
+                       latency_p50_ms=float(np.percentile(latencies, 50)) if len(latencies) else float('nan'),
+                       latency_p95_ms=float(np.percentile(latencies, 95)) if len(latencies) else float('nan'),
+                       stage_ms_per_sample={name: 1000 * stage['seconds'] / max(len(df), 1)
+                                            for name, stage in df.attrs['profile']['stages'].items()},
+                       accuracy=score(df, truth, rois, fps))
+    except Exception as e:
+        metrics['error'] = f'{type(e).__name__}: {e}'
+    metrics['peak_rss_mb'] = peak_rss_mb()
+    return metrics
+
+
+def format_row(m):
+    if 'error' in m:
+        return (f"{m['interval']:>8} {m['counters']:>8} {str(m['contrast']):>8} {m['source']:>8} "
+                f"{str(m['pipeline']):>8}  ERROR {m['error']}")
+    text = [v for k, v in m['accuracy'].items() if 'bar' not in k]
+    bars = [v for k, v in m['accuracy'].items() if 'bar' in k]
+    return (f"{m['interval']:>8} {m['counters']:>8} {str(m['contrast']):>8} {m['source']:>8} "
+            f"{str(m['pipeline']):>8} {m['samples']:>8} "
+            f"{m['samples_per_s']:>9.2f} {m['realtime_x']:>9.2f} {m['decode_s'] / max(m['samples'], 1) * 1000:>9.1f} "
+            f"{m['latency_p50_ms']:>9.1f} {m['latency_p95_ms']:>9.1f} {m['peak_rss_mb']:>9.0f} "
+            f"{np.mean(text):>9.1%} {np.nanmean(bars) if bars else float('nan'):>9.3f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark extraction on synthetic HUD videos.')
+    parser.add_argument('--intervals', type=int, nargs='+', default=[10, 30])
+    parser.add_argument('--counters', type=int, nargs='+', default=[1, 4, 8], help='Text ROIs besides the timestamp')
+    parser.add_argument('--contrast', choices=['off', 'on'], nargs='+', default=['off', 'on'])
+    parser.add_argument('--sources', choices=['opencv', 'ffmpeg'], nargs='+', default=['opencv'],
+                        help='Frame sources to compare')
+    parser.add_argument('--pipeline', choices=['off', 'on'], nargs='+', default=['on'],
+                        help='Decode and OCR on their own threads (on) or everything in one loop (off)')
+    parser.add_argument('--seconds', type=float, default=20)
+    parser.add_argument('--fps', type=float, default=30)
+    parser.add_argument('--size', type=int, nargs=2, default=[1280, 720], metavar=('WIDTH', 'HEIGHT'))
+    parser.add_argument('--codec', default='mp4v')
+    parser.add_argument('--json', help='Also write all metrics to this file')
+    args = parser.parse_args(argv)
+
+    context = multiprocessing.get_context('spawn')
+    results = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        print(f"{'interval':>8} {'rois':>8} {'contrast':>8} {'source':>8} {'pipeline':>8} {'samples':>8} {'sample/s':>9} {'realtime':>9} "
+              f"{'decode ms':>9} {'p50 ms':>9} {'p95 ms':>9} {'peak MB':>9} {'text acc':>9} {'bar err':>9}")
+        for counters in args.counters:
+            video_path = os.path.join(tmp_dir, f'hud_{counters}.{"avi" if args.codec == "MJPG" else "mp4"}')
+            rois, truth = write_synthetic_video(video_path, args.seconds, args.fps, *args.size, counters=counters,
+                                                codec=args.codec)
+            for interval, contrast, source, pipeline in itertools.product(args.intervals, args.contrast, args.sources,
+                                                                          args.pipeline):
+                config = {'interval': interval, 'counters': counters, 'contrast': contrast == 'on', 'source': source,
+                          'pipeline': pipeline == 'on'}
+                with context.Pool(1) as pool:
+                    metrics = pool.apply(run_config, (video_path, rois, truth, args.fps, config))
+                results.append(metrics)
+                print(format_row(metrics), flush=True)
+                if 'stage_ms_per_sample' in metrics:
+                    print(' ' * 8 + '  '.join(f'{name} {ms:.1f}ms' for name, ms in metrics['stage_ms_per_sample'].items()))
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
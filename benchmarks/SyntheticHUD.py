@@ -0,0 +1,87 @@
+import cv2
+import numpy as np
+import pandas as pd
+
+# Synthetic "launch stream" footage with HUD fields whose values are known for every frame:
+# a timestamp, a number of counters that tick at different rates, a horizontal and a vertical bar.
+
+font = cv2.FONT_HERSHEY_SIMPLEX
+text_scale = 1.0
+text_thickness = 2
+counter_box = (190, 44)
+bar_size = (320, 24)
+
+
+def make_layout(width, height, counters):
+    rois = [{'name': 'timestamp', 'box': [40, 30, 40 + counter_box[0], 30 + counter_box[1]], 'type': 'text'}]
+    columns = max(1, (width - 80) // (counter_box[0] + 20))
+    for k in range(counters):
+        x1 = 40 + (k % columns) * (counter_box[0] + 20)
+        y1 = height - 120 - (k // columns) * (counter_box[1] + 16)
+        rois.append({'name': f'counter{k}', 'box': [x1, y1, x1 + counter_box[0], y1 + counter_box[1]], 'type': 'text'})
+    x1 = width - bar_size[0] - 40
+    rois.append({'name': 'hbar', 'box': [x1, 40, x1 + bar_size[0], 40 + bar_size[1]], 'type': 'horizontal_bar'})
+    x1 = width - 80
+    rois.append({'name': 'vbar', 'box': [x1, 120, x1 + bar_size[1], 120 + bar_size[0]], 'type': 'vertical_bar'})
+    return rois
+
+
+def truth_values(frame_index, fps, duration, counters):
+    t = frame_index / fps
+    values = {'timestamp': '{:02d}:{:02d}:{:02d}'.format(int(t // 3600), int(t // 60) % 60, int(t) % 60)}
+    for k in range(counters):
+        # Counter k ticks 2**k times a second, so low counters are mostly static and high ones change every frame
+        values[f'counter{k}'] = str(1000 * (k + 1) + int(t * 2 ** k))
+    values['hbar'] = min(1.0, t / duration)
+    values['vbar'] = max(0.0, 1.0 - t / duration)
+    return values
+
+
+def draw_text(frame, box, text):
+    x1, y1, x2, y2 = box
+    (text_width, text_height), _ = cv2.getTextSize(text, font, text_scale, text_thickness)
+    cv2.putText(frame, text, (x1 + 6, y1 + (y2 - y1 + text_height) // 2), font, text_scale,
+                (255, 255, 255), text_thickness, cv2.LINE_AA)
+
+
+def draw_bar(frame, box, fill, vertical):
+    x1, y1, x2, y2 = box
+    frame[y1:y2, x1:x2] = (70, 70, 70)
+    if vertical:
+        top = y2 - int(round(fill * (y2 - y1)))
+        frame[top:y2, x1:x2] = (240, 240, 240)
+    else:
+        frame[y1:y2, x1:x1 + int(round(fill * (x2 - x1)))] = (240, 240, 240)
+
+
+def render_frame(background, rois, values, rng):
+    frame = background.copy()
+    # A little sensor noise so unchanged fields are not bit-identical between frames
+    frame += rng.integers(0, 4, size=frame.shape, dtype=np.uint8)
+    for roi in rois:
+        if roi['type'] == 'text':
+            draw_text(frame, roi['box'], values[roi['name']])
+        else:
+            draw_bar(frame, roi['box'], values[roi['name']], roi['type'] == 'vertical_bar')
+    return frame
+
+
+def write_synthetic_video(path, seconds=20, fps=30, width=1280, height=720, counters=4, codec='mp4v', seed=0):
+    # Returns (rois, truth) where truth has one row per frame with the exact value of every field
+    rng = np.random.default_rng(seed)
+    rois = make_layout(width, height, counters)
+    # Dim diagonal gradient standing in for the actual video content
+    ramp = np.add.outer(np.arange(height), np.arange(width)) * (60.0 / (width + height))
+    background = np.repeat(ramp[:, :, np.newaxis], 3, axis=2).astype(np.uint8)
+
+    frame_count = int(seconds * fps)
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*codec), fps, (width, height))
+    if not writer.isOpened():
+        raise IOError(f"Could not open a '{codec}' writer for {path}")
+    truth = []
+    for frame_index in range(frame_count):
+        values = truth_values(frame_index, fps, seconds, counters)
+        writer.write(render_frame(background, rois, values, rng))
+        truth.append(values)
+    writer.release()
+    return rois, pd.DataFrame(truth)
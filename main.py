@@ -1,9 +1,11 @@
+import multiprocessing
 import sys
 
 from PyQt5.QtWidgets import QApplication
 from OCRApp import VideoOCRApp
 
 if __name__ == '__main__':
+    multiprocessing.freeze_support()  # Worker processes in the frozen (PyInstaller) build
     app = QApplication(sys.argv)
     ex = VideoOCRApp()
     ex.show()
@@ -0,0 +1,30 @@
+import os
+import tempfile
+from unittest import TestCase
+
+import cv2
+import numpy as np
+
+from AdaptiveSampler import AdaptiveSampler
+
+
+class Test(TestCase):
+    def test_bisects_only_around_changes(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'step.avi')
+            writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'MJPG'), 30, (64, 48))
+            for i in range(120):
+                frame = np.zeros((48, 64, 3), dtype=np.uint8)
+                frame[8:24, 8:40] = 200 if i >= 37 else 20  # The ROI changes once, at frame 37
+                writer.write(frame)
+            writer.release()
+
+            video_capture = cv2.VideoCapture(path)
+            sampler = AdaptiveSampler(video_capture, [[8, 8, 40, 24]], start_frame=0, interval=30, min_interval=1)
+            frames = [frame_index for frame_index, _, _ in sampler]
+            video_capture.release()
+
+        self.assertEqual(frames, sorted(frames))
+        self.assertTrue({0, 30, 36, 37, 60, 90} <= set(frames))
+        self.assertEqual(sampler.refined, len(frames) - 4)
+        self.assertLessEqual(sampler.refined, 6)
@@ -0,0 +1,79 @@
+import os
+import tempfile
+from unittest import TestCase
+
+import cv2
+import numpy as np
+
+from BarGauge import BarGauge, BandStack
+from ExtractText import extract_text_from_video
+
+
+def draw_bar(fill, length=300, thickness=24, vertical=False):
+    # Dark bar filled with a bright level, the pixel the fill ends in is partly lit like an anti-aliased edge
+    bar = np.full((thickness, length, 3), 60, dtype=np.uint8)
+    filled = int(fill * length)
+    bar[:, :filled] = 230
+    if filled < length:
+        bar[:, filled] = 60 + (fill * length - filled) * 170
+    return np.ascontiguousarray(bar.transpose(1, 0, 2)[::-1]) if vertical else bar
+
+
+class Test(TestCase):
+    def test_sub_pixel_fill(self):
+        gauge = BarGauge((0, 0, 300, 24))
+        for fill in (0.0, 0.25, 0.3333, 0.777, 1.0):
+            self.assertAlmostEqual(gauge.fill(draw_bar(fill)), fill, delta=0.001)
+        vertical = BarGauge((0, 0, 24, 300), vertical=True)
+        for fill in (0.0, 0.1234, 0.5, 1.0):
+            self.assertAlmostEqual(vertical.fill(draw_bar(fill, vertical=True)), fill, delta=0.001)
+
+    def test_stack_matches_single_frames(self):
+        fills = np.linspace(0, 1, 50)
+        frames = np.zeros((50, 80, 400, 3), dtype=np.uint8)
+        frames[:, 30:54, 50:350] = np.stack([draw_bar(fill) for fill in fills])
+        gauge = BarGauge((50, 30, 350, 54))
+        stacked = gauge.fill_frames(frames)
+        self.assertEqual(stacked.shape, (50,))
+        np.testing.assert_allclose(stacked, [gauge.fill(gauge.crop(frame)) for frame in frames])
+        np.testing.assert_allclose(stacked, fills, atol=0.005)
+
+    def test_band_stack_reuses_its_array(self):
+        gauge = BarGauge((50, 30, 350, 54))
+        stack = BandStack(gauge)
+        frame = np.zeros((80, 400, 3), dtype=np.uint8)
+        fills = np.linspace(0, 1, 20)
+        for row, fill in enumerate(fills):
+            frame[30:54, 50:350] = draw_bar(fill)
+            band = stack.append(row, frame)
+            self.assertFalse(np.shares_memory(band, frame))
+        measured = stack.measure()
+        self.assertEqual([row for row, _ in measured], list(range(20)))
+        np.testing.assert_allclose([fill for _, fill in measured], fills, atol=0.005)
+        bands = stack.bands
+        stack.append(0, frame)
+        self.assertEqual((len(stack), stack.bands is bands), (1, True))
+        self.assertEqual(gauge.preview(band, 1.0).shape, band.shape[:2])
+        vertical = BarGauge((0, 0, 24, 300), vertical=True)
+        band = vertical.crop(draw_bar(0.5, vertical=True))
+        self.assertEqual(vertical.preview(band, 0.5).shape, band.shape[:2])
+
+    def test_bars_sampled_between_text_samples(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'bars.avi')
+            writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'MJPG'), 30, (320, 160))
+            for i in range(30):
+                frame = np.zeros((160, 320, 3), dtype=np.uint8)
+                frame[20:44, 10:310] = draw_bar(i / 30)
+                frame[60:160, 10:34] = draw_bar(1 - i / 30, length=100, vertical=True)
+                writer.write(frame)
+            writer.release()
+
+            video_capture = cv2.VideoCapture(path)
+            df = extract_text_from_video(video_capture=video_capture, roi_coordinates=[[10, 20, 310, 44], [10, 60, 34, 160]],
+                                         roi_names=['fuel', 'lox'], time_interval=10, start_time=0, end_time=1,
+                                         hor_flags=[True, False], vert_flags=[False, True], bar_interval=2)
+            video_capture.release()
+        self.assertEqual(len(df), 15)
+        np.testing.assert_allclose(df['fuel'], np.arange(0, 30, 2) / 30, atol=0.02)
+        np.testing.assert_allclose(df['lox'], 1 - np.arange(0, 30, 2) / 30, atol=0.03)
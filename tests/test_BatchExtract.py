@@ -0,0 +1,41 @@
+import os
+import tempfile
+from unittest import TestCase
+
+from BatchExtract import find_videos, batch_jobs, run_batch
+from ExtractJob import scale_rois
+
+
+class Test(TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        for name in ('b.mp4', 'a.MOV', 'notes.txt'):
+            open(os.path.join(self.tmp_dir.name, name), 'w').close()
+        self.template = {'interval': 15, 'frame_size': [1280, 720],
+                         'rois': [{'name': 'speed', 'box': [100, 50, 300, 90]}]}
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_jobs_per_video(self):
+        videos = find_videos([self.tmp_dir.name, 'extra.mp4'])
+        self.assertEqual([os.path.basename(video) for video in videos], ['a.MOV', 'b.mp4', 'extra.mp4'])
+
+        jobs = batch_jobs(self.template, videos, output_dir='out')
+        self.assertEqual(jobs[1]['output'], os.path.join('out', 'b.mp4.csv'))
+        self.assertEqual([job['workers'] for job in jobs], [1, 1, 1])
+        self.assertEqual(jobs[0]['interval'], 15)
+
+    def test_scales_rois_to_video(self):
+        job = batch_jobs(self.template, ['extra.mp4'])[0]
+        self.assertIs(scale_rois(job, (1280, 720)), job)
+        self.assertEqual(scale_rois(job, (1920, 1080))['rois'][0]['box'], [150, 75, 450, 135])
+
+    def test_failures_are_reported(self):
+        statuses = []
+        jobs = batch_jobs(self.template, [os.path.join(self.tmp_dir.name, 'b.mp4')])
+        result = run_batch(jobs, workers=1, on_status=lambda s: statuses.append([status['state'] for status in s]))
+
+        self.assertEqual(result[0]['state'], 'failed')
+        self.assertIn('Could not open video', result[0]['error'])
+        self.assertEqual(statuses[-1], ['failed'])
@@ -0,0 +1,59 @@
+import os
+import tempfile
+from unittest import TestCase
+
+import cv2
+import numpy as np
+
+from ChangeDetector import ChangeDetector
+from ExtractText import extract_text_from_video
+
+
+class CountingEngine:
+    def __init__(self):
+        self.images = 0
+
+    def readtext_batch(self, images, **kwargs):
+        self.images += len(images)
+        return [[([[0, 0], [4, 0], [4, 4], [0, 4]], str(int(round(image.mean(), -1))), 0.9)] for image in images]
+
+    recognize_batch = readtext_batch
+
+
+class Test(TestCase):
+    def test_skips_unchanged_crops(self):
+        detector = ChangeDetector(tolerance=10)
+        crop = np.full((20, 60), 40, dtype=np.uint8)
+        crop[5:15, 10:20] = 220
+
+        self.assertTrue(detector.changed('speed', crop))
+        noisy = crop.copy()
+        noisy[::2, ::3] += 3
+        self.assertFalse(detector.changed('speed', noisy))
+
+        digit_changed = crop.copy()
+        digit_changed[5:15, 40:50] = 220
+        self.assertTrue(detector.changed('speed', digit_changed))
+        self.assertTrue(detector.changed('altitude', crop))
+        self.assertEqual(detector.summary(), {'checks': 4, 'skips': 1, 'skip_rate': 0.25})
+
+    def test_extraction_reuses_text_of_unchanged_crops(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'steps.avi')
+            writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'MJPG'), 30, (64, 48))
+            for i in range(60):
+                # The field holds a level for 20 frames, then steps up
+                writer.write(np.full((48, 64, 3), 40 + (i // 20) * 60, dtype=np.uint8))
+            writer.release()
+
+            engine = CountingEngine()
+            video_capture = cv2.VideoCapture(path)
+            df = extract_text_from_video(video_capture=video_capture, roi_coordinates=[[8, 8, 56, 40]],
+                                         roi_names=['speed'], time_interval=2, start_time=0, end_time=2,
+                                         ocr_engine=engine, change_tolerance=24)
+            video_capture.release()
+
+        self.assertEqual(list(df['speed']), ['40'] * 10 + ['100'] * 10 + ['160'] * 10)
+        # Only the first crop of each level went to OCR, the rest took the text read before
+        self.assertEqual(engine.images, 3)
+        self.assertEqual(df.attrs['change_detection']['skips'], 27)
@@ -0,0 +1,54 @@
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from unittest import TestCase
+
+import cv2
+import numpy as np
+
+from DigitRecognizer import DigitRecognizer, load_digit_templates, save_digit_templates
+
+
+def render_digits(text, noise=0, seed=0):
+    image = np.full((44, 220), 20, dtype=np.uint8)
+    cv2.putText(image, text, (6, 33), cv2.FONT_HERSHEY_SIMPLEX, 1.0, 255, 2, cv2.LINE_AA)
+    if noise:
+        jitter = np.random.default_rng(seed).integers(-noise, noise, image.shape)
+        image = np.clip(image.astype(int) + jitter, 0, 255).astype(np.uint8)
+    return image
+
+
+class Test(TestCase):
+    def test_learns_font_and_reads_new_values(self):
+        recognizer = DigitRecognizer()
+        self.assertFalse(recognizer.ready)
+        self.assertTrue(recognizer.learn(render_digits('0123456789'), '0123456789'))
+        self.assertTrue(recognizer.learn(render_digits('12:34.5'), '12:34.5'))
+        self.assertFalse(recognizer.learn(render_digits('12'), '123'))
+
+        for seed, text in enumerate(['9081726354', '00:01:23', '3.14159', '7777.7']):
+            found, confidence = recognizer.recognize(render_digits(text, noise=6, seed=seed))
+            self.assertEqual(found, text)
+            self.assertGreater(confidence, 0.9)
+        self.assertEqual(recognizer.readtext(render_digits('42'))[0][1], '42')
+
+    def test_templates_round_trip(self):
+        recognizer = DigitRecognizer()
+        recognizer.learn(render_digits('0123456789'), '0123456789')
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'digits.npz')
+            save_digit_templates(path, {'speed': recognizer})
+            loaded = load_digit_templates(path, ['speed', 'altitude'])
+        self.assertEqual(loaded['speed'].recognize(render_digits('305'))[0], '305')
+        self.assertFalse(loaded['altitude'].ready)
+
+    def test_concurrent_saves(self):
+        # Shards sharing one templates file all save at the end of their run
+        recognizer = DigitRecognizer()
+        recognizer.learn(render_digits('0123456789'), '0123456789')
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'digits.npz')
+            with ThreadPoolExecutor(8) as pool:
+                list(pool.map(lambda _: save_digit_templates(path, {'speed': recognizer}), range(32)))
+            self.assertEqual(os.listdir(tmp_dir), ['digits.npz'])
+            self.assertEqual(load_digit_templates(path, ['speed'])['speed'].recognize(render_digits('305'))[0], '305')
@@ -0,0 +1,49 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from unittest import TestCase
+
+from ExtractJob import load_job, extraction_options, validate_job
+
+package_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class Test(TestCase):
+    def test_load_job(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            job_path = os.path.join(tmp_dir, 'flight.json')
+            with open(job_path, 'w') as f:
+                json.dump({'video': 'flight.mp4',
+                           'interval': 15,
+                           'rois': [{'name': 'timestamp', 'box': [10, 20.7, 110, 40]},
+                                    {'name': 'fuel', 'box': [0, 50, 200, 60], 'type': 'horizontal_bar'}]}, f)
+            job = load_job(job_path)
+
+            self.assertEqual(job['video'], os.path.join(tmp_dir, 'flight.mp4'))
+            self.assertEqual(job['output'], os.path.join(tmp_dir, 'flight.mp4.csv'))
+            options = extraction_options(job)
+            self.assertEqual(options['roi_coordinates'], [[10, 20, 110, 40], [0, 50, 200, 60]])
+            self.assertEqual(options['hor_flags'], [False, True])
+            self.assertEqual(options['recognize_only'], [False, False])
+
+    def test_rejects_unknown_roi_type(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            job_path = os.path.join(tmp_dir, 'bad.json')
+            with open(job_path, 'w') as f:
+                json.dump({'video': 'flight.mp4', 'rois': [{'box': [0, 0, 1, 1], 'type': 'dial'}]}, f)
+            with self.assertRaises(ValueError):
+                load_job(job_path)
+
+    def test_rejects_single_process_options_with_workers(self):
+        job = {'video': 'flight.mp4', 'rois': [{'box': [0, 0, 1, 1]}], 'workers': 4}
+        self.assertEqual(validate_job(job)['workers'], 4)
+        for option in ({'resume': True}, {'profile': True}, {'trace': 'trace.jsonl'}):
+            with self.assertRaises(ValueError):
+                validate_job(dict(job, **option))
+        validate_job(dict(job, resume=False))
+
+    def test_headless_import_skips_qt(self):
+        code = "import sys, ExtractJob; sys.exit('PyQt5' in sys.modules)"
+        self.assertEqual(subprocess.run([sys.executable, '-c', code], cwd=package_dir).returncode, 0)
@@ -0,0 +1,61 @@
+import os
+import shutil
+import sys
+import tempfile
+from unittest import TestCase, skipUnless
+
+import cv2
+
+from FFmpegSampler import FFmpegSampler, filter_graph, passthrough_options, roi_layout
+from FrameSampler import FrameSampler
+from test_FrameSampler import write_test_video
+
+
+class Test(TestCase):
+    def test_layout(self):
+        # Neighbouring fields are cut out as one box
+        local, size, crops = roi_layout([[100, 50, 200, 80], [100, 90, 220, 110]])
+        self.assertEqual(crops, [(100, 50, 120, 60)])
+        self.assertEqual(local, [(0, 0, 100, 30), (0, 40, 120, 60)])
+        self.assertEqual(size, (120, 60))
+
+        # Fields in opposite corners are stacked, clipped to the frame
+        local, size, crops = roi_layout([[10, 10, 110, 40], [1800, 1000, 1950, 1030]], frame_size=(1920, 1080))
+        self.assertEqual(crops, [(10, 10, 100, 30), (1800, 1000, 120, 30)])
+        self.assertEqual(local, [(0, 0, 100, 30), (0, 30, 120, 60)])
+        self.assertEqual(size, (120, 60))
+        graph = filter_graph(crops, size, 30)
+        self.assertIn("select='not(mod(n\\,30))',split=2", graph)
+        self.assertIn('crop=120:30:1800:1000,pad=120:30:0:0', graph)
+        self.assertTrue(graph.endswith('vstack=inputs=2[out]'))
+
+    @skipUnless(os.name == 'posix', 'stand-in ffmpeg is a script')
+    def test_passthrough_option_follows_version(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            for name, options, expected in (('new', '-fps_mode  set framerate mode', ['-fps_mode', 'passthrough']),
+                                            ('old', '-vsync  video sync method', ['-vsync', '0'])):
+                path = os.path.join(tmp_dir, name)
+                with open(path, 'w') as f:
+                    f.write(f'#!{sys.executable}\nprint({options!r})\n')
+                os.chmod(path, 0o755)
+                self.assertEqual(passthrough_options(path), expected)
+                self.assertEqual(FFmpegSampler('in.mp4', [[0, 0, 8, 8]], ffmpeg=path).command()[-7:-5], expected)
+        self.assertEqual(passthrough_options(os.path.join(tmp_dir, 'missing')), ['-vsync', '0'])
+
+    @skipUnless(shutil.which('ffmpeg'), 'ffmpeg is not installed')
+    def test_matches_opencv_crops(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'sampler.avi')
+            write_test_video(path)
+            rois = [[4, 4, 20, 12], [40, 30, 60, 44]]
+            video_capture = cv2.VideoCapture(path)
+            expected = [(i, frame) for i, _, frame in FrameSampler(video_capture, 5, 10, 40)]
+            video_capture.release()
+            sampler = FFmpegSampler(path, rois, 5, 10, 40, fps=30, frame_size=(64, 48))
+            found = [(i, frame.copy()) for i, _, frame in sampler]
+
+        self.assertEqual([i for i, _ in found], [i for i, _ in expected])
+        for (_, crop_frame), (_, frame) in zip(found, expected):
+            for (x1, y1, x2, y2), (cx1, cy1, cx2, cy2) in zip(rois, sampler.local_coordinates):
+                difference = cv2.absdiff(crop_frame[cy1:cy2, cx1:cx2], frame[y1:y2, x1:x2])
+                self.assertLessEqual(difference.max(), 8)
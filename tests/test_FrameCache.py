@@ -0,0 +1,62 @@
+import os
+import tempfile
+from unittest import TestCase
+
+import cv2
+import numpy as np
+
+from FrameCache import FrameCache
+from FrameSampler import FrameSampler
+from test_FrameSampler import write_test_video
+
+
+class Test(TestCase):
+    def test_evicts_least_recently_used(self):
+        frame_bytes = 48 * 64 * 3
+        cache = FrameCache(max_bytes=2 * frame_bytes)
+        for frame_index in range(2):
+            cache.put('a.mp4', frame_index, np.zeros((48, 64, 3), dtype=np.uint8))
+        self.assertIsNotNone(cache.get('a.mp4', 0))  # 1 is now the oldest
+        cache.put('b.mp4', 0, np.zeros((48, 64, 3), dtype=np.uint8))
+
+        self.assertIsNone(cache.get('a.mp4', 1))
+        self.assertIsNotNone(cache.get('a.mp4', 0))
+        self.assertIsNotNone(cache.get('b.mp4', 0))
+        self.assertEqual(cache.bytes, 2 * frame_bytes)
+        self.assertFalse(cache.get('b.mp4', 0).flags.writeable)
+
+        cache.put('c.mp4', 0, np.zeros((480, 640, 3), dtype=np.uint8))  # Over budget on its own
+        self.assertEqual(len(cache), 2)
+
+    def test_sampler_reads_through_cache(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'cached.avi')
+            write_test_video(path)
+            cache = FrameCache()
+            video_capture = cv2.VideoCapture(path)
+            first = FrameSampler(video_capture, frame_cache=cache, video_key=path).read_at(30)
+            sampler = FrameSampler(video_capture, frame_cache=cache, video_key=path)
+            second = sampler.read_at(30)
+            video_capture.release()
+
+        self.assertIs(second[2], first[2])
+        self.assertEqual(sampler.seeks + sampler.grabs, 0)
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+        self.assertAlmostEqual(float(np.mean(second[2])), 120, delta=3)
+
+    def test_sampler_can_leave_cache_alone(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'cached.avi')
+            write_test_video(path)
+            cache = FrameCache()
+            video_capture = cv2.VideoCapture(path)
+            preview = FrameSampler(video_capture, frame_cache=cache, video_key=path).read_at(0)
+            sampler = FrameSampler(video_capture, 0, 10, frame_cache=cache, video_key=path, ring_size=2,
+                                   fill_cache=False)
+            samples = list(sampler)
+            video_capture.release()
+
+        # The cached frame is served, the rest go through the ring without being added
+        self.assertIs(samples[0][2], preview[2])
+        self.assertEqual((len(cache), cache.hits), (1, 1))
+        self.assertIs(samples[1][2], samples[3][2])
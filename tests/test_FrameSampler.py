@@ -0,0 +1,63 @@
+import os
+import tempfile
+from unittest import TestCase
+
+import cv2
+import numpy as np
+
+from FrameSampler import FrameSampler
+
+
+def write_test_video(path, frame_count=60, fps=30):
+    # Each frame is a flat gray level equal to its index * 4 so frames can be identified after decode
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'MJPG'), fps, (64, 48))
+    for i in range(frame_count):
+        writer.write(np.full((48, 64, 3), i * 4, dtype=np.uint8))
+    writer.release()
+
+
+class Test(TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, 'sampler.avi')
+        write_test_video(self.path)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_samples_by_grabbing_forward(self):
+        video_capture = cv2.VideoCapture(self.path)
+        sampler = FrameSampler(video_capture, start_frame=5, interval=10, end_frame=40)
+        samples = list(sampler)
+        video_capture.release()
+
+        self.assertEqual([s[0] for s in samples], [5, 15, 25, 35])
+        self.assertAlmostEqual(samples[1][1], 15 / 30)
+        for frame_index, _, frame in samples:
+            self.assertAlmostEqual(float(np.mean(frame)), frame_index * 4, delta=3)
+        self.assertEqual(sampler.seeks, 0)
+
+    def test_seeks_past_gop(self):
+        video_capture = cv2.VideoCapture(self.path)
+        sampler = FrameSampler(video_capture, start_frame=0, interval=20, gop_size=5)
+        samples = list(sampler)
+        video_capture.release()
+
+        self.assertEqual([s[0] for s in samples], [0, 20, 40])
+        self.assertEqual(sampler.seeks, 2)
+        self.assertAlmostEqual(float(np.mean(samples[2][2])), 160, delta=3)
+
+    def test_decodes_into_ring(self):
+        video_capture = cv2.VideoCapture(self.path)
+        sampler = FrameSampler(video_capture, start_frame=0, interval=5, end_frame=30, ring_size=2)
+        frames = []
+        for frame_index, _, frame in sampler:
+            # Still intact when handed out, the buffer is only written again two reads later
+            self.assertAlmostEqual(float(np.mean(frame)), frame_index * 4, delta=3)
+            frames.append(frame)
+        video_capture.release()
+
+        self.assertEqual(len(frames), 6)
+        self.assertIs(frames[0], frames[2])
+        self.assertIsNot(frames[0], frames[1])
+        self.assertEqual(len({id(frame) for frame in frames}), 2)
@@ -0,0 +1,76 @@
+import threading
+import time
+from unittest import TestCase
+
+import numpy as np
+
+from LiveSampler import LiveSampler, close_timeout
+
+
+class FakeCamera:
+    # Delivers a frame every 5 ms whether or not anyone is keeping up, frames carry their index
+    def __init__(self, frame_count):
+        self.frame_count = frame_count
+        self.index = -1
+        self.retrieved = 0
+
+    def grab(self):
+        time.sleep(0.005)
+        self.index += 1
+        return self.index < self.frame_count
+
+    def retrieve(self):
+        self.retrieved += 1
+        return True, np.full((4, 4), self.index, dtype=np.int32)
+
+
+class StalledCamera(FakeCamera):
+    # Delivers a few frames, then blocks in grab() like a network stream that went quiet
+    def __init__(self, frame_count):
+        super().__init__(frame_count)
+        self.released = threading.Event()
+
+    def grab(self):
+        if self.index + 1 >= self.frame_count:
+            self.released.wait()
+            return False
+        return super().grab()
+
+    def release(self):
+        self.released.set()
+
+
+class Test(TestCase):
+    def test_keeps_only_the_newest_frame(self):
+        camera = FakeCamera(60)
+        sampler = LiveSampler(camera, interval=2)
+        samples = []
+        for frame_index, timestamp, frame in sampler:
+            samples.append(frame_index)
+            self.assertEqual(int(frame[0, 0]), frame_index)
+            time.sleep(0.03)  # OCR that can't keep up with the camera
+
+        self.assertEqual(samples, sorted(samples))
+        self.assertTrue(all(b - a >= 2 for a, b in zip(samples, samples[1:])))
+        self.assertLess(len(samples), 30)
+        self.assertLess(camera.retrieved, 60)  # Frames between samples are grabbed but never converted
+        summary = sampler.summary()
+        self.assertEqual(summary['samples'], len(samples))
+        self.assertLess(summary['mean_latency'], 0.1)
+
+    def test_stops_after_duration(self):
+        sampler = LiveSampler(FakeCamera(10 ** 6), duration=0.1)
+        started = time.perf_counter()
+        samples = [timestamp for _, timestamp, _ in sampler]
+        self.assertLess(time.perf_counter() - started, 1.0)
+        self.assertTrue(samples and max(samples) <= 0.1)
+
+    def test_stop_does_not_wait_for_stalled_source(self):
+        camera = StalledCamera(1)
+        stop = []
+        sampler = LiveSampler(camera, should_stop=lambda: len(stop) > 0)
+        started = time.perf_counter()
+        for _ in sampler:
+            stop.append(None)
+        self.assertLess(time.perf_counter() - started, close_timeout + 1.0)
+        camera.release()
@@ -0,0 +1,71 @@
+import os
+import tempfile
+from unittest import TestCase
+
+import numpy as np
+
+from OCRCache import OCRCache, CachedOCREngine
+
+
+class CountingEngine:
+    languages = ('en',)
+    recog_network = 'standard'
+
+    def __init__(self):
+        self.images = 0
+
+    def readtext_batch(self, images, **kwargs):
+        self.images += len(images)
+        return [[([[0, 0], [4, 0], [4, 4], [0, 4]], str(int(image.mean())), np.float64(0.75))] for image in images]
+
+    recognize_batch = readtext_batch
+
+
+class Test(TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, 'video.mp4.ocrcache')
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_reruns_skip_the_engine(self):
+        crops = [np.full((8, 16), level, dtype=np.uint8) for level in (10, 20, 10)]
+        engine = CountingEngine()
+        cache = OCRCache(self.path)
+        first = CachedOCREngine(engine, cache).readtext_batch(crops)
+        cache.close()
+        self.assertEqual(engine.images, 2)  # The repeated crop is only read once
+
+        cache = OCRCache(self.path)
+        second = CachedOCREngine(engine, cache).readtext_batch(crops)
+        recognized = CachedOCREngine(engine, cache).recognize_batch(crops[:1])
+        cache.close()
+
+        self.assertEqual(second, first)
+        self.assertEqual(second[1][0][1:], ['20', 0.75])
+        self.assertEqual(cache.hits, 2)
+        self.assertEqual(engine.images, 3)  # Recognition is cached apart from detection
+        self.assertEqual(recognized[0][0][1], '10')
+
+    def test_evicts_least_recently_used(self):
+        cache = OCRCache(self.path, max_bytes=1000)
+        engine = CachedOCREngine(CountingEngine(), cache)
+        for level in range(20):
+            engine.readtext_batch([np.full((8, 16), level, dtype=np.uint8)])
+        engine.readtext_batch([np.full((8, 16), 19, dtype=np.uint8)])
+
+        self.assertLessEqual(cache.size, 1000)
+        self.assertLess(len(cache), 20)
+        self.assertEqual(cache.hits, 1)
+        cache.close()
+
+    def test_keeps_running_size(self):
+        cache = OCRCache(self.path, max_bytes=1000)
+        for level in range(20):
+            cache.put_many([(f'key{level % 12}', [[[[0, 0]], 'x' * level * 10, 0.5]])])
+            self.assertEqual(cache.size, cache.count_size())
+        self.assertLessEqual(cache.size, 1000)
+        size = cache.size
+        cache.close()
+        self.assertEqual(OCRCache(self.path).size, size)
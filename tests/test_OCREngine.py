@@ -0,0 +1,78 @@
+from unittest import TestCase
+
+import numpy as np
+
+from OCREngine import OCREngine, get_ocr_engine, clear_ocr_engines
+
+
+class BoxReader:
+    # Stand-in for easyocr.Reader that "detects" every non-background row band of the canvas
+    def __init__(self):
+        self.calls = 0
+
+    def readtext(self, image, **kwargs):
+        self.calls += 1
+        rows = np.flatnonzero(image.max(axis=1) > 0)
+        found = []
+        start = rows[0]
+        for prev, cur in zip(rows, list(rows[1:]) + [None]):
+            if cur is None or cur != prev + 1:
+                box = [[0, start], [4, start], [4, prev], [0, prev]]
+                found.append((box, str(int(image[start].max())), 0.9))
+                if cur is not None:
+                    start = cur
+        return found
+
+    def recognize(self, image, horizontal_list=None, free_list=None, **kwargs):
+        # Like easyocr, lines that come out empty are dropped rather than returned blank
+        self.calls += 1
+        return [([[x1, y1], [x2, y1], [x2, y2], [x1, y2]], str(int(image[y1:y2, x1:x2].max())), 0.8)
+                for x1, x2, y1, y2 in horizontal_list if image[y1:y2, x1:x2].max() > 0]
+
+
+class Test(TestCase):
+    def tearDown(self):
+        clear_ocr_engines()
+
+    def test_get_ocr_engine_is_shared(self):
+        engine = get_ocr_engine()
+        self.assertIs(engine, get_ocr_engine(['en']))
+        self.assertIsNot(engine, get_ocr_engine(['en'], gpu=False))
+
+    def test_engine_is_lazy(self):
+        engine = get_ocr_engine(['en', 'de'])
+        self.assertFalse(engine.is_loaded)
+        self.assertEqual(engine.languages, ('en', 'de'))
+
+    def test_readtext_batch_scatters_results(self):
+        engine = OCREngine()
+        engine._reader = BoxReader()
+        images = []
+        for value, height in [(10, 8), (20, 12), (30, 6)]:
+            image = np.zeros((height, 5 + value // 10), dtype=np.uint8)
+            image[2:height - 2, 1:4] = value
+            images.append(image)
+
+        results = engine.readtext_batch(images, max_canvas_height=60)
+        self.assertEqual(engine._reader.calls, 2)
+        self.assertEqual([r[0][1] for r in results], ['10', '20', '30'])
+        self.assertEqual(results[1][0][0][0], [0, 2])
+
+    def test_recognize_batch_reads_whole_crops(self):
+        engine = OCREngine()
+        engine._reader = BoxReader()
+        images = [np.full((10, 20), value, dtype=np.uint8) for value in (5, 7)]
+
+        results = engine.recognize_batch(images)
+        self.assertEqual(engine._reader.calls, 1)
+        self.assertEqual([r[0][1] for r in results], ['5', '7'])
+        self.assertEqual(results[1][0][0][2], [20, 10])
+
+    def test_recognize_batch_survives_dropped_lines(self):
+        engine = OCREngine()
+        engine._reader = BoxReader()
+        images = [np.full((10, 20), value, dtype=np.uint8) for value in (5, 0, 7, 9)]
+
+        results = engine.recognize_batch(images)
+        self.assertEqual([[text for _, text, _ in r] for r in results], [['5'], [], ['7'], ['9']])
+        self.assertEqual(results[2][0][0][0], [0, 0])
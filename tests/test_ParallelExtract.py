@@ -0,0 +1,55 @@
+import os
+import tempfile
+from unittest import TestCase
+
+import cv2
+import numpy as np
+import pandas as pd
+
+from ParallelExtract import plan_shards, merge_shards, extract_text_parallel
+
+
+class Test(TestCase):
+    def test_plan_shards_follows_sample_grid(self):
+        shards = plan_shards(start_frame=600, sample_count=10, time_interval=30, shard_count=3)
+        self.assertEqual(shards, [(600, 3), (690, 4), (810, 3)])
+        self.assertEqual(sum(samples for _, samples in shards), 10)
+        self.assertEqual(plan_shards(0, 2, 30, 8), [(0, 1), (30, 1)])
+
+    def test_merge_shards_restores_time(self):
+        parts = [pd.DataFrame({'time': [0.0, 1.0], 'speed': ['1', '2']}),
+                 pd.DataFrame({'time': [0.0], 'speed': ['3']})]
+        df = merge_shards(parts, [(600, 2), (660, 1)], start_frame=600, fps=30)
+        self.assertEqual(list(df['time']), [0.0, 1.0, 2.0])
+        self.assertEqual(list(df['speed']), ['1', '2', '3'])
+
+    def test_progress_per_sample_and_cancel(self):
+        # Bars only, so the shards never need the OCR model
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'bars.avi')
+            writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'MJPG'), 30, (160, 48))
+            for i in range(600):
+                frame = np.zeros((48, 160, 3), dtype=np.uint8)
+                frame[12:36, 10:10 + i % 140] = 230
+                writer.write(frame)
+            writer.release()
+            options = dict(video_path=path, roi_coordinates=[[10, 12, 150, 36]], roi_names=['fuel'], time_interval=1,
+                           start_time=0, end_time=20, workers=2, hor_flags=[True], vert_flags=[False])
+
+            reports = []
+            df = extract_text_parallel(progress=lambda done, total: reports.append((done, total)), **options)
+            self.assertEqual(len(df), 600)
+            self.assertEqual(reports[-1], (600, 600))
+
+            # Bars sampled between text samples count towards the total too
+            reports = []
+            df = extract_text_parallel(progress=lambda done, total: reports.append((done, total)),
+                                       **dict(options, time_interval=4, bar_interval=2))
+            self.assertEqual(len(df), 300)
+            self.assertEqual(reports[-1], (300, 300))
+
+            # Cancelling stops the running shards partway, their finished rows come back in order
+            stopped = extract_text_parallel(should_stop=lambda: True, **options)
+            self.assertLess(len(stopped), 600)
+            if len(stopped):
+                self.assertTrue(stopped['time'].is_monotonic_increasing)
@@ -0,0 +1,79 @@
+import os
+import random
+import tempfile
+import threading
+import time
+from unittest import TestCase
+
+import cv2
+import pandas as pd
+
+from ExtractText import extract_text_from_video
+from Pipeline import Prefetcher, OCRStage
+from test_FrameSampler import write_test_video
+
+
+def slow_samples(count, fail_at=None):
+    for n in range(count):
+        if n == fail_at:
+            raise IOError('decode failed')
+        time.sleep(0.002)
+        yield n, n / 30, threading.current_thread().name
+
+
+class JitteryEngine:
+    # Reads the gray level, taking a random while so batches on different workers finish out of order
+    def readtext_batch(self, images, **kwargs):
+        time.sleep(random.uniform(0, 0.01))
+        return [[([[0, 0], [4, 0], [4, 4], [0, 4]], str(int(image.mean())), 0.9)] for image in images]
+
+    recognize_batch = readtext_batch
+
+
+class Test(TestCase):
+    def test_prefetcher_keeps_order(self):
+        samples = list(Prefetcher(slow_samples(20), size=3))
+        self.assertEqual([s[0] for s in samples], list(range(20)))
+        self.assertNotEqual(samples[0][2], threading.current_thread().name)
+
+    def test_prefetcher_raises_and_stops(self):
+        with self.assertRaises(IOError):
+            list(Prefetcher(slow_samples(20, fail_at=5), size=2))
+        for frame_index, _, _ in Prefetcher(slow_samples(10 ** 6), size=2):
+            if frame_index == 3:
+                break
+        self.assertEqual(threading.active_count(), 1)
+
+    def test_ocr_stage_returns_batches_in_order(self):
+        stage = OCRStage(workers=3, queue_size=4)
+        finished = []
+        for n, delay in enumerate([0.05, 0.0, 0.03, 0.0, 0.01, 0.0]):
+            finished += stage.submit(n, lambda n, delay: time.sleep(delay) or n * 10, n, delay)
+            self.assertLessEqual(len(stage.in_flight), 4)
+        finished += stage.drain()
+        stage.close()
+
+        self.assertEqual(finished, [(n, n * 10) for n in range(6)])
+        self.assertEqual(OCRStage(workers=0).submit('tag', abs, -2), [('tag', 2)])
+
+    def test_staged_loop_matches_plain_loop(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'staged.avi')
+            write_test_video(path, frame_count=60)
+
+            def extract(**stages):
+                video_capture = cv2.VideoCapture(path)
+                try:
+                    return extract_text_from_video(video_capture=video_capture, video_path=path,
+                                                   roi_coordinates=[[0, 0, 32, 24], [32, 24, 64, 48], [0, 30, 60, 40]],
+                                                   roi_names=['a', 'b', 'bar'], hor_flags=[False, False, True],
+                                                   vert_flags=[False, False, False], time_interval=2, start_time=0,
+                                                   end_time=2, ocr_engine=JitteryEngine(), ocr_batch_frames=2,
+                                                   **stages)
+                finally:
+                    video_capture.release()
+
+            plain = extract(decode_queue=0, ocr_workers=0)
+            staged = extract(decode_queue=3, ocr_workers=3, ocr_queue=4)
+        self.assertEqual((len(plain), plain['a'].nunique()), (30, 30))
+        pd.testing.assert_frame_equal(staged, plain)
@@ -0,0 +1,46 @@
+from unittest import TestCase
+
+import cv2
+import numpy as np
+
+from Preprocessor import Preprocessor, preprocess_settings, sharpening_kernel
+
+
+class Test(TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.frames = [rng.integers(0, 256, size=(120, 200, 3), dtype=np.uint8) for _ in range(4)]
+
+    def test_matches_enhance_contrast(self):
+        preprocessor = Preprocessor(**preprocess_settings(enhance_contrast=True))
+        crop = self.frames[0][10:50, 20:180]
+        expected = cv2.filter2D(cv2.convertScaleAbs(cv2.cvtColor(crop, cv2.COLOR_BGR2GRAY), alpha=1.1, beta=-40),
+                                -1, sharpening_kernel)
+        np.testing.assert_array_equal(preprocessor(crop), expected)
+
+    def test_reuses_buffers(self):
+        preprocessor = Preprocessor(ring_size=2, contrast=True, target_height=20, binarize='otsu')
+        outputs = [preprocessor(frame[10:50, 20:180]) for frame in self.frames]
+        self.assertEqual(outputs[0].shape, (20, 80))
+        self.assertTrue(set(np.unique(outputs[0])) <= {0, 255})
+        # Grayscale, contrast and resize buffers once, the final binarize buffer once per ring slot
+        self.assertEqual(preprocessor.allocations, 5)
+        self.assertIs(outputs[0], outputs[2])
+        self.assertIsNot(outputs[2], outputs[3])
+
+    def test_single_channel(self):
+        preprocessor = Preprocessor(channel='r')
+        crop = self.frames[0][10:50, 20:180]
+        output = preprocessor(crop)
+        np.testing.assert_array_equal(output, crop[..., 2])
+        self.assertTrue(output.flags['C_CONTIGUOUS'])
+        with self.assertRaises(ValueError):
+            Preprocessor(channel='alpha')
+
+    def test_preview_and_bad_settings(self):
+        stages = Preprocessor(sharpen=True).preview(self.frames[0][:30, :60])
+        self.assertEqual([name for name, _ in stages], ['crop', 'grayscale', 'sharpen'])
+        with self.assertRaises(ValueError):
+            Preprocessor(blur=3)
+        with self.assertRaises(ValueError):
+            Preprocessor(grayscale=False, binarize='otsu')
@@ -0,0 +1,55 @@
+import os
+from unittest import TestCase
+
+import numpy as np
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+from PyQt5.QtGui import QImage
+from PyQt5.QtWidgets import QApplication, QGraphicsScene, QGraphicsView
+
+from PreviewRenderer import PreviewRenderer, to_pixmap
+
+app = QApplication.instance() or QApplication([])
+
+
+class Test(TestCase):
+    def setUp(self):
+        self.scene = QGraphicsScene()
+        self.view = QGraphicsView(self.scene)
+        self.view.setFixedSize(320, 180)
+        self.frame = np.zeros((720, 1280, 3), dtype=np.uint8)
+
+    def test_throttles_and_downsamples(self):
+        renderer = PreviewRenderer(self.scene, self.view, max_fps=1)
+        self.assertTrue(renderer.show_frame(self.frame))
+        self.assertFalse(renderer.show_frame(self.frame))
+        self.assertTrue(renderer.show_frame(self.frame, throttle=False))
+        self.assertEqual((renderer.drawn, renderer.dropped), (2, 1))
+        # Converted at display size, scaled back up to frame coordinates in the scene
+        self.assertLessEqual(renderer.frame_item.pixmap().width(), self.view.viewport().width())
+        self.assertAlmostEqual(renderer.frame_item.sceneBoundingRect().width(), 1280, delta=1)
+
+    def test_items_are_updated_in_place(self):
+        renderer = PreviewRenderer(self.scene, self.view, max_fps=0)
+        renderer.set_rectangles([[0, 0, 10, 10], [20, 20, 40, 30]])
+        for _ in range(5):
+            renderer.show_frame(self.frame)
+            renderer.show_roi(np.zeros((10, 40), dtype=np.uint8), 20, 20)
+        self.assertEqual(len(self.scene.items()), 4)
+        renderer.set_rectangles([[5, 5, 15, 15]])
+        renderer.clear_rois()
+        self.assertEqual(len(self.scene.items()), 2)
+        self.assertEqual(renderer.rect_items[0].rect().x(), 5)
+
+    def test_converts_views(self):
+        frame = np.random.default_rng(0).integers(0, 256, size=(120, 200, 3), dtype=np.uint8)
+        for image in (frame[10:30, 20:70], frame[10:30, 20:70, 1], frame[::2, ::2]):
+            pixmap = to_pixmap(image)
+            self.assertEqual((pixmap.height(), pixmap.width()), image.shape[:2])
+            q_image = pixmap.toImage().convertToFormat(QImage.Format_RGB888)
+            pixels = np.frombuffer(q_image.constBits().asstring(q_image.sizeInBytes()), dtype=np.uint8)
+            pixels = pixels.reshape(image.shape[0], q_image.bytesPerLine())[:, :image.shape[1] * 3]
+            pixels = pixels.reshape(image.shape[0], image.shape[1], 3)
+            expected = image[..., np.newaxis] if image.ndim == 2 else image[..., ::-1]
+            np.testing.assert_array_equal(pixels, np.broadcast_to(expected, pixels.shape))
+        self.assertTrue(to_pixmap(frame[:0]).isNull())
@@ -0,0 +1,38 @@
+import json
+import os
+import tempfile
+from unittest import TestCase
+
+from Profiler import StageProfiler, NullProfiler
+
+
+class Test(TestCase):
+    def test_summary_and_trace(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            trace_path = os.path.join(tmp_dir, 'trace.jsonl')
+            profiler = StageProfiler(trace_path)
+            for frame_index in (0, 30):
+                profiler.add('decode', 0.01)
+                profiler.begin_sample(frame_index)
+                profiler.add('preprocess', 0.002, 'speed')
+                profiler.add_batch('ocr', 0.1, ['speed', 'altitude'])
+                profiler.end_sample()
+            profiler.close()
+
+            summary = profiler.summary()
+            self.assertEqual(summary['samples'], 2)
+            self.assertEqual(summary['stages']['ocr']['calls'], 2)
+            self.assertAlmostEqual(summary['stages']['decode']['seconds'], 0.02)
+            self.assertAlmostEqual(summary['rois']['altitude']['ocr']['seconds'], 0.1)
+            self.assertEqual(summary['rois']['speed']['preprocess']['calls'], 2)
+
+            with open(trace_path) as f:
+                trace = [json.loads(line) for line in f]
+            self.assertEqual([t['frame'] for t in trace], [0, 30])
+            self.assertAlmostEqual(trace[1]['stages']['decode'], 0.01)
+
+    def test_null_profiler(self):
+        profiler = NullProfiler()
+        with profiler.stage('ocr', ['speed']):
+            pass
+        self.assertIsNone(profiler.summary())
@@ -0,0 +1,48 @@
+from unittest import TestCase
+
+import numpy as np
+import pandas as pd
+
+from ResultAccumulator import ResultAccumulator
+
+
+class Test(TestCase):
+    def test_grows_in_chunks(self):
+        results = ResultAccumulator(chunk_size=4)
+        results.add_column('time')
+        results.add_column('timestamp', object)
+        for i in range(10):
+            row = results.append_row()
+            results.set(row, 'time', i / 2)
+            if i % 3 == 0:
+                results.set(row, 'timestamp', f'00:00:0{i}')
+
+        df = results.to_dataframe()
+        self.assertEqual(list(df.columns), ['time', 'timestamp'])
+        self.assertEqual(len(df), 10)
+        self.assertEqual(df['time'].iloc[9], 4.5)
+        self.assertEqual(df['timestamp'].iloc[3], '00:00:03')
+        self.assertTrue(pd.isna(df['timestamp'].iloc[4]))
+
+    def test_late_column_is_backfilled(self):
+        results = ResultAccumulator(chunk_size=2)
+        results.add_column('time')
+        for i in range(3):
+            results.set(results.append_row(), 'time', i)
+        results.add_column('speed_conf')
+        results.set(2, 'speed_conf', 0.9)
+
+        df = results.to_dataframe()
+        self.assertTrue(np.isnan(df['speed_conf'].iloc[0]))
+        self.assertEqual(df['speed_conf'].iloc[2], 0.9)
+
+    def test_row_range(self):
+        results = ResultAccumulator(chunk_size=4)
+        results.add_column('time')
+        for i in range(10):
+            results.set(results.append_row(), 'time', i)
+
+        df = results.to_dataframe(3, 9)
+        self.assertEqual(list(df['time']), [3, 4, 5, 6, 7, 8])
+        self.assertEqual(df.index[0], 3)
+        self.assertEqual(len(results.to_dataframe(10)), 0)
@@ -0,0 +1,125 @@
+import os
+import tempfile
+from unittest import TestCase
+
+import cv2
+import pandas as pd
+
+from ExtractText import extract_text_from_video
+from LiveExtract import extract_text_live
+from ResultWriter import ResultWriter
+from test_FrameSampler import write_test_video
+
+
+class LevelEngine:
+    def __init__(self):
+        self.images = 0
+
+    def readtext_batch(self, images, **kwargs):
+        self.images += len(images)
+        return [[([[0, 0], [4, 0], [4, 4], [0, 4]], str(int(image.mean())), 0.9)] for image in images]
+
+    recognize_batch = readtext_batch
+
+
+class Test(TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, 'flight.csv')
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_resume_drops_rows_after_checkpoint(self):
+        writer = ResultWriter(self.path)
+        self.assertIsNone(writer.start('abc'))
+        writer.write(pd.DataFrame({'time': [0.0, 1.0], 'speed': ['0012', '0013']}), next_frame=60)
+        # Rows written without a checkpoint, as if the run died mid-flush
+        pd.DataFrame({'time': [2.0], 'speed': ['0014']}).to_csv(self.path, mode='a', header=False, index=False)
+
+        writer = ResultWriter(self.path)
+        self.assertEqual(writer.start('abc'), 60)
+        writer.write(pd.DataFrame({'time': [2.0], 'speed': ['0015']}), next_frame=90)
+        df = writer.read(dtype={'speed': str})
+        self.assertEqual(list(df['speed']), ['0012', '0013', '0015'])
+        self.assertEqual(writer.rows, 3)
+
+    def test_changed_settings_start_over(self):
+        writer = ResultWriter(self.path)
+        writer.start('abc')
+        writer.write(pd.DataFrame({'time': [0.0]}), next_frame=30)
+
+        writer = ResultWriter(self.path)
+        self.assertIsNone(writer.start('def'))
+        self.assertFalse(os.path.exists(self.path))
+        self.assertEqual(len(writer.read()), 0)
+
+    def extract(self, video_path, output, should_stop=None, time_interval=2, languages=('en',)):
+        engine = LevelEngine()
+        engine.languages = languages
+        video_capture = cv2.VideoCapture(video_path)
+        try:
+            extract_text_from_video(video_capture=video_capture, roi_coordinates=[[0, 0, 32, 24]], roi_names=['level'],
+                                    time_interval=time_interval, start_time=0, end_time=2, ocr_engine=engine,
+                                    ocr_batch_frames=2, output=output, should_stop=should_stop)
+        finally:
+            video_capture.release()
+        return engine.images
+
+    def test_extraction_resumes_after_stop(self):
+        video_path = os.path.join(self.tmp_dir.name, 'video.avi')
+        write_test_video(video_path)
+        full_path = os.path.join(self.tmp_dir.name, 'full.csv')
+        self.extract(video_path, ResultWriter(full_path, flush_rows=4))
+
+        samples = []
+        self.extract(video_path, ResultWriter(self.path, flush_rows=4),
+                     should_stop=lambda: samples.append(None) or len(samples) > 12)
+        stopped = ResultWriter(self.path).load_checkpoint()
+        self.assertEqual((stopped['rows'], stopped['next_frame']), (12, 24))
+        # A row that made it to disk after the last checkpoint (crash mid-flush) is dropped on resume
+        with open(self.path, 'a') as f:
+            f.write('0.8,junk\n')
+
+        read = self.extract(video_path, ResultWriter(self.path, flush_rows=4))
+        self.assertEqual(read, 18)  # Only the samples after the checkpoint
+        pd.testing.assert_frame_equal(pd.read_csv(self.path), pd.read_csv(full_path))
+
+    def test_extraction_with_other_settings_starts_over(self):
+        video_path = os.path.join(self.tmp_dir.name, 'video.avi')
+        write_test_video(video_path)
+        samples = []
+        self.extract(video_path, ResultWriter(self.path, flush_rows=4),
+                     should_stop=lambda: samples.append(None) or len(samples) > 12)
+
+        read = self.extract(video_path, ResultWriter(self.path, flush_rows=4), time_interval=3)
+        self.assertEqual(read, 20)
+        df = pd.read_csv(self.path)
+        self.assertEqual(len(df), 20)
+        self.assertEqual(df['time'].iloc[1], 0.1)
+
+    def test_extraction_with_other_model_starts_over(self):
+        video_path = os.path.join(self.tmp_dir.name, 'video.avi')
+        write_test_video(video_path)
+        samples = []
+        self.extract(video_path, ResultWriter(self.path, flush_rows=4),
+                     should_stop=lambda: samples.append(None) or len(samples) > 12)
+
+        read = self.extract(video_path, ResultWriter(self.path, flush_rows=4), languages=('de',))
+        self.assertEqual(read, 30)
+        self.assertEqual(len(pd.read_csv(self.path)), 30)
+
+    def test_live_run_keeps_earlier_output(self):
+        video_path = os.path.join(self.tmp_dir.name, 'video.avi')
+        write_test_video(video_path)
+        self.extract(video_path, ResultWriter(self.path))
+        earlier = pd.read_csv(self.path)
+
+        with self.assertRaises(FileExistsError):
+            extract_text_live(video_path, [[0, 0, 32, 24]], ['level'], ocr_engine=LevelEngine(),
+                              output=ResultWriter(self.path), return_results=False)
+        pd.testing.assert_frame_equal(pd.read_csv(self.path), earlier)
+
+        extract_text_live(video_path, [[0, 0, 32, 24]], ['level'], time_interval=5, ocr_engine=LevelEngine(),
+                          output=ResultWriter(self.path), return_results=False, overwrite=True)
+        self.assertLess(len(pd.read_csv(self.path)), len(earlier))
@@ -0,0 +1,55 @@
+import os
+import tempfile
+from unittest import TestCase
+
+import cv2
+import numpy as np
+
+from FrameSampler import FrameSampler
+from SeekIndex import SeekIndex, index_suffix
+from test_FrameSampler import write_test_video
+
+
+class Test(TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, 'indexed.avi')
+        write_test_video(self.path)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_frame_times(self):
+        index = SeekIndex.build(self.path)
+
+        self.assertEqual(index.frame_count, 60)
+        self.assertAlmostEqual(index.time_of(15), 0.5)
+        self.assertEqual(index.frame_at(0.5), 15)
+        self.assertEqual(index.frame_at(0.51), 15)
+        self.assertEqual(index.frames_before(1.0), 30)
+        self.assertEqual(index.keyframe_before(0), 0)
+
+    def test_saved_next_to_the_video(self):
+        index = SeekIndex.for_video(self.path)
+        self.assertTrue(os.path.exists(self.path + index_suffix))
+
+        loaded = SeekIndex.load(self.path + index_suffix, self.path)
+        np.testing.assert_array_equal(loaded.timestamps, index.timestamps)
+        self.assertEqual(loaded.fps, index.fps)
+
+        # A rewritten video makes the saved index stale
+        write_test_video(self.path, frame_count=30)
+        os.utime(self.path, ns=(0, 0))
+        self.assertIsNone(SeekIndex.load(self.path + index_suffix, self.path))
+        self.assertEqual(SeekIndex.for_video(self.path).frame_count, 30)
+
+    def test_sampler_seeks_with_index(self):
+        index = SeekIndex.build(self.path)
+        video_capture = cv2.VideoCapture(self.path)
+        sampler = FrameSampler(video_capture, seek_index=index)
+        for frame_index in (40, 10, 55, 3):
+            sample = sampler.read_at(frame_index)
+            self.assertEqual(sample[0], frame_index)
+            self.assertAlmostEqual(sample[1], index.time_of(frame_index))
+            self.assertAlmostEqual(float(np.mean(sample[2])), frame_index * 4, delta=3)
+        video_capture.release()